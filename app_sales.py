@@ -8,7 +8,9 @@ InsightFlow 销售线索 - Gradio UI
 
 import asyncio
 import os
+import time
 import traceback
+from typing import Callable
 
 import agentscope
 import gradio as gr
@@ -50,17 +52,6 @@ def init_agentscope_runtime() -> None:
 init_agentscope_runtime()
 
 
-# ── 日志缓冲 ──────────────────────────────────────────────────
-
-
-log_buffer: list[str] = []
-
-
-def log_callback(msg: str):
-    """日志回调，追加到缓冲区"""
-    log_buffer.append(msg)
-
-
 def print_model_config() -> None:
     """启动时打印当前 Agent 模型配置。"""
     config = Config()
@@ -81,7 +72,10 @@ def print_model_config() -> None:
     print("=" * 60 + "\n")
 
 
-# ── 异步 → 同步桥接 ──────────────────────────────────────────
+# ── 异步处理 ──────────────────────────────────────────────────
+# Gradio 在自己的事件循环上直接调度 async 处理函数，所有会话共享同一个循环，
+# 因此 HTTP 连接池、MCP 客户端和 Agent 可以通过 SalesRuntime 跨请求复用。
+# 每次点击拥有独立的日志通道，以生成器形式持续推送到界面。
 
 
 def _depth_label_to_key(depth_value: int) -> str:
@@ -89,17 +83,39 @@ def _depth_label_to_key(depth_value: int) -> str:
     return {1: "quick", 2: "standard", 3: "deep"}.get(depth_value, "standard")
 
 
-async def _search_leads_async(product_input: str, depth: int):
-    """异步执行搜索"""
-    from src.orchestrator_sales import run_sales_lead_search
+def _format_error(e: BaseException) -> str:
+    """格式化异常详情，展开 ExceptionGroup / BaseExceptionGroup 的子异常"""
+    if isinstance(e, BaseExceptionGroup):
+        parts = [f"ExceptionGroup 包含 {len(e.exceptions)} 个子异常:\n"]
+        for i, sub in enumerate(e.exceptions, 1):
+            parts.append(
+                f"--- 子异常 {i} ---\n"
+                + "".join(
+                    traceback.format_exception(
+                        type(sub),
+                        sub,
+                        sub.__traceback__,
+                    )
+                )
+            )
+        return "\n".join(parts)
+    return "".join(traceback.format_exception(type(e), e, e.__traceback__))
 
-    global log_buffer
-    log_buffer = []
+
+async def _run_search(
+    product_input: str,
+    depth: int,
+    log_callback: Callable[[str], None],
+):
+    """在共享运行时上执行一次搜索，返回报告内容和文件路径"""
+    from src.orchestrator_sales import run_sales_lead_search
+    from src.runtime import get_runtime
 
     report = await run_sales_lead_search(
         product_input=product_input,
         depth=_depth_label_to_key(depth),
         log_callback=log_callback,
+        runtime=get_runtime(),
     )
 
     # 读取生成的报告内容
@@ -111,42 +127,47 @@ async def _search_leads_async(product_input: str, depth: int):
         except FileNotFoundError:
             report_content = "报告文件未生成。"
 
-    log_text = "\n".join(log_buffer)
     return (
         report_content,
-        log_text,
         report.report_filepath if report.report_filepath else None,
         report.csv_filepath if report.csv_filepath else None,
     )
 
 
-def search_leads(product_input: str, depth: int):
-    """Gradio 同步入口"""
+async def search_leads(product_input: str, depth: int):
+    """Gradio 异步入口：运行期间按间隔推送本会话的日志，结束后输出报告"""
     if not product_input or not product_input.strip():
-        return "请输入产品名称或描述", "错误: 产品输入为空", None, None
+        yield "请输入产品名称或描述", "错误: 产品输入为空", None, None
+        return
+
+    # 本次点击独立的日志通道（orchestrator 的日志回调在同一事件循环中同步调用）
+    logs: list[str] = []
+    task = asyncio.create_task(
+        _run_search(product_input.strip(), depth, logs.append)
+    )
+    refresh = float(Config().get("app.sales_ui.log_refresh_seconds", 1.0))
 
     try:
-        result = asyncio.run(_search_leads_async(product_input.strip(), depth))
-        return result
-    except BaseException as e:
-        # 展开 ExceptionGroup / BaseExceptionGroup 的子异常
-        error_details = traceback.format_exc()
-        if isinstance(e, BaseExceptionGroup):
-            parts = [f"ExceptionGroup 包含 {len(e.exceptions)} 个子异常:\n"]
-            for i, sub in enumerate(e.exceptions, 1):
-                parts.append(
-                    f"--- 子异常 {i} ---\n"
-                    + "".join(
-                        traceback.format_exception(
-                            type(sub),
-                            sub,
-                            sub.__traceback__,
-                        )
-                    )
-                )
-            error_details = "\n".join(parts)
-        error_log = "\n".join(log_buffer) + f"\n\n错误详情:\n{error_details}"
-        return f"执行出错: {e}", error_log, None, None
+        shown = 0
+        while not task.done():
+            await asyncio.wait([task], timeout=refresh)
+            if len(logs) != shown:
+                shown = len(logs)
+                yield "搜索进行中，请稍候...", "\n".join(logs), None, None
+
+        try:
+            report_content, md_path, csv_path = task.result()
+        except BaseException as e:
+            error_log = "\n".join(logs) + f"\n\n错误详情:\n{_format_error(e)}"
+            yield f"执行出错: {e}", error_log, None, None
+            return
+
+        yield report_content, "\n".join(logs), md_path, csv_path
+    finally:
+        # 用户关闭页面或取消时，Gradio 会关闭生成器，同时取消后台流水线
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
 
 
 # ── Gradio 界面 ──────────────────────────────────────────────
@@ -392,10 +413,13 @@ def create_sales_ui() -> gr.Blocks:
             )
 
         # 绑定事件
+        # 全服务器共享的并发上限：超出的请求在 Gradio 队列中排队
         search_btn.click(
             fn=search_leads,
             inputs=[product_input, depth],
             outputs=[report_output, agent_log, md_download, csv_download],
+            concurrency_limit=int(Config().get("app.sales_ui.max_concurrent_runs", 2)),
+            concurrency_id="sales_pipeline",
         )
 
     return app
@@ -406,4 +430,17 @@ def create_sales_ui() -> gr.Blocks:
 if __name__ == "__main__":
     print_model_config()
     app = create_sales_ui()
-    app.launch(server_port=7860, share=False)
+    app.queue(max_size=int(Config().get("app.sales_ui.queue_max_size", 20)))
+    app.launch(server_port=7860, share=False, prevent_thread_lock=True)
+    try:
+        while True:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\n正在关闭服务...")
+    finally:
+        # 共享运行时绑定在 Gradio 服务的事件循环上，须在服务停止前关闭
+        # （MCP 子进程、HTTP 连接池）
+        from src.runtime import shutdown_runtime_sync
+
+        shutdown_runtime_sync()
+        app.close()
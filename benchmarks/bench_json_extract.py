@@ -0,0 +1,167 @@
+"""
+InsightFlow 微基准 - JSON 提取
+文件路径: benchmarks/bench_json_extract.py
+
+对比旧版 _try_parse_json（从每个 '{' 出发做括号匹配，最坏 O(n²)）与
+当前单次扫描实现在 100 KB+ 的 Lead Qualifier 风格输出上的耗时，
+同时打印两者返回对象的 keys（旧版从最后一个 '{' 倒推，常返回内层小对象）。
+
+用法:
+    python benchmarks/bench_json_extract.py
+    python benchmarks/bench_json_extract.py --leads 200 800 --repeat 5
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.orchestrator_sales import _try_parse_json  # noqa: E402
+
+
+def _legacy_try_parse_json(text: str) -> dict | None:
+    """旧版 _try_parse_json 的完整拷贝，用于对比。"""
+    if not text or not text.strip():
+        return None
+    try:
+        result = json.loads(text)
+        if isinstance(result, dict):
+            return result
+    except (json.JSONDecodeError, ValueError):
+        pass
+    if "```json" in text:
+        try:
+            start = text.index("```json") + 7
+            end = text.index("```", start)
+            result = json.loads(text[start:end].strip())
+            if isinstance(result, dict):
+                return result
+        except (ValueError, json.JSONDecodeError):
+            pass
+    if "```" in text:
+        try:
+            start = text.index("```") + 3
+            newline = text.index("\n", start)
+            end = text.index("```", newline)
+            result = json.loads(text[newline:end].strip())
+            if isinstance(result, dict):
+                return result
+        except (ValueError, json.JSONDecodeError):
+            pass
+
+    brace_positions = [i for i, c in enumerate(text) if c == "{"]
+    for start in reversed(brace_positions):
+        depth = 0
+        in_string = False
+        escape_next = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if escape_next:
+                escape_next = False
+                continue
+            if ch == "\\":
+                escape_next = True
+                continue
+            if ch == '"' and not escape_next:
+                in_string = not in_string
+                continue
+            if in_string:
+                continue
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        result = json.loads(text[start : i + 1])
+                        if isinstance(result, dict):
+                            return result
+                    except (json.JSONDecodeError, ValueError):
+                        pass
+                    break
+    return None
+
+
+def _make_lead(i: int) -> dict:
+    return {
+        "company_name": f"示例科技{i}有限公司",
+        "website": f"https://www.example{i}.com",
+        "industry": "新能源汽车",
+        "estimated_size": "medium",
+        "qualification_score": 40 + i % 50,
+        "priority": "warm",
+        "bant_assessment": {
+            dim: {"score": 10 + i % 15, "reason": f"{dim} 依据: 公开报道显示 {{预算}} 充足"}
+            for dim in ("budget", "authority", "need", "timing")
+        },
+        "product_fit": "high",
+        "recommended_approach": "通过官网联系采购部，引用 \"SiC\" 方案案例",
+        "talking_points": [f"针对 {{产品}} 的第 {j} 条话术" for j in range(3)],
+    }
+
+
+def build_samples(n_leads: int) -> dict[str, str]:
+    """构造几种真实 Agent 输出形态（均不能被 json.loads 直接解析）。"""
+    payload = {
+        "qualified_leads": [_make_lead(i) for i in range(n_leads)],
+        "summary": {"total_evaluated": n_leads},
+    }
+    body = json.dumps(payload, ensure_ascii=False, indent=2)
+    prose = "以下是 BANT 评估结果，模板变量形如 {company} 已替换：\n\n"
+    return {
+        # 正文包裹的完整 JSON
+        "wrapped": prose + body + "\n\n如需补充请告知。",
+        # 输出被截断（最常见的失败形态）
+        "truncated": prose + body[: int(len(body) * 0.9)],
+        # Python 字面量风格（单引号，所有候选都无法解析）
+        "single_quoted": prose + body.replace('"', "'"),
+    }
+
+
+def _bench(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _describe(result: dict | None) -> str:
+    return ",".join(sorted(result.keys()))[:28] if result else "None"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSON 提取微基准")
+    parser.add_argument(
+        "--leads",
+        type=int,
+        nargs="+",
+        default=[100, 300, 800],
+        help="线索条数（可给多个，观察随输入规模的增长）",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数（取最优）")
+    args = parser.parse_args()
+
+    print(
+        f"{'样本':<14}{'线索':>6}{'KB':>8}{'旧版ms':>10}{'新版ms':>10}{'加速':>8}"
+        f"  旧版结果 keys / 新版结果 keys"
+    )
+    for n_leads in args.leads:
+        for name, text in build_samples(n_leads).items():
+            legacy = _bench(_legacy_try_parse_json, text, args.repeat)
+            current = _bench(_try_parse_json, text, args.repeat)
+            print(
+                f"{name:<14}{n_leads:>6}{len(text) / 1024:>8.0f}"
+                f"{legacy * 1000:>10.1f}{current * 1000:>10.1f}"
+                f"{legacy / max(current, 1e-9):>7.1f}x"
+                f"  {_describe(_legacy_try_parse_json(text))}"
+                f" / {_describe(_try_parse_json(text))}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+InsightFlow 基准测试 - 离线端到端流水线
+文件路径: benchmarks/bench_pipeline.py
+
+用 benchmarks/fakes.py 中的假模型和假搜索后端驱动 run_sales_lead_search，
+按 quick / standard / deep 预设各跑一遍，输出:
+
+  - 总耗时与各阶段耗时（SalesLeadReport.stage_timings）
+  - 吞吐（最终线索数 / 总耗时）
+  - Python 堆内存峰值（tracemalloc）
+  - 各 Agent 的模型调用次数与 token 用量、搜索 / 网页提取调用次数
+
+不访问网络、不产生费用；同样的参数和种子每次产生同样的调用序列，
+可用 --json 保存结果后对比前后两次提交的数字。
+
+用法:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --mode full --depth quick --llm-latency 0.2
+    python benchmarks/bench_pipeline.py --mode full --streaming --json bench.json
+    python benchmarks/bench_pipeline.py --replay recorded_trace.json
+    python benchmarks/bench_pipeline.py --depth quick --trace   # 同时导出 span JSONL
+    python benchmarks/bench_pipeline.py --raw-tool-results      # 关闭工具结果紧凑编码
+    python benchmarks/bench_pipeline.py --lead-store /tmp/leads.db  # 跨运行复用（跑两次对比）
+    python benchmarks/bench_pipeline.py --lead-store /tmp/leads.db --delta --seed 1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import src.orchestrator_sales as orchestrator  # noqa: E402
+from benchmarks.fakes import FakeChatModel, FakeSearchBackend  # noqa: E402
+from src.agents import _AGENT_SPECS  # noqa: E402
+from src.config import Config  # noqa: E402
+from src.deadline import STAGE_LABELS  # noqa: E402
+from src.runtime import SalesRuntime  # noqa: E402
+from src.tools.web_search import setup_file_toolkit  # noqa: E402
+
+
+def _override_config(key: str, value: Any) -> None:
+    """仅在本进程内覆盖配置项（Config 是单例，没有公开的 setter）。"""
+    node = Config()._config
+    *parents, leaf = key.split(".")
+    for part in parents:
+        node = node.setdefault(part, {})
+    node[leaf] = value
+
+
+async def run_preset(depth: str, args: argparse.Namespace, replay: dict) -> dict:
+    """用全新的假模型和假搜索后端跑一次指定深度的流水线。"""
+    backend = FakeSearchBackend(
+        latency=args.search_latency,
+        results_per_query=args.results_per_query,
+        pool_size=args.pool_size,
+        seed=args.seed,
+    )
+    # broad 扩量直接调用 search_duckduckgo，同样指向假后端
+    orchestrator.search_duckduckgo = backend.search
+
+    models = {
+        agent_id: FakeChatModel(
+            agent_id,
+            latency=args.llm_latency,
+            seed=args.seed,
+            trace=replay.get(agent_id),
+            leads_per_scan=args.leads_per_scan,
+        )
+        for agent_id in _AGENT_SPECS
+    }
+    runtime = SalesRuntime(enable_qcc=False)
+    runtime.search_toolkit = backend.build_toolkit()
+    runtime.file_toolkit = await setup_file_toolkit()
+    runtime._models = dict(models)
+
+    log_output = io.StringIO()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else log_output):
+            report = await orchestrator.run_sales_lead_search(
+                product_input=args.product,
+                depth=depth,
+                runtime=runtime,
+                delta=args.delta,
+            )
+    finally:
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        await runtime.close()
+
+    return {
+        "depth": depth,
+        "mode": args.mode,
+        "streaming": args.streaming,
+        "wall_seconds": round(elapsed, 3),
+        "total_leads": report.total_leads,
+        "leads_per_second": round(report.total_leads / elapsed, 2) if elapsed else 0.0,
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+        "stage_seconds": dict(report.stage_timings),
+        "llm_calls": {agent_id: m.calls for agent_id, m in models.items()},
+        "tokens": report.token_usage.total_tokens,
+        "tokens_by_agent": {
+            agent_id: item.input_tokens + item.output_tokens
+            for agent_id, item in report.token_usage.by_agent.items()
+        },
+        "search_calls": backend.search_calls,
+        "extract_calls": backend.extract_calls,
+        "truncated_stages": report.truncated_stages,
+        "trace_filepath": report.trace_filepath,
+    }
+
+
+def print_results(results: list[dict]) -> None:
+    print(
+        f"\n{'深度':<10}{'耗时s':>9}{'线索':>7}{'线索/s':>9}{'峰值MB':>9}"
+        f"{'LLM':>7}{'tokens':>10}{'搜索':>7}{'提取':>7}  截断阶段"
+    )
+    for r in results:
+        print(
+            f"{r['depth']:<10}{r['wall_seconds']:>9.2f}{r['total_leads']:>7}"
+            f"{r['leads_per_second']:>9.2f}{r['peak_memory_mb']:>9.1f}"
+            f"{sum(r['llm_calls'].values()):>7}{r['tokens']:>10}{r['search_calls']:>7}"
+            f"{r['extract_calls']:>7}  {','.join(r['truncated_stages']) or '-'}"
+        )
+
+    stages = [s for s in STAGE_LABELS if any(s in r["stage_seconds"] for r in results)]
+    print(f"\n{'阶段耗时s':<12}" + "".join(f"{r['depth']:>10}" for r in results))
+    for stage in stages:
+        print(
+            f"{stage:<12}"
+            + "".join(f"{r['stage_seconds'].get(stage, 0.0):>10.2f}" for r in results)
+        )
+
+    agent_ids = list(results[0]["llm_calls"]) if results else []
+    print(f"\n{'LLM 调用':<22}" + "".join(f"{r['depth']:>10}" for r in results))
+    for agent_id in agent_ids:
+        print(f"{agent_id:<22}" + "".join(f"{r['llm_calls'][agent_id]:>10}" for r in results))
+
+    print(f"\n{'tokens':<22}" + "".join(f"{r['depth']:>10}" for r in results))
+    for agent_id in agent_ids:
+        print(
+            f"{agent_id:<22}"
+            + "".join(f"{r['tokens_by_agent'].get(agent_id, 0):>10}" for r in results)
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="离线端到端流水线基准")
+    parser.add_argument(
+        "--depth",
+        nargs="+",
+        default=["quick", "standard", "deep"],
+        choices=["quick", "standard", "deep"],
+        help="要运行的深度预设",
+    )
+    parser.add_argument("--mode", default="full", choices=["broad", "full"], help="流水线模式")
+    parser.add_argument("--streaming", action="store_true", help="启用流式流水线（仅 full 模式）")
+    parser.add_argument("--product", default="碳化硅二极管 SiC Schottky，用于光伏逆变器和充电桩")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="每次模型调用的平均延迟（秒）")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="每次搜索 / 提取的延迟（秒）")
+    parser.add_argument("--results-per-query", type=int, default=10, help="每次搜索返回的结果数")
+    parser.add_argument("--pool-size", type=int, default=2000, help="假公司池大小（越小重复率越高）")
+    parser.add_argument("--leads-per-scan", type=int, default=15, help="每个搜索任务最多产出的线索数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--replay",
+        help="录制的响应 JSON: {agent_id: [{\"content\": [...]}, ...]}，按顺序循环回放",
+    )
+    parser.add_argument(
+        "--raw-tool-results",
+        action="store_true",
+        help="关闭工具结果紧凑编码（对比 token 用量）",
+    )
+    parser.add_argument(
+        "--lead-store",
+        help="启用跨运行线索库并使用该 SQLite 路径（默认关闭，各次运行互不影响）",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="增量运行（需配合 --lead-store，对比与上次运行的差异）",
+    )
+    parser.add_argument("--trace", action="store_true", help="启用运行追踪，导出 span JSONL")
+    parser.add_argument("--json", dest="json_path", help="把结果写入 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="显示流水线日志")
+    args = parser.parse_args()
+
+    replay: dict = {}
+    if args.replay:
+        with open(args.replay, "r", encoding="utf-8") as f:
+            replay = json.load(f)
+    if args.trace:
+        os.environ["INSIGHTFLOW_TRACE"] = "1"
+
+    output_root = tempfile.mkdtemp(prefix="insightflow_bench_")
+    _override_config("sales_leads.pipeline.mode", args.mode)
+    _override_config("sales_leads.pipeline.streaming.enabled", args.streaming)
+    _override_config("sales_leads.output.output_dir", f"{output_root}/sales_leads")
+    _override_config("sales_leads.output.runs_dir", f"{output_root}/runs")
+    _override_config("model.cache.enabled", False)
+    _override_config("search.cache.enabled", False)
+    _override_config("sales_leads.lead_store.enabled", bool(args.lead_store))
+    if args.lead_store:
+        _override_config("sales_leads.lead_store.path", args.lead_store)
+    if args.raw_tool_results:
+        _override_config("sales_leads.tool_results.default.compact", False)
+        _override_config("sales_leads.tool_results.agents", {})
+
+    print(
+        f"[Bench] 模式 {args.mode}{'（流式）' if args.streaming else ''}，"
+        f"LLM 延迟 {args.llm_latency}s，搜索延迟 {args.search_latency}s，输出目录 {output_root}"
+    )
+
+    async def _run_all() -> list[dict]:
+        return [await run_preset(depth, args, replay) for depth in args.depth]
+
+    results = asyncio.run(_run_all())
+    print_results(results)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n[Bench] 结果已写入 {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+InsightFlow 基准测试 - 工具结果紧凑编码
+文件路径: benchmarks/bench_tool_results.py
+
+用历史运行记录下的真实搜索结果（搜索缓存 SQLite，search.cache.path）
+对比原始输出（缩进 JSON）和各 Agent 紧凑编码后的大小，
+输出字符数、估算 token 数、缩减比例和去重掉的结果条数。
+
+用法:
+    python benchmarks/bench_tool_results.py
+    python benchmarks/bench_tool_results.py --cache-db outputs/cache/search_cache.db --limit 200
+    python benchmarks/bench_tool_results.py --input results.json   # [[{title,url,snippet}, ...], ...]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agents import _AGENT_SPECS  # noqa: E402
+from src.config import Config  # noqa: E402
+from src.token_meter import estimate_tokens  # noqa: E402
+from src.tools.result_encoding import encode_tool_text, get_result_settings  # noqa: E402
+
+
+def load_cached_results(path: str, limit: int) -> list[list[dict]]:
+    """从搜索缓存读取搜索结果列表（跳过空结果和非搜索条目）。"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT payload FROM search_cache ORDER BY created_at DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    finally:
+        conn.close()
+    samples = []
+    for (payload,) in rows:
+        data = json.loads(payload)
+        if isinstance(data, list) and data and all(
+            isinstance(item, dict) and "url" in item for item in data
+        ):
+            samples.append(data)
+    return samples
+
+
+def measure(samples: list[list[dict]], agent_id: str) -> dict:
+    settings = get_result_settings(agent_id)
+    raw_chars = compact_chars = raw_tokens = compact_tokens = 0
+    results = kept = 0
+    for sample in samples:
+        raw = json.dumps(sample, ensure_ascii=False, indent=2)
+        compact = encode_tool_text(raw, settings) if settings.get("compact", True) else raw
+        raw_chars += len(raw)
+        compact_chars += len(compact)
+        raw_tokens += estimate_tokens(raw)
+        compact_tokens += estimate_tokens(compact)
+        results += len(sample)
+        encoded = json.loads(compact)
+        kept += len(encoded["rows"]) if isinstance(encoded, dict) else len(encoded)
+    return {
+        "agent_id": agent_id,
+        "raw_chars": raw_chars,
+        "compact_chars": compact_chars,
+        "raw_tokens": raw_tokens,
+        "compact_tokens": compact_tokens,
+        "reduction": 1 - compact_tokens / raw_tokens if raw_tokens else 0.0,
+        "results": results,
+        "dropped": results - kept,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="工具结果紧凑编码缩减比例")
+    parser.add_argument(
+        "--cache-db",
+        default=Config().get("search.cache.path", "outputs/cache/search_cache.db"),
+        help="搜索缓存 SQLite 路径",
+    )
+    parser.add_argument("--input", help="搜索结果 JSON 文件（列表的列表），优先于 --cache-db")
+    parser.add_argument("--limit", type=int, default=500, help="最多读取的缓存条目数")
+    parser.add_argument(
+        "--agents",
+        nargs="+",
+        default=[a for a, spec in _AGENT_SPECS.items() if spec[3] == "search"],
+        help="要对比的 Agent",
+    )
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            samples = json.load(f)
+    elif os.path.exists(args.cache_db):
+        samples = load_cached_results(args.cache_db, args.limit)
+    else:
+        print(f"[Bench] 搜索缓存不存在: {args.cache_db}（先运行一次启用缓存的搜索，或用 --input）")
+        return
+    if not samples:
+        print("[Bench] 没有可用的搜索结果样本")
+        return
+
+    print(f"[Bench] 样本: {len(samples)} 次搜索，{sum(len(s) for s in samples)} 条结果")
+    print(
+        f"\n{'Agent':<22}{'原始字符':>10}{'紧凑字符':>10}{'原始tok':>10}"
+        f"{'紧凑tok':>10}{'缩减':>8}{'去重条数':>9}"
+    )
+    for agent_id in args.agents:
+        r = measure(samples, agent_id)
+        print(
+            f"{agent_id:<22}{r['raw_chars']:>10}{r['compact_chars']:>10}"
+            f"{r['raw_tokens']:>10}{r['compact_tokens']:>10}"
+            f"{r['reduction']:>8.1%}{r['dropped']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
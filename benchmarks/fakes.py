@@ -0,0 +1,480 @@
+"""
+InsightFlow 基准测试 - 离线假模型与假搜索后端
+文件路径: benchmarks/fakes.py
+
+不调用 DashScope、不访问网络，用确定性的假组件驱动完整流水线：
+
+  - FakeChatModel: 替代 OpenAIChatModel，按 Agent 角色合成工具调用轨迹
+    （先调用 web_search，再调用 generate_response 输出结构化结果），
+    也可回放录制的响应；每次调用按配置的延迟 sleep
+  - FakeSearchBackend: 替代 web_search / web_extract 和 broad 扩量用的
+    search_duckduckgo，从固定的公司池中按查询哈希返回结果
+
+同样的参数和种子总是产生同样的调用序列，耗时差异只来自流水线本身。
+"""
+
+import asyncio
+import json
+import random
+import zlib
+from typing import Any, Optional, Type
+
+from agentscope.message import TextBlock
+from agentscope.model import ChatModelBase, ChatResponse
+from agentscope.tool import Toolkit, ToolResponse
+from pydantic import BaseModel
+
+from src.agents.llm_cache import ChatUsage
+
+
+def _stable_hash(text: str) -> int:
+    """跨进程稳定的哈希（内置 hash 对 str 有随机盐）。"""
+    return zlib.crc32(text.encode("utf-8"))
+
+
+# ================================================================
+#  假搜索后端
+# ================================================================
+
+_CITIES = ["深圳", "苏州", "杭州", "合肥", "成都", "武汉", "西安", "宁波", "无锡", "东莞"]
+_WORDS = ["华", "泰", "科", "创", "联", "恒", "达", "盛", "博", "新", "源", "智"]
+_INDUSTRIES = ["新能源", "光伏", "储能", "电子", "汽车零部件", "电力设备", "半导体", "工业控制"]
+_SNIPPETS = ["年度采购公告", "扩产项目环评公示", "招聘硬件工程师", "完成 B 轮融资", "参展行业展会"]
+
+
+class FakeSearchBackend:
+    """确定性的假搜索 / 网页提取后端
+
+    公司池大小决定跨查询的重复率：池越小，不同查询返回同一家公司的概率越高，
+    去重逻辑的负载越接近真实情况。
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        results_per_query: int = 10,
+        pool_size: int = 2000,
+        extract_chars: int = 3000,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.results_per_query = results_per_query
+        self.pool_size = pool_size
+        self.extract_chars = extract_chars
+        self.seed = seed
+        self.search_calls = 0
+        self.extract_calls = 0
+
+    def company(self, index: int) -> tuple[str, str, str]:
+        """公司池中第 index 家: (公司名, 官网域名, 行业)"""
+        rng = random.Random(self.seed * 1_000_003 + index)
+        name = (
+            f"{rng.choice(_CITIES)}{rng.choice(_WORDS)}{rng.choice(_WORDS)}"
+            f"{rng.choice(_INDUSTRIES)}科技{index}有限公司"
+        )
+        return name, f"www.c{index:05d}-example.com.cn", rng.choice(_INDUSTRIES)
+
+    async def search(
+        self,
+        query: str,
+        max_results: int = 30,
+        region: str = "cn-zh",
+    ) -> list[dict]:
+        """与 search_duckduckgo 签名和返回格式一致: [{"title", "url", "snippet"}]"""
+        self.search_calls += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        rng = random.Random(self.seed ^ _stable_hash(query))
+        count = min(max_results, self.results_per_query)
+        results = []
+        for index in rng.sample(range(self.pool_size), min(count, self.pool_size)):
+            name, domain, industry = self.company(index)
+            # 同一公司在不同结果中写法不同（带 / 不带法律后缀），用于检验实体消歧
+            if rng.random() < 0.4:
+                name = name.replace("有限公司", "")
+            results.append(
+                {
+                    "title": f"{name} - {rng.choice(_SNIPPETS)}",
+                    "url": f"https://{domain}/news/{_stable_hash(query) % 10000}",
+                    "snippet": f"{name}（{industry}）{rng.choice(_SNIPPETS)}，与「{query}」相关。",
+                }
+            )
+        return results
+
+    async def extract(self, url: str) -> str:
+        self.extract_calls += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        sentence = f"{url} 页面正文：公司主营业务、产品线与近期采购动态。"
+        return (sentence * (self.extract_chars // len(sentence) + 1))[: self.extract_chars]
+
+    def build_toolkit(self) -> Toolkit:
+        """注册与真实后端同名、同输出格式的 web_search / web_extract 工具。"""
+        toolkit = Toolkit()
+        backend = self
+
+        async def web_search(query: str, max_results: int = 30) -> ToolResponse:
+            """搜索互联网获取信息。返回包含标题、URL和摘要的搜索结果列表。
+
+            Args:
+                query (str):
+                    搜索关键词，建议2-6个词。
+                max_results (int):
+                    返回结果数量，最多50条。
+            """
+            results = await backend.search(query, max_results)
+            return ToolResponse(
+                content=[
+                    TextBlock(
+                        type="text",
+                        text=json.dumps(results, ensure_ascii=False, indent=2),
+                    ),
+                ],
+            )
+
+        async def web_extract(url: str) -> ToolResponse:
+            """提取指定网页的正文内容。用于获取搜索结果中某个页面的详细信息。
+
+            Args:
+                url (str):
+                    要提取内容的网页 URL。
+            """
+            result = {"url": url, "content": await backend.extract(url)}
+            return ToolResponse(
+                content=[
+                    TextBlock(
+                        type="text",
+                        text=json.dumps(result, ensure_ascii=False, indent=2),
+                    ),
+                ],
+            )
+
+        toolkit.register_tool_function(web_search)
+        toolkit.register_tool_function(web_extract)
+        return toolkit
+
+
+# ================================================================
+#  假模型
+# ================================================================
+
+# 每个 Agent 在输出结构化结果前调用 web_search 的轮数和每轮调用数
+_DEFAULT_SEARCH_ROUNDS: dict[str, tuple[int, int]] = {
+    "product_profiler": (1, 1),
+    "sales_orchestrator": (0, 0),
+    "market_scanner": (1, 2),
+    "lead_qualifier": (1, 1),
+    "contact_enrichment": (2, 1),
+    "lead_report_writer": (0, 0),
+}
+
+_STRATEGIES = [
+    "competitor_customer",
+    "industry_event",
+    "hiring_signal",
+    "funding_news",
+    "direct_need",
+]
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") for block in content if isinstance(block, dict)
+        )
+    return ""
+
+
+def _load_json(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        return None
+
+
+def _search_rows(data: Any) -> list[dict]:
+    """搜索结果的行: 兼容原始列表和紧凑编码的 {"fields", "rows"} 两种格式。"""
+    if isinstance(data, dict) and isinstance(data.get("rows"), list):
+        fields = data.get("fields") or []
+        return [dict(zip(fields, row)) for row in data["rows"] if isinstance(row, list)]
+    if isinstance(data, list):
+        return [row for row in data if isinstance(row, dict)]
+    return []
+
+
+class FakeChatModel(ChatModelBase):
+    """按 Agent 角色合成 ReAct 工具调用轨迹的确定性假模型
+
+    每次调用先找到本轮任务的输入消息（最后一条非工具、非提示的消息），
+    统计其后已经发生的工具调用轮数：不足 search_rounds 时发出 web_search
+    调用，否则调用 generate_response 并附带一段文本（ReActAgent 据此结束循环）。
+
+    传入 trace 时按顺序循环回放录制的响应（格式同 LLM 缓存中的
+    {"content": [...]}），不再合成。
+    """
+
+    def __init__(
+        self,
+        agent_id: str,
+        latency: float = 0.0,
+        jitter: float = 0.5,
+        seed: int = 0,
+        search_rounds: Optional[tuple[int, int]] = None,
+        trace: Optional[list[dict]] = None,
+        plan_tasks: int = 64,
+        leads_per_scan: int = 15,
+    ):
+        super().__init__(f"fake-{agent_id}", stream=False)
+        self.agent_id = agent_id
+        self.latency = latency
+        self.jitter = jitter
+        self.search_rounds = search_rounds or _DEFAULT_SEARCH_ROUNDS.get(agent_id, (0, 0))
+        self.trace = trace or []
+        self.plan_tasks = plan_tasks
+        self.leads_per_scan = leads_per_scan
+        self.calls = 0
+        self._rng = random.Random(seed ^ _stable_hash(agent_id))
+
+    async def __call__(
+        self,
+        messages: list[dict],
+        tools: Optional[list[dict]] = None,
+        tool_choice: Optional[str] = None,
+        structured_model: Optional[Type[BaseModel]] = None,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        self.calls += 1
+        call_id = self.calls
+        delay = self.latency * (1 + self.jitter * (2 * self._rng.random() - 1))
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if self.trace:
+            content = self.trace[(call_id - 1) % len(self.trace)].get("content", [])
+        else:
+            content = self._synthesize(messages, tool_choice, call_id)
+
+        # 粗略按 4 字节 / token 估算，便于离线观察 token 用量
+        input_size = len(json.dumps(messages, ensure_ascii=False).encode("utf-8"))
+        output_size = len(json.dumps(content, ensure_ascii=False).encode("utf-8"))
+        return ChatResponse(
+            content=content,
+            usage=ChatUsage(
+                input_tokens=input_size // 4,
+                output_tokens=output_size // 4,
+                time=max(delay, 0.0),
+            ),
+        )
+
+    # ── 轨迹合成 ──────────────────────────────────────────────
+
+    def _synthesize(
+        self,
+        messages: list[dict],
+        tool_choice: Optional[str],
+        call_id: int,
+    ) -> list[dict]:
+        if tool_choice == "none":
+            return [{"type": "text", "text": "已完成。"}]
+
+        input_index = 0
+        for i in range(len(messages) - 1, 0, -1):
+            message = messages[i]
+            if message.get("role") in ("tool", "system") or message.get("tool_calls"):
+                continue
+            if _message_text(message).startswith("<system-hint>"):
+                continue
+            input_index = i
+            break
+        input_text = _message_text(messages[input_index])
+        after = messages[input_index + 1 :]
+        rounds_done = sum(1 for m in after if m.get("tool_calls"))
+        tool_texts = [_message_text(m) for m in after if m.get("role") == "tool"]
+
+        rounds, per_round = self.search_rounds
+        if rounds_done < rounds and per_round > 0:
+            query = self._query_for(input_text)
+            return [
+                {
+                    "type": "tool_use",
+                    "id": f"{self.agent_id}-{call_id}-{k}",
+                    "name": "web_search",
+                    "input": {"query": f"{query} {rounds_done}-{k}", "max_results": 20},
+                }
+                for k in range(per_round)
+            ]
+
+        return [
+            {"type": "text", "text": "已整理为结构化结果。"},
+            {
+                "type": "tool_use",
+                "id": f"{self.agent_id}-{call_id}-final",
+                "name": "generate_response",
+                "input": self._structured_output(input_text, tool_texts),
+            },
+        ]
+
+    def _query_for(self, input_text: str) -> str:
+        data = _load_json(input_text)
+        if isinstance(data, dict):
+            for key in ("query_zh", "company_name", "product_name"):
+                if data.get(key):
+                    return str(data[key])
+        return input_text[:30]
+
+    def _structured_output(self, input_text: str, tool_texts: list[str]) -> dict:
+        data = _load_json(input_text)
+        data = data if isinstance(data, dict) else {}
+        builder = {
+            "product_profiler": self._product_profile,
+            "sales_orchestrator": self._search_plan,
+            "market_scanner": self._scan_result,
+            "lead_qualifier": self._qualification,
+            "contact_enrichment": self._enrichment,
+            "lead_report_writer": self._report,
+        }.get(self.agent_id)
+        return builder(input_text, data, tool_texts) if builder else {}
+
+    @staticmethod
+    def _product_profile(input_text: str, data: dict, tool_texts: list[str]) -> dict:
+        text = input_text.split("产品信息：")[-1].strip()
+        name = text.split("，")[0].split(",")[0][:40] or "示例产品"
+        return {
+            "product_name": name,
+            "description": f"{name}，面向工业与能源客户的核心器件。",
+            "core_features": ["高效率", "高可靠性", "国产替代"],
+            "target_users": ["硬件研发负责人", "采购经理"],
+            "use_cases": ["光伏逆变器", "充电桩", "储能变流器"],
+            "competitors": [{"name": "海外竞品 A"}, {"name": "国内竞品 B"}],
+            "ideal_buyer_persona": "中大型制造企业的研发与采购团队",
+        }
+
+    def _search_plan(self, input_text: str, data: dict, tool_texts: list[str]) -> dict:
+        product = str(data.get("product_name") or "示例产品")
+        tasks = []
+        for i in range(self.plan_tasks):
+            industry = _INDUSTRIES[i % len(_INDUSTRIES)]
+            tasks.append(
+                {
+                    "task_id": f"T{i + 1:03d}",
+                    "strategy": _STRATEGIES[i % len(_STRATEGIES)],
+                    "query_zh": f"{industry} {product} 采购 {i + 1}",
+                    "query_en": f"{industry} {product} supplier {i + 1}",
+                    "expected_result": f"{industry}行业潜在客户名单",
+                }
+            )
+        return {
+            "product_name": product,
+            "product_summary": f"{product} 产品摘要",
+            "value_proposition": "降低系统损耗，缩短交付周期",
+            "icp": {
+                "target_industries": _INDUSTRIES[:4],
+                "company_size": ["medium", "large"],
+                "pain_points": ["能效", "供应链稳定"],
+            },
+            "search_tasks": tasks,
+        }
+
+    def _scan_result(self, input_text: str, data: dict, tool_texts: list[str]) -> dict:
+        leads: list[dict] = []
+        seen: set[str] = set()
+        sizes = ["small", "medium", "large", "unknown"]
+        for text in tool_texts:
+            for row in _search_rows(_load_json(text)):
+                if "title" not in row:
+                    continue
+                name = str(row["title"]).split(" - ")[0].strip()
+                if not name or name in seen:
+                    continue
+                seen.add(name)
+                url = str(row.get("url", ""))
+                leads.append(
+                    {
+                        "company_name": name,
+                        "website": "/".join(url.split("/")[:3]),
+                        "industry": _INDUSTRIES[_stable_hash(name) % len(_INDUSTRIES)],
+                        "estimated_size": sizes[_stable_hash(name) % len(sizes)],
+                        "match_signals": [str(row.get("snippet", ""))],
+                        "source_url": url,
+                    }
+                )
+                if len(leads) >= self.leads_per_scan:
+                    break
+            if len(leads) >= self.leads_per_scan:
+                break
+        return {
+            "search_strategy": str(data.get("strategy", "")),
+            "search_queries_used": [str(data.get("query_zh", ""))],
+            "leads_found": leads,
+            "total_found": len(leads),
+        }
+
+    @staticmethod
+    def _qualification(input_text: str, data: dict, tool_texts: list[str]) -> dict:
+        qualified = []
+        counts = {"hot": 0, "warm": 0, "cold": 0}
+        for lead in data.get("raw_leads") or []:
+            name = str(lead.get("company_name", ""))
+            h = _stable_hash(name)
+            scores = [(h >> (8 * k)) % 26 for k in range(4)]
+            total = sum(scores)
+            priority = "hot" if total > 70 else "warm" if total >= 40 else "cold"
+            counts[priority] += 1
+            qualified.append(
+                {
+                    "company_name": name,
+                    "website": lead.get("website", ""),
+                    "industry": lead.get("industry", ""),
+                    "estimated_size": lead.get("estimated_size", "unknown"),
+                    "qualification_score": total,
+                    "priority": priority,
+                    "bant_assessment": {
+                        dim: {"score": score, "reason": f"{dim} 评估依据"}
+                        for dim, score in zip(
+                            ("budget", "authority", "need", "timing"), scores
+                        )
+                    },
+                    "product_fit": "high" if total > 60 else "medium",
+                    "recommended_approach": "通过官网联系采购部",
+                    "talking_points": ["国产替代", "交付周期"],
+                }
+            )
+        return {
+            "qualified_leads": qualified,
+            "summary": {
+                "total_evaluated": len(qualified),
+                "hot_leads": counts["hot"],
+                "warm_leads": counts["warm"],
+                "cold_leads": counts["cold"],
+            },
+        }
+
+    @staticmethod
+    def _enrichment(input_text: str, data: dict, tool_texts: list[str]) -> dict:
+        name = str(data.get("company_name", ""))
+        domain = str(data.get("website", "")).split("//")[-1] or "example.cn"
+        return {
+            "company_name": name,
+            "contacts": [
+                {
+                    "name": f"联系人{_stable_hash(name) % 100}",
+                    "title": "采购经理",
+                    "department": "采购部",
+                    "email": f"purchase@{domain}",
+                    "source": f"https://{domain}/contact",
+                    "confidence": "medium",
+                }
+            ],
+            "company_contact": {
+                "general_email": f"info@{domain}",
+                "contact_page": f"https://{domain}/contact",
+            },
+        }
+
+    @staticmethod
+    def _report(input_text: str, data: dict, tool_texts: list[str]) -> dict:
+        body = "\n".join(f"- 要点 {i}" for i in range(30))
+        return {"report_markdown": f"# 销售线索报告\n\n## 概览\n\n{body}\n"}
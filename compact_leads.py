@@ -0,0 +1,51 @@
+"""
+InsightFlow 销售线索 - 合并运行结果为分区数据集
+文件路径: compact_leads.py
+
+把 outputs/sales_leads 下每次运行的 .parquet（以及历史 .jsonl）合并到
+按产品、日期分区的 Parquet 数据集（product=<产品>/date=<YYYY-MM-DD>/part-0.parquet），
+供分析任务直接读取嵌套的联系人 / BANT 列。需要 pip install pyarrow。
+
+用法:
+    python compact_leads.py
+    python compact_leads.py --source outputs/sales_leads --dataset outputs/lead_dataset
+    python compact_leads.py --delete-sources      # 合并后删除已合并的运行文件
+"""
+
+import argparse
+import sys
+
+from src.config import Config
+from src.lead_parquet import compact_outputs, pyarrow_available
+
+
+if __name__ == "__main__":
+    config = Config()
+    parser = argparse.ArgumentParser(
+        description="合并每次运行的线索文件为按产品 / 日期分区的 Parquet 数据集"
+    )
+    parser.add_argument(
+        "--source",
+        default=config.output_dir,
+        help="运行输出目录（默认 sales_leads.output.output_dir）",
+    )
+    parser.add_argument(
+        "--dataset",
+        default=str(config.get("sales_leads.output.dataset_dir", "outputs/lead_dataset")),
+        help="分区数据集目录（默认 sales_leads.output.dataset_dir）",
+    )
+    parser.add_argument(
+        "--delete-sources",
+        action="store_true",
+        help="合并成功后删除已合并的 .parquet / .jsonl 运行文件",
+    )
+    args = parser.parse_args()
+
+    if not pyarrow_available():
+        print("需要 pyarrow: pip install pyarrow")
+        sys.exit(1)
+    stats = compact_outputs(args.source, args.dataset, delete_sources=args.delete_sources)
+    print(
+        f"合并完成: 读取 {stats['files']} 个运行文件，"
+        f"更新 {stats['partitions']} 个分区，共 {stats['rows']} 行"
+    )
@@ -6,6 +6,9 @@ InsightFlow 销售线索 - CLI 入口
     python run_cli.py "碳化硅二极管"
     python run_cli.py "AgentScope" --depth quick
     python run_cli.py "SiC MOSFET 模块" --depth deep
+    python run_cli.py --resume 20250101_120000_abc123
+    python run_cli.py "碳化硅二极管" --depth quick --trace
+    python run_cli.py "碳化硅二极管" --delta      # 只评估新公司 / 过期结果
 """
 
 import argparse
@@ -19,6 +22,7 @@ from agentscope.hooks._studio_hooks import as_studio_forward_message_pre_print_h
 
 from src.config import Config
 from src.orchestrator_sales import run_sales_lead_search
+from src.runtime import get_runtime, shutdown_runtime
 
 
 def init_agentscope_runtime() -> None:
@@ -73,21 +77,38 @@ def print_model_config() -> None:
     print("=" * 60 + "\n")
 
 
-async def main(product: str, depth: str) -> None:
+async def main(
+    product: str,
+    depth: str,
+    resume_run_id: str | None = None,
+    delta: bool = False,
+) -> None:
     print(f"\n{'=' * 60}")
     print(f"  InsightFlow - 销售线索获取")
-    print(f"  产品: {product}")
-    print(f"  深度: {depth}")
+    if resume_run_id:
+        print(f"  恢复运行: {resume_run_id}")
+    else:
+        print(f"  产品: {product}")
+        print(f"  深度: {depth}")
+        if delta:
+            print("  模式: 增量")
     print(f"{'=' * 60}\n")
 
-    report = await run_sales_lead_search(
-        product_input=product,
-        depth=depth,
-    )
+    try:
+        report = await run_sales_lead_search(
+            product_input=product,
+            depth=depth,
+            resume_run_id=resume_run_id,
+            delta=delta,
+            runtime=get_runtime(),
+        )
+    finally:
+        await shutdown_runtime()
 
     print(f"\n{'=' * 60}")
     print(f"  结果汇总")
     print(f"{'=' * 60}")
+    print(f"  运行 ID: {report.run_id}")
     print(f"  产品: {report.product_name}")
     print(f"  线索总数: {report.total_leads}")
     print(f"  Hot:  {report.hot_leads}")
@@ -96,6 +117,33 @@ async def main(product: str, depth: str) -> None:
     print(f"  耗时: {report.execution_time_seconds:.1f} 秒")
     print(f"  报告: {report.report_filepath}")
     print(f"  CSV:  {report.csv_filepath}")
+    if report.jsonl_filepath:
+        print(f"  JSONL: {report.jsonl_filepath}")
+    if report.parquet_filepath:
+        print(f"  Parquet: {report.parquet_filepath}")
+    if report.truncated_stages:
+        print(f"  超时截断阶段: {', '.join(report.truncated_stages)}")
+    if report.stage_timings:
+        timings = ", ".join(f"{k} {v:.1f}s" for k, v in report.stage_timings.items())
+        print(f"  阶段耗时: {timings}")
+    usage = report.token_usage
+    if usage.calls:
+        budget = f" / 预算 {usage.budget}" if usage.budget else ""
+        print(
+            f"  Token 用量: {usage.total_tokens}{budget}"
+            f"（输入 {usage.input_tokens}，输出 {usage.output_tokens}，{usage.calls} 次调用）"
+        )
+    if usage.degraded_stages:
+        print(f"  预算降级阶段: {', '.join(usage.degraded_stages)}")
+    if report.delta is not None:
+        d = report.delta
+        print(
+            f"  增量: 新公司 {len(d.new_leads)}，重新评估 {len(d.refreshed_leads)}，"
+            f"复用 {d.unchanged_count}，沿用 {d.carried_over_count}"
+            f"（上次运行 {d.previous_run_id or '无'}）"
+        )
+    if report.trace_filepath:
+        print(f"  追踪: {report.trace_filepath}")
     print(f"{'=' * 60}\n")
 
 
@@ -103,6 +151,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="InsightFlow 销售线索获取（卖方视角）")
     parser.add_argument(
         "product",
+        nargs="?",
+        default="",
         help="你正在销售的产品名称或描述（用于寻找潜在采购客户）",
     )
     parser.add_argument(
@@ -111,11 +161,37 @@ if __name__ == "__main__":
         default="standard",
         help="搜索深度 (默认: standard)",
     )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="从指定运行的检查点恢复，跳过已完成的阶段和搜索任务",
+    )
+    parser.add_argument(
+        "--bypass-llm-cache",
+        action="store_true",
+        help="不读取 LLM 响应缓存（仍写入新结果），需先在配置中启用 model.cache",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="记录阶段 / Agent / 模型 / 工具调用的 span，导出为报告旁的 .trace.jsonl",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="增量运行：只评估线索库中没有或结果已过期的公司，报告附本次新增",
+    )
     args = parser.parse_args()
+    if args.bypass_llm_cache:
+        os.environ["INSIGHTFLOW_LLM_CACHE_BYPASS"] = "1"
+    if args.trace:
+        os.environ["INSIGHTFLOW_TRACE"] = "1"
+    if not args.product and not args.resume:
+        parser.error("需要提供产品名称，或使用 --resume <run_id> 恢复运行")
 
     try:
         print_model_config()
-        asyncio.run(main(args.product, args.depth))
+        asyncio.run(main(args.product, args.depth, args.resume, args.delta))
     except KeyboardInterrupt:
         print("\n已取消")
         sys.exit(0)
@@ -7,15 +7,20 @@ InsightFlow 销售线索模块 - Agent 工厂
 """
 
 from collections.abc import AsyncGenerator
+from typing import Optional
 
 from agentscope.agent import ReActAgent
 from agentscope.formatter import OpenAIChatFormatter
-from agentscope.memory import InMemoryMemory
-from agentscope.message import TextBlock
-from agentscope.model import OpenAIChatModel
+from agentscope.message import Msg, TextBlock
+from agentscope.model import ChatModelBase, OpenAIChatModel
 from agentscope.tool import Toolkit, ToolResponse
 
+from src.agents.llm_cache import with_response_cache
+from src.agents.memory import create_memory
 from src.config import Config
+from src.token_meter import MeteredChatModel, with_token_meter
+from src.tools.result_encoding import build_result_encoder
+from src.tracing import Span, trace_span, with_tracing
 from src.prompts.sales_prompts import (
     SYS_PROMPT_PRODUCT_PROFILER,
     SYS_PROMPT_SALES_ORCHESTRATOR,
@@ -90,7 +95,7 @@ def _create_model(model_name: str) -> OpenAIChatModel:
     )
 
 
-def _clone_toolkit(source: Toolkit) -> Toolkit:
+def _clone_toolkit(source: Toolkit, agent_id: str = "") -> Toolkit:
     """克隆 Toolkit，为每个 Agent 创建独立的工具集实例。
 
     ReActAgent 使用 structured_model 时会在共享 Toolkit 上注册
@@ -101,16 +106,23 @@ def _clone_toolkit(source: Toolkit) -> Toolkit:
     本函数通过重新注册每个工具函数到新的 Toolkit 实例来解决此问题。
     使用 CorrectedToolkit 子类来拦截 Qwen 模型的幻觉工具调用
     （如 _tools、required），返回有针对性的纠错信息。
+    给定 agent_id 时按 sales_leads.tool_results 为每个工具挂上
+    紧凑编码后处理，缩小进入 memory 的工具结果。
 
     Args:
         source: 要克隆的源 Toolkit
+        agent_id: 工具结果编码配置所属的 Agent，为空时不改写结果
 
     Returns:
         CorrectedToolkit 实例，包含与源相同的工具函数 + 幻觉工具纠错
     """
+    encoder = build_result_encoder(agent_id) if agent_id else None
     clone = CorrectedToolkit()
     for tool in source.tools.values():
-        clone.register_tool_function(tool.original_func)
+        clone.register_tool_function(
+            tool.original_func,
+            postprocess_func=encoder or tool.postprocess_func,
+        )
     return clone
 
 
@@ -172,12 +184,148 @@ class CorrectedToolkit(Toolkit):
                     ],
                 ),
             )
-        return await super().call_tool_function(tool_call)
+        tool_input = tool_call.get("input")
+        if not isinstance(tool_input, dict):
+            tool_input = {}
+        span = trace_span(
+            "tool",
+            tool_name,
+            label=str(tool_input.get("query") or tool_input.get("url") or "")[:80],
+        )
+        try:
+            stream = await super().call_tool_function(tool_call)
+        except BaseException as e:
+            span.finish(e)
+            raise
+        if not isinstance(span, Span):
+            return stream
+        return _traced_tool_stream(stream, span)
+
+
+async def _traced_tool_stream(
+    stream: AsyncGenerator[ToolResponse, None],
+    span: Span,
+) -> AsyncGenerator[ToolResponse, None]:
+    """工具结果流消费完才结束 tool span。"""
+    try:
+        async for chunk in stream:
+            yield chunk
+    except BaseException as e:
+        span.finish(e)
+        raise
+    span.finish()
+
+
+class TracedReActAgent(ReActAgent):
+    """每次调用记录一个 agent span 的 ReActAgent（未启用追踪时与父类完全一致）"""
+
+    async def __call__(self, *args, **kwargs) -> Msg:
+        with trace_span("agent", self.name) as span:
+            msg = await super().__call__(*args, **kwargs)
+            if isinstance(msg.metadata, dict) and msg.metadata.get("_is_interrupted"):
+                span.set(interrupted=True)
+            return msg
+
+
+# Agent 规格: agent_id -> (名称, 系统提示词, max_iters, 使用的工具集)
+#   工具集: "search" 使用 search_toolkit，"file" 使用 file_toolkit
+_AGENT_SPECS: dict[str, tuple[str, str, int, str]] = {
+    # Sales Orchestrator: 分析 ICP + 制定搜索策略
+    # 虽然提示词说不需要搜索，但提供 toolkit 让 LLM 正确理解工具调用协议
+    "sales_orchestrator": (
+        "Sales_Orchestrator",
+        SYS_PROMPT_SALES_ORCHESTRATOR,
+        3,
+        "search",
+    ),
+    # Product Profiler: 搜索 + 分析产品
+    "product_profiler": (
+        "Product_Profiler",
+        SYS_PROMPT_PRODUCT_PROFILER,
+        5,
+        "search",
+    ),
+    # Market Scanner: 并行搜索潜在客户
+    "market_scanner": (
+        "Market_Scanner",
+        SYS_PROMPT_MARKET_SCANNER,
+        4,
+        "search",
+    ),
+    # Lead Qualifier: BANT 评估 (可搜索补充信息)
+    "lead_qualifier": (
+        "Lead_Qualifier",
+        SYS_PROMPT_LEAD_QUALIFIER,
+        8,
+        "search",
+    ),
+    # Contact Enrichment: 搜索联系人
+    "contact_enrichment": (
+        "Contact_Enrichment",
+        SYS_PROMPT_CONTACT_ENRICHMENT,
+        10,
+        "search",
+    ),
+    # Lead Report Writer: 生成报告 (用 file_toolkit 保存文件)
+    "lead_report_writer": (
+        "Lead_Report_Writer",
+        SYS_PROMPT_LEAD_REPORT_WRITER,
+        5,
+        "file",
+    ),
+}
+
+
+def create_agent(
+    agent_id: str,
+    toolkit: Toolkit,
+    model: Optional[ChatModelBase] = None,
+) -> ReActAgent:
+    """
+    按 agent_id 创建单个 Agent 实例。
+
+    每次调用都会得到独立的 memory 和克隆出的 Toolkit，可用于构建
+    同一角色的多个并行实例（如 Market Scanner 工作池）。
+
+    Args:
+        agent_id: _AGENT_SPECS 中的 Agent 标识
+        toolkit: 源工具集（会被克隆，不会被修改）
+        model: 可选的共享模型实例；为空时按 YAML 配置新建
+            （model.cache 启用时按 agent_id 包装响应缓存）。
+            追踪启用时外层再包一层 TracedChatModel，最外层是按 agent_id
+            记账的 MeteredChatModel（已包装过的共享模型原样复用）
+
+    Returns:
+        ReActAgent 实例
+    """
+    if agent_id not in _AGENT_SPECS:
+        raise ValueError(f"未知的 agent_id: {agent_id}")
+    name, sys_prompt, max_iters, _ = _AGENT_SPECS[agent_id]
+
+    if model is None:
+        config = Config()
+        model = _create_model(
+            _resolve_model_name(agent_id, config.get_model_name(agent_id), config)
+        )
+        model = with_response_cache(agent_id, model)
+    if not isinstance(model, MeteredChatModel):
+        model = with_token_meter(agent_id, with_tracing(model))
+
+    return TracedReActAgent(
+        name=name,
+        sys_prompt=sys_prompt,
+        model=model,
+        formatter=OpenAIChatFormatter(),
+        memory=create_memory(agent_id),
+        toolkit=_clone_toolkit(toolkit, agent_id),
+        max_iters=max_iters,
+    )
 
 
 def create_agents(
     search_toolkit: Toolkit,
     file_toolkit: Toolkit,
+    models: Optional[dict[str, ChatModelBase]] = None,
 ) -> dict[str, ReActAgent]:
     """
     创建所有销售线索 Agent。
@@ -188,115 +336,14 @@ def create_agents(
     Args:
         search_toolkit: 搜索工具集 (Tavily + 企查查)
         file_toolkit: 文件操作工具集 (save_file / read_file)
+        models: 可选的 agent_id -> 模型实例，用于复用已创建的模型客户端
 
     Returns:
         字典映射 agent_id -> ReActAgent
     """
-    config = Config()
-
-    # 按 YAML 配置分配模型（含代码模型自动回退）
-    model_names = {
-        "sales_orchestrator": _resolve_model_name(
-            "sales_orchestrator",
-            config.get_model_name("sales_orchestrator"),
-            config,
-        ),
-        "product_profiler": _resolve_model_name(
-            "product_profiler",
-            config.get_model_name("product_profiler"),
-            config,
-        ),
-        "market_scanner": _resolve_model_name(
-            "market_scanner",
-            config.get_model_name("market_scanner"),
-            config,
-        ),
-        "lead_qualifier": _resolve_model_name(
-            "lead_qualifier",
-            config.get_model_name("lead_qualifier"),
-            config,
-        ),
-        "contact_enrichment": _resolve_model_name(
-            "contact_enrichment",
-            config.get_model_name("contact_enrichment"),
-            config,
-        ),
-        "lead_report_writer": _resolve_model_name(
-            "lead_report_writer",
-            config.get_model_name("lead_report_writer"),
-            config,
-        ),
+    toolkits = {"search": search_toolkit, "file": file_toolkit}
+    models = models or {}
+    return {
+        agent_id: create_agent(agent_id, toolkits[spec[3]], model=models.get(agent_id))
+        for agent_id, spec in _AGENT_SPECS.items()
     }
-
-    model_orchestrator = _create_model(model_names["sales_orchestrator"])
-    model_profiler = _create_model(model_names["product_profiler"])
-    model_scanner = _create_model(model_names["market_scanner"])
-    model_qualifier = _create_model(model_names["lead_qualifier"])
-    model_enrichment = _create_model(model_names["contact_enrichment"])
-    model_writer = _create_model(model_names["lead_report_writer"])
-
-    agents = {
-        # Sales Orchestrator: 分析 ICP + 制定搜索策略
-        # 虽然提示词说不需要搜索，但提供 toolkit 让 LLM 正确理解工具调用协议
-        "sales_orchestrator": ReActAgent(
-            name="Sales_Orchestrator",
-            sys_prompt=SYS_PROMPT_SALES_ORCHESTRATOR,
-            model=model_orchestrator,
-            formatter=OpenAIChatFormatter(),
-            memory=InMemoryMemory(),
-            toolkit=_clone_toolkit(search_toolkit),
-            max_iters=3,
-        ),
-        # Product Profiler: 搜索 + 分析产品
-        "product_profiler": ReActAgent(
-            name="Product_Profiler",
-            sys_prompt=SYS_PROMPT_PRODUCT_PROFILER,
-            model=model_profiler,
-            formatter=OpenAIChatFormatter(),
-            memory=InMemoryMemory(),
-            toolkit=_clone_toolkit(search_toolkit),
-            max_iters=5,
-        ),
-        # Market Scanner: 并行搜索潜在客户
-        "market_scanner": ReActAgent(
-            name="Market_Scanner",
-            sys_prompt=SYS_PROMPT_MARKET_SCANNER,
-            model=model_scanner,
-            formatter=OpenAIChatFormatter(),
-            memory=InMemoryMemory(),
-            toolkit=_clone_toolkit(search_toolkit),
-            max_iters=4,
-        ),
-        # Lead Qualifier: BANT 评估 (可搜索补充信息)
-        "lead_qualifier": ReActAgent(
-            name="Lead_Qualifier",
-            sys_prompt=SYS_PROMPT_LEAD_QUALIFIER,
-            model=model_qualifier,
-            formatter=OpenAIChatFormatter(),
-            memory=InMemoryMemory(),
-            toolkit=_clone_toolkit(search_toolkit),
-            max_iters=8,
-        ),
-        # Contact Enrichment: 搜索联系人
-        "contact_enrichment": ReActAgent(
-            name="Contact_Enrichment",
-            sys_prompt=SYS_PROMPT_CONTACT_ENRICHMENT,
-            model=model_enrichment,
-            formatter=OpenAIChatFormatter(),
-            memory=InMemoryMemory(),
-            toolkit=_clone_toolkit(search_toolkit),
-            max_iters=10,
-        ),
-        # Lead Report Writer: 生成报告 (用 file_toolkit 保存文件)
-        "lead_report_writer": ReActAgent(
-            name="Lead_Report_Writer",
-            sys_prompt=SYS_PROMPT_LEAD_REPORT_WRITER,
-            model=model_writer,
-            formatter=OpenAIChatFormatter(),
-            memory=InMemoryMemory(),
-            toolkit=_clone_toolkit(file_toolkit),
-            max_iters=5,
-        ),
-    }
-
-    return agents
@@ -0,0 +1,366 @@
+"""
+InsightFlow 销售线索模块 - LLM 响应缓存
+文件路径: src/agents/llm_cache.py
+
+对确定性较强的 Agent（Product Profiler / Sales Orchestrator）缓存完整的模型响应，
+包括工具调用和 generate_response 结构化输出。同一产品重复运行或调试后续阶段时，
+前几个阶段直接命中缓存，不再发起模型调用。
+
+  - key: 模型名 + 格式化后的 messages + 工具 schema + tool_choice + temperature
+  - 存储: SQLite，按 ttl_hours 过期，总大小超过 max_size_mb 时按 LRU 淘汰
+  - 命中: 只读查询；最近访问时间先记在内存，随下次写入或每 _ACCESS_FLUSH 次命中
+    批量落盘（同 src/tools/search_cache.py）
+  - 旁路: model.cache.bypass 或环境变量 INSIGHTFLOW_LLM_CACHE_BYPASS=1
+    时不读缓存（仍写入新结果，相当于刷新）
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncGenerator
+from typing import Any, Optional, Type
+
+from agentscope.model import ChatModelBase, ChatResponse
+
+# agentscope 1.0.15（requirements.txt 中的最低版本）未在 agentscope.model 导出 ChatUsage，
+# 升级 agentscope 时需确认该私有模块路径
+from agentscope.model._model_usage import ChatUsage
+from pydantic import BaseModel
+
+from src.config import Config
+
+
+# 累计多少次命中后批量写回 last_access
+_ACCESS_FLUSH = 200
+
+
+class LLMResponseCache:
+    """SQLite 模型响应缓存（线程安全，带 TTL 和总大小上限）"""
+
+    def __init__(self, path: str, ttl_seconds: float, max_size_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 尚未写回的最近访问时间 key -> last_access
+        self._pending_access: dict[str, float] = {}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model_name TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(
+        model_name: str,
+        messages: list[dict],
+        tools: Optional[list[dict]],
+        tool_choice: Optional[str],
+        structured_model: Optional[Type[BaseModel]],
+        temperature: Any,
+        extra: Optional[dict] = None,
+    ) -> str:
+        """由请求内容生成缓存 key（sha256）。"""
+        raw = json.dumps(
+            {
+                "model": model_name,
+                "messages": messages,
+                "tools": tools or [],
+                "tool_choice": tool_choice,
+                "structured_model": (
+                    structured_model.model_json_schema() if structured_model else None
+                ),
+                "temperature": temperature,
+                "extra": extra or {},
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """读取缓存，未命中或已过期返回 None。"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM llm_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            payload, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                # 过期条目由下次 set 覆盖或按 LRU 淘汰，读路径不写库
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pending_access[key] = now
+            if len(self._pending_access) >= _ACCESS_FLUSH:
+                self._flush_access()
+                self._conn.commit()
+        return json.loads(payload)
+
+    def _flush_access(self) -> None:
+        """把内存中的最近访问时间写回（调用方持有锁并负责提交）。"""
+        if not self._pending_access:
+            return
+        self._conn.executemany(
+            "UPDATE llm_cache SET last_access = ? WHERE key = ?",
+            [(at, key) for key, at in self._pending_access.items()],
+        )
+        self._pending_access.clear()
+
+    def set(self, key: str, model_name: str, value: dict) -> None:
+        """写入缓存，总大小超限时淘汰最久未访问的条目。"""
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        size = len(payload.encode("utf-8"))
+        with self._lock:
+            # 先写回命中记录，LRU 淘汰才按真实访问时间排序
+            self._flush_access()
+            self._pending_access.pop(key, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, model_name, payload, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, payload, size, now, now),
+            )
+            if self.max_size_bytes > 0:
+                (total,) = self._conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM llm_cache"
+                ).fetchone()
+                overflow = total - self.max_size_bytes
+                if overflow > 0:
+                    evict: list[tuple[str]] = []
+                    for old_key, old_size in self._conn.execute(
+                        "SELECT key, size FROM llm_cache "
+                        "WHERE key != ? ORDER BY last_access ASC",
+                        (key,),
+                    ):
+                        if overflow <= 0:
+                            break
+                        evict.append((old_key,))
+                        overflow -= old_size
+                    self._conn.executemany(
+                        "DELETE FROM llm_cache WHERE key = ?",
+                        evict,
+                    )
+            self._conn.commit()
+
+    def flush(self) -> None:
+        """写回尚未落盘的命中记录（每次运行结束时调用）。"""
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+
+    def stats(self) -> dict[str, int]:
+        """返回命中/未命中计数、条目数和总字节数。"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+            self._conn.close()
+
+
+def _dump_response(response: ChatResponse) -> dict:
+    return {
+        "content": list(response.content),
+        "metadata": response.metadata,
+        "usage": (
+            {
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens,
+            }
+            if response.usage
+            else None
+        ),
+    }
+
+
+def _load_response(data: dict) -> ChatResponse:
+    usage = data.get("usage")
+    return ChatResponse(
+        content=data.get("content", []),
+        metadata=data.get("metadata"),
+        # 命中缓存不产生模型调用，time=0 且在 metadata 中标记 cached
+        usage=(
+            ChatUsage(
+                input_tokens=usage["input_tokens"],
+                output_tokens=usage["output_tokens"],
+                time=0.0,
+                metadata={"cached": True},
+            )
+            if usage
+            else None
+        ),
+    )
+
+
+class CachedChatModel(ChatModelBase):
+    """给任意 ChatModel 加上响应缓存的包装器
+
+    对 ReActAgent 透明：stream 属性与被包装模型一致，流式模式下命中缓存时
+    以只包含一个完整块的异步生成器返回。只缓存正常结束且有内容的响应。
+    """
+
+    def __init__(
+        self,
+        model: ChatModelBase,
+        cache: LLMResponseCache,
+        bypass: bool = False,
+    ):
+        super().__init__(model.model_name, model.stream)
+        self.model = model
+        self.cache = cache
+        self.bypass = bypass
+
+    def __getattr__(self, name: str) -> Any:
+        # 其余属性（generate_kwargs、client 等）透传给被包装模型
+        return getattr(self.__dict__["model"], name)
+
+    def _temperature(self, kwargs: dict) -> Any:
+        if "temperature" in kwargs:
+            return kwargs["temperature"]
+        generate_kwargs = getattr(self.model, "generate_kwargs", None) or {}
+        return generate_kwargs.get("temperature")
+
+    async def __call__(
+        self,
+        messages: list[dict],
+        tools: Optional[list[dict]] = None,
+        tool_choice: Optional[str] = None,
+        structured_model: Optional[Type[BaseModel]] = None,
+        **kwargs: Any,
+    ) -> ChatResponse | AsyncGenerator[ChatResponse, None]:
+        extra = {k: v for k, v in kwargs.items() if k != "temperature"}
+        key = self.cache.make_key(
+            self.model_name,
+            messages,
+            tools,
+            tool_choice,
+            structured_model,
+            self._temperature(kwargs),
+            extra,
+        )
+
+        if not self.bypass:
+            cached = self.cache.get(key)
+            if cached is not None:
+                response = _load_response(cached)
+                if self.stream:
+                    return self._replay(response)
+                return response
+
+        response = await self.model(
+            messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            structured_model=structured_model,
+            **kwargs,
+        )
+        if self.stream:
+            return self._record_stream(key, response)
+        self._store(key, response)
+        return response
+
+    def _store(self, key: str, response: Optional[ChatResponse]) -> None:
+        if response is None or not response.content:
+            return
+        try:
+            self.cache.set(key, self.model_name, _dump_response(response))
+        except Exception as e:
+            print(f"[LLM Cache] 写入失败，已忽略: {e}")
+
+    @staticmethod
+    async def _replay(response: ChatResponse) -> AsyncGenerator[ChatResponse, None]:
+        yield response
+
+    async def _record_stream(
+        self,
+        key: str,
+        stream: AsyncGenerator[ChatResponse, None],
+    ) -> AsyncGenerator[ChatResponse, None]:
+        """透传流式响应；流正常结束后缓存最后一个（累积完整的）块。"""
+        last: Optional[ChatResponse] = None
+        async for chunk in stream:
+            last = chunk
+            yield chunk
+        self._store(key, last)
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """获取进程级共享的响应缓存；未启用时返回 None。"""
+    global _llm_cache
+    config = Config()
+    if not config.get("model.cache.enabled", False):
+        return None
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache(
+            path=str(config.get("model.cache.path", "outputs/cache/llm_cache.db")),
+            ttl_seconds=float(config.get("model.cache.ttl_hours", 72)) * 3600,
+            max_size_bytes=int(
+                float(config.get("model.cache.max_size_mb", 200)) * 1024 * 1024
+            ),
+        )
+    return _llm_cache
+
+
+def llm_cache_bypassed() -> bool:
+    """是否旁路缓存读取（配置项或环境变量）。"""
+    flag = os.getenv("INSIGHTFLOW_LLM_CACHE_BYPASS", "").strip().lower()
+    if flag in ("1", "true", "yes"):
+        return True
+    return bool(Config().get("model.cache.bypass", False))
+
+
+def with_response_cache(agent_id: str, model: ChatModelBase) -> ChatModelBase:
+    """按 model.cache.agents 配置为指定 Agent 的模型加上响应缓存。"""
+    if isinstance(model, CachedChatModel):
+        return model
+    cache = get_llm_cache()
+    if cache is None:
+        return model
+    agents = Config().get(
+        "model.cache.agents",
+        ["product_profiler", "sales_orchestrator"],
+    )
+    if agent_id not in (agents or []):
+        return model
+    return CachedChatModel(model, cache, bypass=llm_cache_bypassed())
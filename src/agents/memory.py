@@ -0,0 +1,173 @@
+"""
+InsightFlow 销售线索模块 - 有界 Agent 记忆
+文件路径: src/agents/memory.py
+
+ReActAgent 每轮推理都把 memory 全量发给模型，迭代次数多的 Agent
+（Lead Qualifier / Contact Enrichment）prompt 随工具结果累积不断变大。
+
+BoundedMemory 保留完整的原始记录，只在推理读取（get_memory 不带 mark）时
+返回压缩视图：估算 token 超过 trigger_tokens 后，除最近 keep_recent_results 个
+工具结果外，较早的工具结果替换为摘要：
+
+  - 搜索结果（紧凑编码或原始列表）: 只保留标题和 URL
+  - 网页提取: 只保留正文开头 compressed_chars 个字符
+  - 其他文本: 截断为 compressed_chars 个字符
+
+原始任务消息、Agent 的推理与工具调用不压缩；工具调用与结果一一对应，
+不会破坏模型接口要求的 tool_call / tool_result 配对。
+与浏览器示例的 _memory_summarizing 不同，压缩是确定性的，不额外调用模型。
+"""
+
+import json
+from typing import Any, Optional
+
+from agentscope.memory import InMemoryMemory, MemoryBase
+from agentscope.message import Msg, TextBlock, ToolResultBlock
+
+from src.config import Config
+from src.token_meter import estimate_tokens
+
+
+# 默认参数（可被 sales_leads.memory.default / agents.<agent_id> 覆盖）
+_DEFAULT_SETTINGS: dict[str, Any] = {
+    "bounded": False,
+    "keep_recent_results": 2,
+    "trigger_tokens": 12000,
+    "compressed_chars": 300,
+}
+
+
+def _output_text(output: Any) -> str:
+    if isinstance(output, str):
+        return output
+    if isinstance(output, list):
+        return "".join(
+            block.get("text", "")
+            for block in output
+            if isinstance(block, dict) and block.get("type") == "text"
+        )
+    return ""
+
+
+def _summarize_output(text: str, max_chars: int) -> str:
+    """较早工具结果的摘要：搜索结果留标题 + URL，其他内容截断。"""
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        data = None
+
+    if isinstance(data, dict) and isinstance(data.get("rows"), list):
+        fields = data.get("fields") or []
+        data = [dict(zip(fields, row)) for row in data["rows"] if isinstance(row, list)]
+    if isinstance(data, list) and data and all(isinstance(r, dict) and "url" in r for r in data):
+        rows = [[str(r.get("title", "")), str(r.get("url", ""))] for r in data]
+        summary = json.dumps(
+            {"fields": ["title", "url"], "rows": rows},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return f"[较早的搜索结果，已省略摘要] {summary}"
+
+    if isinstance(data, dict) and isinstance(data.get("content"), str):
+        head = data["content"][:max_chars]
+        return f"[较早的网页内容，原 {len(data['content'])} 字符] {data.get('url', '')} {head}…"
+
+    if len(text) <= max_chars:
+        return text
+    return f"[较早的工具结果，原 {len(text)} 字符] {text[:max_chars]}…"
+
+
+class BoundedMemory(InMemoryMemory):
+    """推理时返回压缩视图的 InMemoryMemory（原始记录不修改）"""
+
+    def __init__(
+        self,
+        keep_recent_results: int = 2,
+        trigger_tokens: int = 12000,
+        compressed_chars: int = 300,
+    ) -> None:
+        super().__init__()
+        self.keep_recent_results = max(0, keep_recent_results)
+        self.trigger_tokens = trigger_tokens
+        self.compressed_chars = compressed_chars
+        # 已返回过的压缩视图次数（便于调试和基准统计）
+        self.compressions = 0
+
+    async def get_memory(
+        self,
+        mark: Optional[str] = None,
+        exclude_mark: Optional[str] = None,
+        prepend_summary: bool = True,
+        **kwargs: Any,
+    ) -> list[Msg]:
+        msgs = await super().get_memory(
+            mark=mark,
+            exclude_mark=exclude_mark,
+            prepend_summary=prepend_summary,
+            **kwargs,
+        )
+        # 只压缩推理时读取的全量视图，按 mark 过滤的读取保持原样
+        if mark is not None:
+            return msgs
+        return self._compress(msgs)
+
+    def _compress(self, msgs: list[Msg]) -> list[Msg]:
+        result_positions = [
+            (i, j)
+            for i, msg in enumerate(msgs)
+            if isinstance(msg.content, list)
+            for j, block in enumerate(msg.content)
+            if isinstance(block, dict) and block.get("type") == "tool_result"
+        ]
+        cut = len(result_positions) - self.keep_recent_results
+        if cut <= 0:
+            return msgs
+        if estimate_tokens([msg.to_dict() for msg in msgs]) <= self.trigger_tokens:
+            return msgs
+
+        old: dict[int, set[int]] = {}
+        for i, j in result_positions[:cut]:
+            old.setdefault(i, set()).add(j)
+        compressed = list(msgs)
+        for i, blocks in old.items():
+            msg = msgs[i]
+            content = list(msg.content)
+            for j in blocks:
+                block = content[j]
+                text = _output_text(block.get("output"))
+                content[j] = ToolResultBlock(
+                    type="tool_result",
+                    id=block["id"],
+                    name=block["name"],
+                    output=[
+                        TextBlock(
+                            type="text",
+                            text=_summarize_output(text, self.compressed_chars),
+                        ),
+                    ],
+                )
+            compressed[i] = Msg(
+                msg.name,
+                content,
+                msg.role,
+                metadata=msg.metadata,
+                timestamp=msg.timestamp,
+            )
+            compressed[i].id = msg.id
+        self.compressions += 1
+        return compressed
+
+
+def create_memory(agent_id: str) -> MemoryBase:
+    """按 sales_leads.memory 为 agent_id 创建 memory（未启用有界记忆时为 InMemoryMemory）。"""
+    config = Config()
+    settings = dict(_DEFAULT_SETTINGS)
+    settings.update(config.get("sales_leads.memory.default", {}) or {})
+    settings.update(config.get(f"sales_leads.memory.agents.{agent_id}", {}) or {})
+    if not settings.get("bounded"):
+        return InMemoryMemory()
+    return BoundedMemory(
+        keep_recent_results=int(settings["keep_recent_results"]),
+        trigger_tokens=int(settings["trigger_tokens"]),
+        compressed_chars=int(settings["compressed_chars"]),
+    )
@@ -0,0 +1,149 @@
+"""
+InsightFlow 销售线索模块 - 阶段检查点
+文件路径: src/checkpoint.py
+
+把每个流水线阶段的输出持久化到 outputs/runs/<run_id>/ 下，
+中途失败后可通过 run_id 恢复，跳过已完成的阶段和搜索任务。
+
+目录结构:
+  meta.json                运行参数（产品输入、深度、是否增量、创建时间）
+  product_profile.json     Step 1 产品画像
+  search_plan.json         Step 2 ICP + 搜索计划
+  scan/<序号>.json         Step 3 每个搜索任务的 ScanResult
+  qualified_leads.json     Step 4 BANT 评估结果
+  enrichment/<key>.json    Step 5 每家公司的联系人信息（文件名为公司 key 的哈希）
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Optional
+
+import shortuuid
+
+from src.config import Config
+
+
+def _write_json_atomic(path: str, data: Any) -> None:
+    """先写临时文件再 rename，避免进程中断留下半个 JSON。"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, ValueError):
+        print(f"[Checkpoint] 检查点文件损坏，已忽略: {path}")
+        return None
+
+
+class RunCheckpoint:
+    """单次运行的检查点目录"""
+
+    def __init__(self, run_id: str, run_dir: str, meta: dict):
+        self.run_id = run_id
+        self.run_dir = run_dir
+        self.meta = meta
+
+    @staticmethod
+    def _base_dir() -> str:
+        return str(Config().get("sales_leads.output.runs_dir", "outputs/runs"))
+
+    @classmethod
+    def create(
+        cls, product_input: str, depth: str, delta: bool = False
+    ) -> "RunCheckpoint":
+        """新建运行目录并写入 meta.json。"""
+        run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{shortuuid.uuid()[:6]}"
+        run_dir = os.path.join(cls._base_dir(), run_id)
+        meta = {
+            "run_id": run_id,
+            "product_input": product_input,
+            "depth": depth,
+            "delta": delta,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        _write_json_atomic(os.path.join(run_dir, "meta.json"), meta)
+        return cls(run_id, run_dir, meta)
+
+    @classmethod
+    def load(cls, run_id: str) -> "RunCheckpoint":
+        """加载已有运行目录；不存在时抛出 ValueError。"""
+        run_dir = os.path.join(cls._base_dir(), run_id)
+        meta = _read_json(os.path.join(run_dir, "meta.json"))
+        if not isinstance(meta, dict):
+            raise ValueError(f"找不到可恢复的运行: {run_id}（目录 {run_dir}）")
+        return cls(run_id, run_dir, meta)
+
+    # ── 阶段级 ────────────────────────────────────────────────
+
+    def _stage_path(self, stage: str) -> str:
+        return os.path.join(self.run_dir, f"{stage}.json")
+
+    def load_stage(self, stage: str) -> Optional[Any]:
+        """读取阶段输出；未完成返回 None。"""
+        return _read_json(self._stage_path(stage))
+
+    def save_stage(self, stage: str, data: Any) -> None:
+        _write_json_atomic(self._stage_path(stage), data)
+
+    # ── 搜索任务级 ────────────────────────────────────────────
+
+    def _scan_path(self, index: int) -> str:
+        return os.path.join(self.run_dir, "scan", f"{index:03d}.json")
+
+    def save_scan_result(self, index: int, task_id: str, data: dict) -> None:
+        """保存第 index 个搜索任务（从 1 开始）的 ScanResult。"""
+        _write_json_atomic(
+            self._scan_path(index),
+            {"index": index, "task_id": task_id, "result": data},
+        )
+
+    def load_scan_results(self) -> dict[int, dict]:
+        """读取所有已完成搜索任务的结果：序号 -> ScanResult 数据。"""
+        scan_dir = os.path.join(self.run_dir, "scan")
+        if not os.path.isdir(scan_dir):
+            return {}
+        results: dict[int, dict] = {}
+        for name in sorted(os.listdir(scan_dir)):
+            if not name.endswith(".json"):
+                continue
+            item = _read_json(os.path.join(scan_dir, name))
+            if isinstance(item, dict) and isinstance(item.get("result"), dict):
+                results[int(item.get("index", 0))] = item["result"]
+        return results
+
+    # ── 联系人级 ──────────────────────────────────────────────
+
+    def _enrichment_path(self, company_key: str) -> str:
+        digest = hashlib.sha1(company_key.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.run_dir, "enrichment", f"{digest}.json")
+
+    def save_enrichment(self, company_key: str, data: dict) -> None:
+        """保存一家公司（小写公司名）的联系人结果，每家一个文件，写入量与已完成数无关。"""
+        _write_json_atomic(
+            self._enrichment_path(company_key),
+            {"company": company_key, "result": data},
+        )
+
+    def load_enrichment(self) -> dict[str, dict]:
+        """读取已保存的联系人结果：小写公司名 -> 联系人结果。"""
+        enrichment_dir = os.path.join(self.run_dir, "enrichment")
+        if not os.path.isdir(enrichment_dir):
+            return {}
+        results: dict[str, dict] = {}
+        for name in sorted(os.listdir(enrichment_dir)):
+            if not name.endswith(".json"):
+                continue
+            item = _read_json(os.path.join(enrichment_dir, name))
+            if isinstance(item, dict) and isinstance(item.get("result"), dict):
+                results[str(item.get("company", ""))] = item["result"]
+        return results
@@ -0,0 +1,202 @@
+"""
+InsightFlow 销售线索模块 - 流水线截止时间调度
+文件路径: src/deadline.py
+
+把 depth_presets.timeout_minutes 作为整条流水线的总时间预算，
+按阶段权重把"剩余时间"切分给尚未开始的阶段（前面阶段省下的时间
+自动顺延给后面的阶段）。阶段时间片用完时取消在途任务，
+已完成的部分结果保留，并记录被截断的阶段。
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable
+from typing import Optional, TypeVar
+
+from src.config import Config
+from src.tracing import trace_span
+
+
+T = TypeVar("T")
+
+# 阶段名称（日志与报告中展示）
+STAGE_LABELS: dict[str, str] = {
+    "profile": "产品分析",
+    "plan": "ICP + 搜索策略",
+    "scan": "市场扫描",
+    "expand": "广撒网扩量",
+    "qualify": "BANT 评估",
+    "enrich": "联系人补充",
+    "report": "报告生成",
+    "stream": "市场扫描/BANT 评估/联系人补充（流式）",
+}
+
+
+class PipelineDeadline:
+    """流水线截止时间调度器
+
+    timeout_seconds 为 None 或 <= 0 时不限时，所有方法退化为普通等待。
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: Optional[float] = None,
+        stage_weights: Optional[dict[str, float]] = None,
+        reserve_seconds: float = 0.0,
+    ):
+        self.enabled = bool(timeout_seconds and timeout_seconds > 0)
+        self._deadline = (
+            time.monotonic() + max(0.0, timeout_seconds - reserve_seconds)
+            if self.enabled
+            else float("inf")
+        )
+        # 尚未开始的阶段及其权重（按流水线顺序）
+        self._pending: dict[str, float] = dict(stage_weights or {})
+        self.truncated_stages: list[str] = []
+        # 各阶段实际耗时（秒），写入 SalesLeadReport.stage_timings
+        self.stage_seconds: dict[str, float] = {}
+        # 正在执行的阶段（token 计量按它归属用量）
+        self.current_stage = ""
+
+    def remaining(self) -> Optional[float]:
+        """距截止时间的剩余秒数；不限时返回 None。"""
+        if not self.enabled:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    def skip_stage(self, stage: str) -> None:
+        """阶段不执行（如检查点恢复或无数据），其权重让给后续阶段。"""
+        self._pending.pop(stage, None)
+
+    def merge_stages(self, merged: str, stages: list[str]) -> None:
+        """把若干尚未开始的阶段合并为一个（流式模式下它们重叠执行），权重相加。"""
+        weight = sum(self._pending.pop(s, 0.0) for s in stages)
+        self._pending = {merged: weight, **self._pending}
+
+    def stage_budget(self, stage: str) -> Optional[float]:
+        """开始 stage 时调用，返回本阶段可用秒数；不限时返回 None。
+
+        预算 = 剩余时间 × 本阶段权重 / (本阶段 + 后续阶段权重之和)。
+        未登记权重的阶段可使用全部剩余时间。
+        """
+        weight = self._pending.pop(stage, None)
+        remaining = self.remaining()
+        if remaining is None:
+            return None
+        if weight is None:
+            return remaining
+        total = weight + sum(self._pending.values())
+        return remaining * weight / total if total > 0 else remaining
+
+    def mark_truncated(self, stage: str) -> None:
+        if stage not in self.truncated_stages:
+            self.truncated_stages.append(stage)
+
+    async def call(self, stage: str, aw: Awaitable[T]) -> Optional[T]:
+        """在阶段时间片内等待单个调用；超时返回 None 并记录截断。"""
+        budget = self.stage_budget(stage)
+        started = time.monotonic()
+        self.current_stage = stage
+        with trace_span("stage", stage, budget=budget) as span:
+            task = asyncio.ensure_future(aw)
+            try:
+                done, _ = await asyncio.wait([task], timeout=budget)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self._record(stage, started)
+            if done:
+                return task.result()
+            # ReActAgent 被取消时会返回"中断"消息而非抛出 CancelledError，
+            # 因此不用 wait_for，超时后的返回值一律丢弃
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            self.mark_truncated(stage)
+            span.set(truncated=True)
+            return None
+
+    async def wait(self, stage: str, tasks: list[asyncio.Task]) -> bool:
+        """在阶段时间片内等待一组 worker 任务。
+
+        时间片用完时取消未完成的任务（worker 已写出的部分结果保留），
+        记录截断并返回 False；全部完成返回 True。
+        任一 worker 抛出未捕获的异常（取消除外）时立即取消其余任务并向上抛出，
+        不会等到时间片用完。
+        """
+        if not tasks:
+            self.skip_stage(stage)
+            return True
+        budget = self.stage_budget(stage)
+        started = time.monotonic()
+        self.current_stage = stage
+        with trace_span("stage", stage, budget=budget, tasks=len(tasks)) as span:
+            try:
+                done, pending = await asyncio.wait(
+                    tasks, timeout=budget, return_when=asyncio.FIRST_EXCEPTION
+                )
+            except asyncio.CancelledError:
+                for task in tasks:
+                    task.cancel()
+                raise
+            finally:
+                self._record(stage, started)
+            failed = [
+                task
+                for task in done
+                if not task.cancelled() and task.exception() is not None
+            ]
+            if failed:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                raise failed[0].exception()
+            if pending:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                self.mark_truncated(stage)
+                span.set(truncated=True)
+            return not pending
+
+    def _record(self, stage: str, started: float) -> None:
+        elapsed = time.monotonic() - started
+        self.stage_seconds[stage] = round(self.stage_seconds.get(stage, 0.0) + elapsed, 3)
+
+    def describe_truncated(self) -> list[str]:
+        """被截断阶段的中文名称。"""
+        return [STAGE_LABELS.get(s, s) for s in self.truncated_stages]
+
+
+# 各流水线模式依次经过的阶段
+PIPELINE_STAGES: dict[str, list[str]] = {
+    "broad": ["profile", "plan", "scan", "expand"],
+    "full": ["profile", "plan", "scan", "qualify", "enrich", "report"],
+}
+
+# 默认阶段权重（可被 sales_leads.deadline.stage_weights 覆盖）
+_DEFAULT_STAGE_WEIGHTS: dict[str, float] = {
+    "profile": 1.0,
+    "plan": 1.0,
+    "scan": 4.0,
+    "expand": 1.5,
+    "qualify": 2.0,
+    "enrich": 2.5,
+    "report": 1.0,
+}
+
+
+def build_pipeline_deadline(
+    timeout_minutes: float,
+    pipeline_mode: str,
+) -> PipelineDeadline:
+    """按深度预设的 timeout_minutes 和流水线模式创建调度器。"""
+    config = Config()
+    weights = dict(_DEFAULT_STAGE_WEIGHTS)
+    weights.update(config.get("sales_leads.deadline.stage_weights", {}) or {})
+    stages = PIPELINE_STAGES["broad" if pipeline_mode == "broad" else "full"]
+    return PipelineDeadline(
+        timeout_seconds=float(timeout_minutes or 0) * 60,
+        stage_weights={s: float(weights.get(s, 1.0)) for s in stages},
+        reserve_seconds=float(config.get("sales_leads.deadline.reserve_seconds", 20)),
+    )
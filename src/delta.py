@@ -0,0 +1,143 @@
+"""
+InsightFlow 销售线索模块 - 增量运行
+文件路径: src/delta.py
+
+同一产品定期重跑时，大部分公司和上次相比没有变化。增量（delta）模式下
+把本次扫描到的线索与线索库（src/lead_store.py）比对，分为:
+
+  - 新公司: 线索库中没有，或只在广撒网模式中出现过（从未评估）
+  - 过期: 评估结果早于 stale_days 天，重新评估并补充联系人
+  - 未变: 直接复用上次的评估和联系人结果，不调用 Agent
+
+上次运行中出现、本次没有搜到且未过期的公司作为"沿用"线索并入报告，
+报告开头附"本次新增"一节（DeltaSummary）。
+"""
+
+import time
+from typing import Any
+
+from src.entity_resolution import normalize_company_name
+from src.lead_store import LeadStore
+from src.models.sales_schemas import DeltaLead, DeltaSummary
+
+
+def _company_key(lead: dict) -> str:
+    return str(lead.get("company_name", "")).strip().lower()
+
+
+class DeltaPlan:
+    """本次扫描线索相对于线索库的划分"""
+
+    def __init__(self, previous_run_id: str, stale_days: float):
+        self.previous_run_id = previous_run_id
+        self.stale_days = stale_days
+        self.new: list[dict] = []  # 原始线索
+        self.stale: list[dict] = []  # 原始线索
+        self.reused: list[dict] = []  # 复用的 qualified leads
+        self.carried: list[dict] = []  # 上次运行沿用的 qualified leads
+        # 复用 / 沿用线索的联系人结果（key 为小写公司名，同 enrichment_map）
+        self.enrichment: dict[str, dict] = {}
+        # 过期线索的上次记录（key 为归一化公司名）
+        self._previous: dict[str, dict[str, Any]] = {}
+
+    @property
+    def pending(self) -> list[dict]:
+        """需要重新评估的原始线索（新公司 + 过期）。"""
+        return self.new + self.stale
+
+    def describe(self) -> str:
+        previous = self.previous_run_id or "无"
+        return (
+            f"新公司 {len(self.new)}，过期 {len(self.stale)}，"
+            f"复用 {len(self.reused)}，沿用 {len(self.carried)}（上次运行 {previous}）"
+        )
+
+    def prefill_enrichment(self, enrichment_map: dict[str, dict]) -> int:
+        """把复用 / 沿用线索的联系人结果写入 enrichment_map，返回写入的公司数。"""
+        added = 0
+        for key, data in self.enrichment.items():
+            if key not in enrichment_map:
+                enrichment_map[key] = data
+                added += 1
+        return added
+
+    def summarize(self, qualified_leads: list[dict]) -> DeltaSummary:
+        """按本次评估结果生成变化摘要。"""
+        by_name = {
+            normalize_company_name(lead.get("company_name", "")): lead
+            for lead in qualified_leads
+        }
+
+        def _delta_lead(lead: dict, previous: dict[str, Any]) -> DeltaLead:
+            qualified = by_name.get(normalize_company_name(lead.get("company_name", "")), {})
+            return DeltaLead(
+                company_name=qualified.get("company_name") or lead.get("company_name", ""),
+                priority=str(qualified.get("priority", "")),
+                qualification_score=int(qualified.get("qualification_score", 0) or 0),
+                previous_priority=str(previous.get("priority") or ""),
+                previous_score=int(previous.get("qualification_score") or 0),
+            )
+
+        def _by_score(leads: list[DeltaLead]) -> list[DeltaLead]:
+            return sorted(leads, key=lambda x: x.qualification_score, reverse=True)
+
+        return DeltaSummary(
+            previous_run_id=self.previous_run_id,
+            stale_days=self.stale_days,
+            new_leads=_by_score([_delta_lead(lead, {}) for lead in self.new]),
+            refreshed_leads=_by_score(
+                [
+                    _delta_lead(
+                        lead,
+                        self._previous.get(
+                            normalize_company_name(lead.get("company_name", "")), {}
+                        ),
+                    )
+                    for lead in self.stale
+                ]
+            ),
+            unchanged_count=len(self.reused),
+            carried_over_count=len(self.carried),
+        )
+
+
+def plan_delta(
+    store: LeadStore,
+    product: str,
+    leads: list[dict],
+    stale_days: float,
+    carry_over: bool = True,
+) -> DeltaPlan:
+    """把本次扫描的去重线索按线索库划分为新公司 / 过期 / 未变。"""
+    plan = DeltaPlan(store.latest_run_id(product), stale_days)
+    fresh_after = time.time() - stale_days * 86400 if stale_days > 0 else 0.0
+    records = store.lookup_records(product, leads)
+    matched: set[str] = set()
+
+    for i, lead in enumerate(leads):
+        record = records.get(i)
+        if record is None or record["qualified"] is None:
+            plan.new.append(lead)
+            continue
+        if record["name_key"] in matched:
+            # 本次多条线索对应同一条记录（名称 / 域名各命中一次），只计一次
+            continue
+        matched.add(record["name_key"])
+        if (record["qualified_at"] or 0) < fresh_after:
+            plan.stale.append(lead)
+            plan._previous[normalize_company_name(lead.get("company_name", ""))] = record
+            continue
+        plan.reused.append(record["qualified"])
+        if record["enrichment"] is not None and (record["enriched_at"] or 0) >= fresh_after:
+            plan.enrichment[_company_key(record["qualified"])] = record["enrichment"]
+
+    if carry_over and plan.previous_run_id:
+        for record in store.run_records(
+            product, plan.previous_run_id, max_age_seconds=stale_days * 86400
+        ):
+            if record["name_key"] in matched:
+                continue
+            plan.carried.append(record["qualified"])
+            if record["enrichment"] is not None and (record["enriched_at"] or 0) >= fresh_after:
+                plan.enrichment[_company_key(record["qualified"])] = record["enrichment"]
+    return plan
@@ -0,0 +1,334 @@
+"""
+InsightFlow 销售线索模块 - 公司实体消歧
+文件路径: src/entity_resolution.py
+
+同一家公司在不同搜索任务中常以不同写法出现（"比亚迪股份有限公司" / "比亚迪" /
+"BYD Co., Ltd."），按名称精确去重会让它们各自进入 BANT 评估和联系人补充，
+重复消耗 LLM 调用。CompanyIndex 按以下规则把线索归并为实体：
+
+  1. 域名: website 的可注册域名相同即为同一实体；共享平台上的店铺按完整主机名区分
+  2. 名称: 去掉法律后缀（有限公司、Co., Ltd.、GmbH 等）、地区括注 / 省市前缀和
+     标点后完全相同即为同一实体
+  3. 相似名称: 以字符二元组为分块键找候选（出现次数过多的分块键跳过），
+     二元组 Jaccard 相似度 >= similarity 即为同一实体
+
+source_url 只说明线索在哪里被发现（招标门户、新闻站点上会出现很多家公司），
+不作为实体标识：同一来源站点只用于补充候选，仍需名称相似度达到阈值。
+
+每条线索只与少量候选比较，整体接近线性。重复线索不单独输出，
+其网站、行业、规模等缺失字段补充到该实体首次出现的线索上（match_signals 合并）。
+"""
+
+import re
+import unicodedata
+from typing import Optional
+from urllib.parse import urlparse
+
+
+# 中文法律形式后缀（按从长到短剥离，可连续剥离多个）
+_ZH_SUFFIXES: tuple[str, ...] = (
+    "集团股份有限公司",
+    "集团有限公司",
+    "股份有限公司",
+    "有限责任公司",
+    "有限公司",
+    "股份公司",
+    "集团公司",
+    "总公司",
+    "分公司",
+    "公司",
+    "集团",
+)
+
+# 英文 / 欧洲法律形式（作为独立词出现在末尾时剥离，避免误伤 "Tesco" 这类名称）
+_EN_SUFFIX_TOKENS: frozenset[str] = frozenset(
+    {
+        "co",
+        "ltd",
+        "limited",
+        "company",
+        "corp",
+        "corporation",
+        "inc",
+        "incorporated",
+        "group",
+        "llc",
+        "plc",
+        "gmbh",
+        "ag",
+        "sa",
+        "bv",
+        "nv",
+        "srl",
+        "spa",
+        "kk",
+    }
+)
+
+# 多家公司共用的站点：作为 website 时按完整主机名区分（平台本身不代表公司）
+_SHARED_HOSTS: frozenset[str] = frozenset(
+    {
+        "baidu.com",
+        "sina.com.cn",
+        "sohu.com",
+        "163.com",
+        "qq.com",
+        "ifeng.com",
+        "zhihu.com",
+        "csdn.net",
+        "weixin.qq.com",
+        "toutiao.com",
+        "eastmoney.com",
+        "qcc.com",
+        "tianyancha.com",
+        "aiqicha.com",
+        "1688.com",
+        "alibaba.com",
+        "made-in-china.com",
+        "globalsources.com",
+        "linkedin.com",
+        "wikipedia.org",
+        "bloomberg.com",
+        "reuters.com",
+        "prnewswire.com",
+        "globenewswire.com",
+        "businesswire.com",
+        "youtube.com",
+        "facebook.com",
+        "twitter.com",
+        "x.com",
+        "github.com",
+        "github.io",
+    }
+)
+
+# 二级域名为这些标签时，可注册域名取最后三段（如 byd.com.cn）
+_SECOND_LEVEL_LABELS: frozenset[str] = frozenset(
+    {"com", "net", "org", "gov", "edu", "co", "ac", "or", "ne", "go"}
+)
+
+# 公司名开头常见的省级行政区 / 城市（只剥离这些地名，避免误伤 "中国市政工程" 这类名称）
+_REGION_NAMES: tuple[str, ...] = (
+    # 省级行政区
+    "北京", "天津", "上海", "重庆", "河北", "山西", "辽宁", "吉林", "黑龙江",
+    "江苏", "浙江", "安徽", "福建", "江西", "山东", "河南", "湖北", "湖南",
+    "广东", "海南", "四川", "贵州", "云南", "陕西", "甘肃", "青海", "台湾",
+    "内蒙古", "广西", "西藏", "宁夏", "新疆", "香港", "澳门",
+    # 省会 / 副省级 / 计划单列及常见地级市
+    "石家庄", "太原", "沈阳", "长春", "哈尔滨", "南京", "杭州", "合肥", "福州",
+    "南昌", "济南", "郑州", "武汉", "长沙", "广州", "海口", "成都", "贵阳",
+    "昆明", "西安", "兰州", "西宁", "呼和浩特", "南宁", "拉萨", "银川",
+    "乌鲁木齐", "深圳", "大连", "青岛", "宁波", "厦门", "苏州", "无锡", "常州",
+    "南通", "徐州", "扬州", "镇江", "泰州", "盐城", "连云港", "淮安", "宿迁",
+    "温州", "嘉兴", "湖州", "绍兴", "金华", "台州", "衢州", "丽水", "舟山",
+    "芜湖", "蚌埠", "马鞍山", "安庆", "滁州", "阜阳", "泉州", "漳州", "莆田",
+    "龙岩", "三明", "宁德", "九江", "赣州", "景德镇", "上饶", "宜春", "烟台",
+    "潍坊", "淄博", "济宁", "临沂", "威海", "日照", "德州", "聊城", "东营",
+    "泰安", "枣庄", "菏泽", "滨州", "洛阳", "新乡", "许昌", "南阳", "开封",
+    "安阳", "焦作", "商丘", "宜昌", "襄阳", "十堰", "荆州", "黄石", "株洲",
+    "湘潭", "岳阳", "衡阳", "常德", "佛山", "东莞", "珠海", "中山", "惠州",
+    "江门", "汕头", "湛江", "肇庆", "清远", "韶关", "揭阳", "潮州", "茂名",
+    "柳州", "桂林", "三亚", "绵阳", "德阳", "宜宾", "泸州", "南充", "乐山",
+    "遵义", "曲靖", "玉溪", "宝鸡", "咸阳", "榆林", "天水", "包头", "鄂尔多斯",
+    "唐山", "保定", "廊坊", "邯郸", "沧州", "邢台", "秦皇岛", "张家口", "承德",
+    "大同", "长治", "晋中", "鞍山", "抚顺", "锦州", "营口", "丹东", "吉林",
+    "四平", "大庆", "齐齐哈尔", "牡丹江", "克拉玛依", "昌吉",
+)
+# 行政区划后缀（民族自治区等先于 "区" 匹配）
+_REGION_SUFFIXES: tuple[str, ...] = (
+    "壮族自治区", "回族自治区", "维吾尔自治区", "自治区", "特别行政区", "省", "市",
+)
+
+# "市" 后接这些字时多为 "市政" / "市场" 等词语（如 "北京市政路桥"），不作为前缀剥离
+_CITY_WORD_HEADS: tuple[str, ...] = ("政", "场", "容", "民")
+
+_PARENTHETICAL = re.compile(r"[（(][^（）()]*[)）]")
+_NON_WORD = re.compile(r"[\W_]+")
+# 开头的省 / 市前缀，如 "深圳市比亚迪" -> "比亚迪"、"广东省深圳市比亚迪" -> "比亚迪"
+_REGION_PREFIX = re.compile(
+    "^(?:"
+    + "|".join(sorted(set(_REGION_NAMES), key=len, reverse=True))
+    + ")(?:"
+    + "|".join(_REGION_SUFFIXES)
+    + ")"
+)
+
+
+def normalize_company_name(name: str) -> str:
+    """归一化公司名：全角转半角、小写、去地区括注 / 地区前缀 / 法律后缀 / 标点空格。"""
+    text = unicodedata.normalize("NFKC", str(name or "")).lower()
+    text = _PARENTHETICAL.sub(" ", text)
+    tokens = [t for t in _NON_WORD.split(text) if t]
+    while len(tokens) > 1 and tokens[-1] in _EN_SUFFIX_TOKENS:
+        tokens.pop()
+    text = "".join(tokens)
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in _ZH_SUFFIXES:
+            if text.endswith(suffix) and len(text) >= len(suffix) + 2:
+                text = text[: -len(suffix)]
+                stripped = True
+                break
+    for _ in range(2):
+        prefix = _REGION_PREFIX.match(text)
+        if not prefix or len(text) - prefix.end() < 2:
+            break
+        if prefix.group().endswith("市") and text[prefix.end()] in _CITY_WORD_HEADS:
+            break
+        text = text[prefix.end() :]
+    return text
+
+
+def registrable_host(url: str) -> str:
+    """URL 的主机名（小写、去 www.）；不是域名时返回空串。"""
+    url = str(url or "").strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = f"http://{url}"
+    try:
+        host = (urlparse(url).hostname or "").lower().rstrip(".")
+    except ValueError:
+        return ""
+    if not host or "." not in host or host.replace(".", "").isdigit():
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def registrable_domain(url: str) -> str:
+    """URL 的可注册域名（保留 example.com / example.com.cn 这一级）。"""
+    host = registrable_host(url)
+    if not host:
+        return ""
+    labels = host.split(".")
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in _SECOND_LEVEL_LABELS:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def company_domain(lead: dict) -> str:
+    """线索的公司域名标识，只取自 website；没有 website 时返回空串。"""
+    website = str(lead.get("website", "") or "")
+    domain = registrable_domain(website)
+    if domain in _SHARED_HOSTS:
+        # 平台上的店铺 / 主页（如 xxx.en.alibaba.com）按完整主机名区分，
+        # 平台本身的地址不作为公司标识
+        host = registrable_host(website)
+        return host if host != domain else ""
+    return domain
+
+
+def source_domain(lead: dict) -> str:
+    """线索来源页面的可注册域名（只作为分块提示，不代表公司本身）。"""
+    return registrable_domain(lead.get("source_url", ""))
+
+
+def _bigrams(text: str) -> frozenset[str]:
+    if len(text) < 2:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i : i + 2] for i in range(len(text) - 1))
+
+
+# 重复线索可补充到首条线索上的字段（首条为空或 unknown 时）
+_FILL_FIELDS: tuple[str, ...] = (
+    "website",
+    "industry",
+    "estimated_size",
+    "employee_count_range",
+    "source_url",
+)
+
+
+def _merge_into(canonical: dict, duplicate: dict) -> None:
+    """把重复线索的信息补充到实体首条线索上。"""
+    for key in _FILL_FIELDS:
+        value = duplicate.get(key)
+        if value and value != "unknown" and canonical.get(key) in (None, "", "unknown"):
+            canonical[key] = value
+    signals = list(canonical.get("match_signals") or [])
+    for signal in duplicate.get("match_signals") or []:
+        if signal and signal not in signals and len(signals) < 5:
+            signals.append(signal)
+    if signals:
+        canonical["match_signals"] = signals
+
+
+class CompanyIndex:
+    """线索实体索引（增量添加，就地归并重复线索）"""
+
+    def __init__(self, similarity: float = 0.8, max_block_size: int = 64):
+        self.similarity = similarity
+        self.max_block_size = max_block_size
+        self.leads: list[dict] = []
+        self._by_name: dict[str, int] = {}
+        self._by_domain: dict[str, int] = {}
+        self._grams: list[frozenset[str]] = []
+        self._blocks: dict[str, list[int]] = {}
+        self._by_source: dict[str, list[int]] = {}
+        self.merged = 0
+
+    def __len__(self) -> int:
+        return len(self.leads)
+
+    def resolve(self, lead: dict) -> Optional[int]:
+        """返回 lead 所属的已有实体下标；新实体返回 None。"""
+        domain = company_domain(lead)
+        if domain and domain in self._by_domain:
+            return self._by_domain[domain]
+        key = normalize_company_name(lead.get("company_name", ""))
+        if not key:
+            return None
+        if key in self._by_name:
+            return self._by_name[key]
+
+        grams = _bigrams(key)
+        counts: dict[int, int] = {}
+        for gram in grams:
+            block = self._blocks.get(gram)
+            if not block or len(block) > self.max_block_size:
+                continue
+            for entity in block:
+                counts[entity] = counts.get(entity, 0) + 1
+        # 同一来源站点的实体也作为候选（名称分块键过大被跳过时仍能比较）
+        source = source_domain(lead)
+        for entity in self._by_source.get(source, ())[-self.max_block_size :]:
+            if entity not in counts:
+                shared = len(grams & self._grams[entity])
+                if shared:
+                    counts[entity] = shared
+        for entity, shared in sorted(counts.items(), key=lambda kv: -kv[1]):
+            union = len(grams) + len(self._grams[entity]) - shared
+            if union and shared / union >= self.similarity:
+                return entity
+        return None
+
+    def add(self, lead: dict) -> bool:
+        """添加线索：新实体返回 True；重复实体归并到首条线索并返回 False。"""
+        key = normalize_company_name(lead.get("company_name", ""))
+        if not key:
+            return False
+        domain = company_domain(lead)
+        entity = self.resolve(lead)
+        if entity is not None:
+            _merge_into(self.leads[entity], lead)
+            # 记住新的写法和域名，后续同样写法直接命中
+            self._by_name.setdefault(key, entity)
+            if domain:
+                self._by_domain.setdefault(domain, entity)
+            self.merged += 1
+            return False
+
+        entity = len(self.leads)
+        self.leads.append(lead)
+        self._by_name[key] = entity
+        if domain:
+            self._by_domain[domain] = entity
+        grams = _bigrams(key)
+        self._grams.append(grams)
+        for gram in grams:
+            self._blocks.setdefault(gram, []).append(entity)
+        source = source_domain(lead)
+        if source:
+            self._by_source.setdefault(source, []).append(entity)
+        return True
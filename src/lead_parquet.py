@@ -0,0 +1,302 @@
+"""
+InsightFlow 销售线索模块 - Parquet 列式导出
+文件路径: src/lead_parquet.py
+
+CSV 把联系人展开成重复行，分析任务读取几个月的 CSV 既慢又丢结构。
+这里把 SalesLeadReport.leads 写成 Parquet（Arrow），联系人、BANT 各维度、
+公司联系方式保留为嵌套列（list<struct> / struct），每行一家公司，
+并带上 run_id / product_name / generated_at 便于跨运行分析。
+
+compact_outputs 把输出目录下每次运行的 .parquet（以及没有 Parquet 的历史
+.jsonl）合并到按产品、日期分区的数据集:
+
+    <dataset>/product=<产品>/date=<YYYY-MM-DD>/part-0.parquet
+
+同一运行的同一公司只保留一行，重复执行不会产生重复数据；
+pyarrow.dataset / DuckDB / Spark 都可按 hive 分区直接读取。
+
+pyarrow 为可选依赖，未安装时 pyarrow_available() 返回 False，导出跳过。
+"""
+
+import os
+import re
+from datetime import datetime
+from typing import Any, Callable, Iterable, Optional
+
+from src.lead_store import normalize_product_name
+from src.models.sales_schemas import EnrichedLead, SalesLeadReport
+
+
+def pyarrow_available() -> bool:
+    """Parquet 导出依赖 pyarrow（可选），未安装时返回 False。"""
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def lead_schema():
+    """每行一家公司的 Arrow schema（联系人 / BANT 为嵌套列）。"""
+    import pyarrow as pa
+
+    bant_dimension = pa.struct([("score", pa.int16()), ("reason", pa.string())])
+    contact = pa.struct(
+        [
+            ("name", pa.string()),
+            ("title", pa.string()),
+            ("department", pa.string()),
+            ("linkedin_url", pa.string()),
+            ("email", pa.string()),
+            ("phone", pa.string()),
+            ("source", pa.string()),
+            ("confidence", pa.string()),
+            ("notes", pa.string()),
+        ]
+    )
+    return pa.schema(
+        [
+            ("run_id", pa.string()),
+            ("product_name", pa.string()),
+            ("generated_at", pa.timestamp("s")),
+            ("company_name", pa.string()),
+            ("website", pa.string()),
+            ("industry", pa.string()),
+            ("estimated_size", pa.string()),
+            ("employee_count_range", pa.string()),
+            ("size_evidence", pa.string()),
+            ("target_company_size", pa.list_(pa.string())),
+            ("size_match", pa.string()),
+            ("size_judgement", pa.string()),
+            ("qualification_score", pa.int16()),
+            ("priority", pa.string()),
+            ("bant_total", pa.int16()),
+            (
+                "bant_assessment",
+                pa.struct(
+                    [
+                        ("budget", bant_dimension),
+                        ("authority", bant_dimension),
+                        ("need", bant_dimension),
+                        ("timing", bant_dimension),
+                    ]
+                ),
+            ),
+            ("product_fit", pa.string()),
+            ("recommended_approach", pa.string()),
+            ("talking_points", pa.list_(pa.string())),
+            ("contacts", pa.list_(contact)),
+            (
+                "company_contact",
+                pa.struct(
+                    [
+                        ("general_email", pa.string()),
+                        ("general_phone", pa.string()),
+                        ("contact_page", pa.string()),
+                        ("address", pa.string()),
+                    ]
+                ),
+            ),
+        ]
+    )
+
+
+def _lead_row(
+    lead: EnrichedLead,
+    run_id: str,
+    product_name: str,
+    generated_at: datetime,
+) -> dict[str, Any]:
+    row = lead.model_dump(mode="python")
+    row.update(
+        run_id=run_id,
+        product_name=product_name,
+        generated_at=generated_at.replace(microsecond=0),
+        bant_total=lead.bant_assessment.total_score,
+    )
+    return row
+
+
+def leads_to_table(
+    leads: Iterable[EnrichedLead],
+    run_id: str,
+    product_name: str,
+    generated_at: datetime,
+):
+    """把 EnrichedLead 列表转成 Arrow Table（schema 见 lead_schema）。"""
+    import pyarrow as pa
+
+    rows = [_lead_row(lead, run_id, product_name, generated_at) for lead in leads]
+    return pa.Table.from_pylist(rows, schema=lead_schema())
+
+
+def _write_table_atomic(table, path: str) -> str:
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_report_parquet(report: SalesLeadReport, path: str) -> str:
+    """把单次运行的线索写成 Parquet（先写临时文件再 rename）。"""
+    table = leads_to_table(
+        report.leads,
+        report.run_id,
+        report.product_name,
+        report.generated_at,
+    )
+    return _write_table_atomic(table, path)
+
+
+# ================================================================
+#  按产品 / 日期分区合并
+# ================================================================
+
+
+# 输出文件名: <产品名前 30 字符>_<YYYYmmdd_HHMMSS>.<扩展名>
+_RUN_FILE = re.compile(r"^(?P<slug>.+)_(?P<stamp>\d{8}_\d{6})$")
+# 分区目录名中不允许的字符
+_UNSAFE_PARTITION = re.compile(r"[\s/\\=:*?\"<>|%]+")
+
+
+def partition_value(product_name: str) -> str:
+    """产品名 -> 分区目录值（归一化后替换路径 / hive 分区中的特殊字符）。"""
+    value = _UNSAFE_PARTITION.sub("_", normalize_product_name(product_name)).strip("_")
+    return value[:60] or "unknown"
+
+
+def _read_jsonl_run(path: str):
+    """读取历史 JSONL（没有运行元数据，产品和时间取自文件名）。"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    match = _RUN_FILE.match(stem)
+    if match is None:
+        return None
+    generated_at = datetime.strptime(match.group("stamp"), "%Y%m%d_%H%M%S")
+    with open(path, "r", encoding="utf-8") as f:
+        leads = [EnrichedLead.model_validate_json(line) for line in f if line.strip()]
+    return leads_to_table(
+        leads,
+        run_id=f"file:{stem}",
+        product_name=match.group("slug").replace("_", " "),
+        generated_at=generated_at,
+    )
+
+
+def _dedupe(table):
+    """同一 (run_id, company_name) 只保留最后一行。"""
+    keys = zip(
+        table.column("run_id").to_pylist(),
+        table.column("company_name").to_pylist(),
+    )
+    last: dict[tuple, int] = {}
+    for i, key in enumerate(keys):
+        last[key] = i
+    return table.take(sorted(last.values()))
+
+
+def compact_outputs(
+    source_dir: str,
+    dataset_dir: str,
+    delete_sources: bool = False,
+    log: Callable[[str], None] = print,
+) -> dict[str, int]:
+    """把 source_dir 下每次运行的 .parquet / .jsonl 合并进按产品、日期分区的数据集。
+
+    同名的 .parquet 和 .jsonl 只读取 .parquet；.trace.jsonl 等非线索文件跳过。
+    delete_sources 时删除已合并的运行文件（含同名的 .jsonl，避免下次按历史文件重复合并）。
+
+    Returns:
+        {"files": 读取的文件数, "rows": 写入的行数, "partitions": 更新的分区数}
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    schema = lead_schema()
+    names = sorted(os.listdir(source_dir)) if os.path.isdir(source_dir) else []
+    parquet_stems = {n[: -len(".parquet")] for n in names if n.endswith(".parquet")}
+    sources: list[str] = []
+    covered: list[str] = []
+    tables = []
+    for name in names:
+        path = os.path.join(source_dir, name)
+        stem, ext = os.path.splitext(name)
+        if ext == ".parquet":
+            table = pq.read_table(path).cast(schema)
+        elif ext == ".jsonl" and not stem.endswith(".trace"):
+            if stem in parquet_stems:
+                covered.append(path)
+                continue
+            table = _read_jsonl_run(path)
+        else:
+            continue
+        if table is None:
+            log(f"[Compact] 跳过无法识别的文件: {name}")
+            continue
+        sources.append(path)
+        if table.num_rows:
+            tables.append(table)
+
+    stats = {"files": len(sources), "rows": 0, "partitions": 0}
+    if not tables:
+        return stats
+    merged = pa.concat_tables(tables)
+
+    products = [partition_value(p) for p in merged.column("product_name").to_pylist()]
+    dates = [
+        ts.strftime("%Y-%m-%d") if ts else "unknown"
+        for ts in merged.column("generated_at").to_pylist()
+    ]
+    groups: dict[tuple[str, str], list[int]] = {}
+    for i, key in enumerate(zip(products, dates)):
+        groups.setdefault(key, []).append(i)
+
+    for (product, date), indices in sorted(groups.items()):
+        part_path = os.path.join(
+            dataset_dir, f"product={product}", f"date={date}", "part-0.parquet"
+        )
+        table = merged.take(indices)
+        if os.path.exists(part_path):
+            table = pa.concat_tables([pq.read_table(part_path).cast(schema), table])
+        table = _dedupe(table)
+        table = table.take(
+            pc.sort_indices(
+                table,
+                sort_keys=[
+                    ("generated_at", "ascending"),
+                    ("qualification_score", "descending"),
+                ],
+            )
+        )
+        _write_table_atomic(table, part_path)
+        stats["rows"] += table.num_rows
+        stats["partitions"] += 1
+        log(f"[Compact] {part_path}: {table.num_rows} 行")
+
+    if delete_sources:
+        for path in sources + covered:
+            os.remove(path)
+        log(f"[Compact] 已删除 {len(sources) + len(covered)} 个已合并的运行文件")
+    return stats
+
+
+def export_report_parquet(
+    report: SalesLeadReport,
+    path: str,
+    log: Callable[[str], None],
+) -> Optional[str]:
+    """流水线结束时导出 Parquet；pyarrow 未安装或写入失败时记录日志并跳过。"""
+    if not pyarrow_available():
+        log("[Parquet] 未安装 pyarrow，跳过 Parquet 导出（pip install pyarrow）")
+        return None
+    try:
+        write_report_parquet(report, path)
+    except (OSError, ValueError) as e:
+        log(f"[Parquet] 导出失败: {e}")
+        return None
+    log(f"Parquet 已保存: {path}")
+    return path
@@ -0,0 +1,356 @@
+"""
+InsightFlow 销售线索模块 - 跨运行线索库
+文件路径: src/lead_store.py
+
+把每次运行的线索、BANT 评估、联系人结果写入本地 SQLite，
+后续运行在调用 Lead Qualifier / Contact Enrichment 之前先查库，
+同一产品下已评估 / 已补充联系人的公司直接复用，不再重复付费。
+
+  - 主键: 产品 key（归一化产品名）+ 公司实体 key（见 entity_resolution）
+  - 索引: 公司名 key、域名、产品、更新时间
+  - 域名: 只取自线索自身的 website（domain_source 记录来源），公司名未命中时
+    才按域名匹配；source_url 是发现线索的页面（招标门户等），不作为公司标识
+  - 内容: 评估结果（含 BANT）、联系人结果、最终 EnrichedLead、来源（run_id / source_url）
+  - 过期: 超过 max_age_days 的评估 / 联系人结果不再复用（记录保留）
+  - 写入: 每次运行结束时在一个事务内批量 upsert
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from src.config import Config
+from src.entity_resolution import company_domain, normalize_company_name
+from src.models.sales_schemas import EnrichedLead
+
+
+# 单条 SQL 中 IN (...) 的最大参数个数
+_QUERY_CHUNK = 500
+# domain_source: 域名取自线索自身的 website
+_WEBSITE = "website"
+
+
+def normalize_product_name(product_name: str) -> str:
+    """归一化产品名：去首尾空白、合并连续空白、转小写。"""
+    return re.sub(r"\s+", " ", (product_name or "").strip()).lower()
+
+
+def _lead_keys(lead: dict) -> tuple[str, str]:
+    return normalize_company_name(lead.get("company_name", "")), company_domain(lead)
+
+
+_RECORD_COLUMNS = (
+    "name_key, domain, company_name, qualification_score, priority, "
+    "qualified, enrichment, run_id, qualified_at, enriched_at"
+)
+
+
+def _record(row: tuple) -> dict[str, Any]:
+    record = dict(zip([c.strip() for c in _RECORD_COLUMNS.split(",")], row))
+    for column in ("qualified", "enrichment"):
+        if record[column] is not None:
+            record[column] = json.loads(record[column])
+    return record
+
+
+class LeadStore:
+    """SQLite 线索库（线程安全）"""
+
+    def __init__(self, path: str, max_age_seconds: float = 0.0):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.qualified_hits = 0
+        self.enrichment_hits = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS leads (
+                product_key TEXT NOT NULL,
+                name_key TEXT NOT NULL,
+                domain TEXT NOT NULL DEFAULT '',
+                domain_source TEXT NOT NULL DEFAULT '',
+                company_name TEXT NOT NULL,
+                qualification_score INTEGER,
+                priority TEXT,
+                qualified TEXT,
+                enrichment TEXT,
+                lead TEXT,
+                run_id TEXT NOT NULL DEFAULT '',
+                source_url TEXT NOT NULL DEFAULT '',
+                first_seen REAL NOT NULL,
+                qualified_at REAL,
+                enriched_at REAL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (product_key, name_key)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_leads_name ON leads(name_key)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_leads_domain ON leads(product_key, domain)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_leads_updated ON leads(updated_at)"
+        )
+        self._conn.commit()
+
+    # ── 查询 ───────────────────────────────────────────────────
+
+    def _fetch(
+        self,
+        product: str,
+        leads: list[dict],
+        condition: str = "1",
+        params: tuple = (),
+    ) -> dict[int, dict[str, Any]]:
+        """按公司名 key / 域名批量查询满足 condition 的记录，返回 {下标: 记录}。
+
+        域名只匹配同样来自 website 的记录（见 company_domain）。
+        """
+        keys = [_lead_keys(lead) for lead in leads]
+        names = sorted({name for name, _ in keys if name})
+        domains = sorted({domain for _, domain in keys if domain})
+
+        by_name: dict[str, dict[str, Any]] = {}
+        by_domain: dict[str, dict[str, Any]] = {}
+        with self._lock:
+            for field, values, target, extra in (
+                ("name_key", names, by_name, ""),
+                ("domain", domains, by_domain, f"AND domain_source = '{_WEBSITE}' "),
+            ):
+                for start in range(0, len(values), _QUERY_CHUNK):
+                    chunk = values[start : start + _QUERY_CHUNK]
+                    rows = self._conn.execute(
+                        f"SELECT {_RECORD_COLUMNS} FROM leads "
+                        f"WHERE product_key = ? AND {field} IN ({','.join('?' * len(chunk))}) "
+                        f"{extra}AND {condition} ORDER BY updated_at",
+                        (product, *chunk, *params),
+                    ).fetchall()
+                    for row in rows:
+                        record = _record(row)
+                        target[record[field]] = record
+
+        found: dict[int, dict[str, Any]] = {}
+        for i, (name, domain) in enumerate(keys):
+            record = by_name.get(name) if name else None
+            if record is None and domain:
+                record = by_domain.get(domain)
+            if record is not None:
+                found[i] = record
+        return found
+
+    def _min_stamp(self, max_age_seconds: Optional[float]) -> float:
+        if max_age_seconds is None:
+            max_age_seconds = self.max_age_seconds
+        return time.time() - max_age_seconds if max_age_seconds > 0 else 0.0
+
+    def lookup_qualified(
+        self,
+        product: str,
+        leads: list[dict],
+        max_age_seconds: Optional[float] = None,
+    ) -> dict[int, dict]:
+        """已有的 BANT 评估结果 {lead 下标: qualified lead}。"""
+        found = self._fetch(
+            product,
+            leads,
+            "qualified IS NOT NULL AND qualified_at >= ?",
+            (self._min_stamp(max_age_seconds),),
+        )
+        self.qualified_hits += len(found)
+        return {i: record["qualified"] for i, record in found.items()}
+
+    def lookup_enrichment(
+        self,
+        product: str,
+        leads: list[dict],
+        max_age_seconds: Optional[float] = None,
+    ) -> dict[int, dict]:
+        """已有的联系人结果 {lead 下标: ContactEnrichmentResult 数据}。"""
+        found = self._fetch(
+            product,
+            leads,
+            "enrichment IS NOT NULL AND enriched_at >= ?",
+            (self._min_stamp(max_age_seconds),),
+        )
+        self.enrichment_hits += len(found)
+        return {i: record["enrichment"] for i, record in found.items()}
+
+    def lookup_records(self, product: str, leads: list[dict]) -> dict[int, dict[str, Any]]:
+        """已有的完整记录（不论是否过期）{lead 下标: 记录}，用于增量运行比对。"""
+        return self._fetch(product, leads)
+
+    def latest_run_id(self, product: str) -> str:
+        """该产品最近一次写入的运行 ID；没有记录时返回空串。"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM leads WHERE product_key = ? "
+                "ORDER BY updated_at DESC LIMIT 1",
+                (product,),
+            ).fetchone()
+        return row[0] if row else ""
+
+    def run_records(
+        self,
+        product: str,
+        run_id: str,
+        max_age_seconds: Optional[float] = None,
+    ) -> list[dict[str, Any]]:
+        """某次运行写入的、评估结果未过期的记录（按评分降序）。"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_RECORD_COLUMNS} FROM leads "
+                "WHERE product_key = ? AND run_id = ? "
+                "AND qualified IS NOT NULL AND qualified_at >= ? "
+                "ORDER BY qualification_score DESC",
+                (product, run_id, self._min_stamp(max_age_seconds)),
+            ).fetchall()
+        return [_record(row) for row in rows]
+
+    # ── 写入 ───────────────────────────────────────────────────
+
+    def save_run(
+        self,
+        product: str,
+        run_id: str,
+        raw_leads: list[dict],
+        qualified_leads: Optional[list[dict]] = None,
+        enrichment_map: Optional[dict[str, dict]] = None,
+        enriched_leads: Optional[list[EnrichedLead]] = None,
+    ) -> int:
+        """在一个事务内批量写入本次运行的结果，返回写入的公司数。
+
+        已有记录只覆盖本次有值的字段（本次未评估 / 未补充联系人的保留旧结果）；
+        从库中复用、内容未变的结果保留原时间戳，不会因反复复用而永不过期。
+        """
+        now = time.time()
+        enrichment_map = enrichment_map or {}
+        rows: dict[str, dict[str, Any]] = {}
+
+        def _row(lead: dict) -> Optional[dict[str, Any]]:
+            name_key, domain = _lead_keys(lead)
+            if not name_key:
+                return None
+            row = rows.setdefault(
+                name_key,
+                {
+                    "name_key": name_key,
+                    "domain": domain,
+                    "domain_source": _WEBSITE if domain else "",
+                    "company_name": str(lead.get("company_name", "")),
+                    "source_url": str(lead.get("source_url", "")),
+                    "qualification_score": None,
+                    "priority": None,
+                    "qualified": None,
+                    "qualified_at": None,
+                    "enrichment": None,
+                    "enriched_at": None,
+                    "lead": None,
+                },
+            )
+            if domain and not row["domain"]:
+                row["domain"] = domain
+                row["domain_source"] = _WEBSITE
+            return row
+
+        for lead in raw_leads:
+            _row(lead)
+        for lead in qualified_leads or []:
+            row = _row(lead)
+            if row is None:
+                continue
+            row["qualification_score"] = int(lead.get("qualification_score", 0) or 0)
+            row["priority"] = str(lead.get("priority", "cold"))
+            row["qualified"] = json.dumps(lead, ensure_ascii=False)
+            row["qualified_at"] = now
+            enrichment = enrichment_map.get(str(lead.get("company_name", "")).strip().lower())
+            if enrichment:
+                row["enrichment"] = json.dumps(enrichment, ensure_ascii=False)
+                row["enriched_at"] = now
+        for lead in enriched_leads or []:
+            row = _row(lead.model_dump())
+            if row is not None:
+                row["lead"] = lead.model_dump_json()
+
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    """
+                    INSERT INTO leads (
+                        product_key, name_key, domain, domain_source, company_name,
+                        qualification_score, priority, qualified, enrichment, lead,
+                        run_id, source_url, first_seen, qualified_at, enriched_at, updated_at
+                    ) VALUES (
+                        :product_key, :name_key, :domain, :domain_source, :company_name,
+                        :qualification_score, :priority, :qualified, :enrichment, :lead,
+                        :run_id, :source_url, :now, :qualified_at, :enriched_at, :now
+                    )
+                    ON CONFLICT (product_key, name_key) DO UPDATE SET
+                        domain_source = CASE WHEN excluded.domain != '' THEN excluded.domain_source
+                            ELSE domain_source END,
+                        domain = CASE WHEN excluded.domain != '' THEN excluded.domain ELSE domain END,
+                        company_name = excluded.company_name,
+                        qualification_score = COALESCE(excluded.qualification_score, qualification_score),
+                        priority = COALESCE(excluded.priority, priority),
+                        qualified_at = CASE WHEN excluded.qualified IS NULL
+                            OR excluded.qualified = qualified THEN qualified_at
+                            ELSE excluded.qualified_at END,
+                        qualified = COALESCE(excluded.qualified, qualified),
+                        enriched_at = CASE WHEN excluded.enrichment IS NULL
+                            OR excluded.enrichment = enrichment THEN enriched_at
+                            ELSE excluded.enriched_at END,
+                        enrichment = COALESCE(excluded.enrichment, enrichment),
+                        lead = COALESCE(excluded.lead, lead),
+                        run_id = excluded.run_id,
+                        source_url = CASE WHEN excluded.source_url != '' THEN excluded.source_url ELSE source_url END,
+                        updated_at = excluded.updated_at
+                    """,
+                    [
+                        {**row, "product_key": product, "run_id": run_id, "now": now}
+                        for row in rows.values()
+                    ],
+                )
+        return len(rows)
+
+    def stats(self) -> dict[str, int]:
+        """返回复用计数和当前记录数。"""
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM leads").fetchone()
+        return {
+            "qualified_hits": self.qualified_hits,
+            "enrichment_hits": self.enrichment_hits,
+            "entries": size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_lead_store: Optional[LeadStore] = None
+
+
+def get_lead_store() -> Optional[LeadStore]:
+    """获取进程级共享的线索库；配置禁用时返回 None。"""
+    global _lead_store
+    config = Config()
+    if not config.get("sales_leads.lead_store.enabled", True):
+        return None
+    if _lead_store is None:
+        _lead_store = LeadStore(
+            path=str(config.get("sales_leads.lead_store.path", "outputs/lead_store.db")),
+            max_age_seconds=float(config.get("sales_leads.lead_store.max_age_days", 30))
+            * 86400,
+        )
+    return _lead_store
@@ -0,0 +1,209 @@
+"""
+InsightFlow 销售线索模块 - 增量线索导出
+文件路径: src/lead_writer.py
+
+CSV / JSONL 原先在流水线全部结束后一次性生成：深度运行期间用户看不到任何结果，
+进程中途退出则全部丢失。这里的写入器在运行中边产出边追加：
+
+  - 运行中写入 <最终文件名>.partial，每 flush_rows 行或 flush_seconds 秒刷盘一次
+  - 结束时按最终顺序把完整内容写入临时文件再 rename 为最终文件（原子替换），
+    随后删除 .partial；运行失败时保留 .partial 供查看
+  - 不需要增量输出的场景用 write_rows_atomic 一次性原子写入
+"""
+
+import csv
+import json
+import os
+import time
+from typing import Any, Callable, Iterable, Optional
+
+
+def _write_rows(f, fmt: str, rows: Iterable[Any]) -> int:
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(f)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for record in rows:
+            f.write(json.dumps(record, ensure_ascii=False, default=str))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def write_rows_atomic(
+    path: str,
+    fmt: str,
+    rows: Iterable[Any],
+    header: Optional[list[str]] = None,
+    encoding: str = "utf-8",
+) -> str:
+    """先写临时文件再 rename，一次性写出完整的 CSV（fmt="csv"）或 JSONL（fmt="jsonl"）。"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding=encoding) as f:
+        if header:
+            _write_rows(f, "csv", [header])
+        _write_rows(f, fmt, rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+class StreamingFileWriter:
+    """运行中追加写入 .partial，结束时原子替换为最终文件"""
+
+    def __init__(
+        self,
+        path: str,
+        fmt: str = "csv",
+        header: Optional[list[str]] = None,
+        encoding: str = "utf-8",
+        flush_rows: int = 20,
+        flush_seconds: float = 5.0,
+    ):
+        if fmt not in ("csv", "jsonl"):
+            raise ValueError(f"不支持的导出格式: {fmt}")
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        self.fmt = fmt
+        self.header = header
+        self.encoding = encoding
+        self.flush_rows = max(1, flush_rows)
+        self.flush_seconds = flush_seconds
+        self.rows_written = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(self.partial_path, "w", newline="", encoding=encoding)
+        if header:
+            _write_rows(self._file, "csv", [header])
+            self.flush()
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def write(self, rows: Iterable[Any]) -> None:
+        """追加若干行（CSV 为列表，JSONL 为可序列化对象），按行数 / 时间间隔刷盘。"""
+        if self.closed:
+            return
+        count = _write_rows(self._file, self.fmt, rows)
+        self.rows_written += count
+        self._pending += count
+        if (
+            self._pending >= self.flush_rows
+            or time.monotonic() - self._last_flush >= self.flush_seconds
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        if self.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def finalize(self, rows: Optional[Iterable[Any]] = None) -> str:
+        """结束写入：传入 rows 时以它为完整内容原子写出，否则把 .partial 原子改名。"""
+        if rows is not None:
+            self.close()
+            write_rows_atomic(self.path, self.fmt, rows, self.header, self.encoding)
+            os.remove(self.partial_path)
+        else:
+            self.flush()
+            self._file.close()
+            os.replace(self.partial_path, self.path)
+        return self.path
+
+    def close(self) -> None:
+        """放弃最终化（运行失败），刷盘后关闭，保留 .partial。"""
+        if self.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def discard(self) -> None:
+        """关闭并删除 .partial（没有任何结果时）。"""
+        self.close()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+
+class LeadExport:
+    """一次运行的线索导出：CSV + 可选 JSONL，两者同步追加和落盘"""
+
+    def __init__(
+        self,
+        csv_path: str,
+        csv_header: list[str],
+        csv_rows: Callable[[Any], list[list]],
+        jsonl_path: str = "",
+        jsonl_record: Optional[Callable[[Any], dict]] = None,
+        stream: bool = True,
+        flush_rows: int = 20,
+        flush_seconds: float = 5.0,
+    ):
+        self.csv_path = csv_path
+        self.csv_header = csv_header
+        self.jsonl_path = jsonl_path if jsonl_record is not None else ""
+        self._csv_rows = csv_rows
+        self._jsonl_record = jsonl_record
+        self._writers: list[StreamingFileWriter] = []
+        if stream:
+            self._writers.append(
+                StreamingFileWriter(
+                    csv_path,
+                    "csv",
+                    header=csv_header,
+                    encoding="utf-8-sig",
+                    flush_rows=flush_rows,
+                    flush_seconds=flush_seconds,
+                )
+            )
+            if self.jsonl_path:
+                self._writers.append(
+                    StreamingFileWriter(
+                        self.jsonl_path,
+                        "jsonl",
+                        flush_rows=flush_rows,
+                        flush_seconds=flush_seconds,
+                    )
+                )
+
+    def append(self, items: list[Any]) -> None:
+        """追加已完成的线索（运行中的进度）。"""
+        if not items:
+            return
+        for writer in self._writers:
+            if writer.fmt == "csv":
+                writer.write(row for item in items for row in self._csv_rows(item))
+            else:
+                writer.write(self._jsonl_record(item) for item in items)
+
+    def finalize(self, items: list[Any]) -> None:
+        """按最终线索列表原子写出 CSV / JSONL，替换运行中的 .partial。"""
+        csv_rows = (row for item in items for row in self._csv_rows(item))
+        jsonl_rows = (
+            (self._jsonl_record(item) for item in items) if self._jsonl_record else None
+        )
+        if not self._writers:
+            write_rows_atomic(self.csv_path, "csv", csv_rows, self.csv_header, "utf-8-sig")
+            if self.jsonl_path:
+                write_rows_atomic(self.jsonl_path, "jsonl", jsonl_rows)
+            return
+        for writer in self._writers:
+            writer.finalize(csv_rows if writer.fmt == "csv" else jsonl_rows)
+
+    def close(self) -> None:
+        for writer in self._writers:
+            writer.close()
+
+    def discard(self) -> None:
+        for writer in self._writers:
+            writer.discard()
@@ -386,9 +386,58 @@ class EnrichedLead(BaseModel):
 # ================================================================
 
 
+class TokenUsageItem(BaseModel):
+    """单个 Agent / 阶段的 token 用量"""
+
+    calls: int = 0
+    cached_calls: int = 0  # 命中 LLM 响应缓存的调用（不计入预算）
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+
+
+class TokenUsage(BaseModel):
+    """单次运行的 token 用量与预算"""
+
+    budget: int = 0  # depth_presets.token_budget，0 表示不限
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    by_agent: dict[str, TokenUsageItem] = {}
+    by_stage: dict[str, TokenUsageItem] = {}
+    degraded_stages: list[str] = []  # 因预算不足降级的阶段
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+class DeltaLead(BaseModel):
+    """增量运行中新增 / 重新评估的线索"""
+
+    company_name: str
+    priority: str = ""  # 本次评估结果（未进入评估结果时为空）
+    qualification_score: int = 0
+    previous_priority: str = ""  # 上次评估结果（新公司为空）
+    previous_score: int = 0
+
+
+class DeltaSummary(BaseModel):
+    """增量运行相对于上次运行的变化"""
+
+    previous_run_id: str = ""  # 上次运行 ID（首次运行为空）
+    stale_days: float = 0.0  # 超过该天数的已有结果重新评估
+    new_leads: list[DeltaLead] = []  # 线索库中没有的公司
+    refreshed_leads: list[DeltaLead] = []  # 结果过期、重新评估的公司
+    unchanged_count: int = 0  # 直接复用上次结果的公司数
+    carried_over_count: int = 0  # 本次未搜到、沿用上次结果的公司数
+
+
 class SalesLeadReport(BaseModel):
     """销售线索报告元数据"""
 
+    run_id: str = ""  # 检查点运行 ID，可用于 --resume
     product_name: str
     product_profile: Optional[ProductProfile] = None
     icp: Optional[ICP] = None
@@ -401,10 +450,17 @@ class SalesLeadReport(BaseModel):
 
     report_filepath: str = ""
     csv_filepath: str = ""
+    jsonl_filepath: str = ""  # EnrichedLead JSONL（output.jsonl 启用时）
+    parquet_filepath: str = ""  # 嵌套列 Parquet（output.parquet 启用且安装 pyarrow 时）
 
     generated_at: datetime = Field(default_factory=datetime.now)
     search_strategies_used: list[str] = []
     total_search_queries: int = 0
+    truncated_stages: list[str] = []  # 因超出 timeout_minutes 被提前结束的阶段
+    stage_timings: dict[str, float] = {}  # 各阶段耗时（秒）
+    trace_filepath: str = ""  # 追踪 JSONL 路径（tracing 启用时）
+    token_usage: TokenUsage = TokenUsage()  # LLM token 用量（按 Agent / 阶段）
+    delta: Optional[DeltaSummary] = None  # 增量运行的变化（delta 模式）
     execution_time_seconds: float = 0.0
 
 
@@ -15,24 +15,35 @@ full 模式继续执行:
 """
 
 import asyncio
-import csv
 import json
 import os
+import re
+import sqlite3
 import time
 from datetime import datetime
-from typing import Callable, Optional
+from typing import Any, Awaitable, Callable, Optional
 from urllib.parse import urlparse
 
+from agentscope.agent import ReActAgent
 from agentscope.message import Msg
 
-from src.agents import create_agents
+from src.agents import create_agent
+from src.agents.llm_cache import get_llm_cache
+from src.checkpoint import RunCheckpoint
 from src.config import Config
+from src.deadline import STAGE_LABELS, PipelineDeadline, build_pipeline_deadline
+from src.delta import DeltaPlan, plan_delta
+from src.entity_resolution import CompanyIndex
+from src.lead_parquet import export_report_parquet
+from src.lead_store import LeadStore, get_lead_store, normalize_product_name
+from src.lead_writer import LeadExport, write_rows_atomic
 from src.models.sales_schemas import (
     BANTAssessment,
     BANTDimension,
     CompanyContact,
     ContactEnrichmentResult,
     ContactPerson,
+    DeltaSummary,
     EnrichedLead,
     ICP,
     ProductProfile,
@@ -45,10 +56,23 @@ from src.models.sales_schemas import (
     SearchStrategy,
     SearchTask,
 )
-from src.tools.web_search import (
-    close_mcp_clients,
-    setup_file_toolkit,
-    setup_search_toolkit,
+from src.runtime import SalesRuntime
+from src.token_meter import (
+    activate_meter,
+    build_token_meter,
+    deactivate_meter,
+    token_budget_allows,
+)
+from src.tools.search_cache import get_search_cache
+from src.tools.web_search import search_duckduckgo
+from src.tracing import (
+    Span,
+    Tracer,
+    activate_tracer,
+    deactivate_tracer,
+    format_slowest_table,
+    trace_span,
+    tracing_enabled,
 )
 
 
@@ -114,41 +138,61 @@ def _try_parse_json(text: str) -> dict | None:
         except (ValueError, json.JSONDecodeError):
             pass
 
-    # 4. 最外层 { ... } — 使用括号匹配而非简单的 index/rindex
-    #    从最后一个 '{' 开头尝试倒推，优先找最大的完整 JSON 块
-    brace_positions = [i for i, c in enumerate(text) if c == "{"]
-    for start in reversed(brace_positions):
-        # 从 start 开始，用括号计数找到匹配的 '}'
-        depth = 0
-        in_string = False
-        escape_next = False
-        for i in range(start, len(text)):
-            ch = text[i]
-            if escape_next:
-                escape_next = False
-                continue
-            if ch == "\\":
-                escape_next = True
-                continue
-            if ch == '"' and not escape_next:
-                in_string = not in_string
-                continue
-            if in_string:
-                continue
-            if ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    try:
-                        result = json.loads(text[start : i + 1])
-                        if isinstance(result, dict):
-                            return result
-                    except (json.JSONDecodeError, ValueError):
-                        pass
-                    break
+    # 4. 最外层 { ... } — 单次扫描找出所有顶层完整 JSON 对象，取最大的一个
+    best: dict | None = None
+    best_len = -1
+    for start, end, value in _scan_outermost_json_objects(text):
+        if isinstance(value, dict) and end - start > best_len:
+            best, best_len = value, end - start
+    return best
 
-    return None
+
+_JSON_DECODER = json.JSONDecoder()
+
+# 括号匹配的词法单元：完整字符串（含转义，允许未闭合）或单个花括号，
+# 其余字符由正则一次跳过
+_JSON_BRACE_TOKENS = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"?|[{}]')
+
+
+def _match_brace(text: str, start: int) -> int:
+    """从 text[start] == '{' 开始做括号匹配，返回匹配的 '}' 之后的位置；未闭合返回 -1。"""
+    depth = 0
+    for match in _JSON_BRACE_TOKENS.finditer(text, start):
+        token = match.group()
+        if token == "{":
+            depth += 1
+        elif token == "}":
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return -1
+
+
+def _scan_outermost_json_objects(text: str) -> list[tuple[int, int, object]]:
+    """从左到右线性扫描，返回所有最外层完整 JSON 对象的 (start, end, value)。
+
+    - 合法对象由 C 实现的 raw_decode 一次解析完毕，直接跳到其末尾
+    - 括号平衡但非法的块（如单引号、模板占位符 {company}）整体跳过
+    - 未闭合的块（输出被截断）不作为候选，继续在其内部寻找完整对象
+    """
+    objects: list[tuple[int, int, object]] = []
+    pos = 0
+    while True:
+        start = text.find("{", pos)
+        if start < 0:
+            return objects
+        try:
+            value, end = _JSON_DECODER.raw_decode(text, start)
+        except json.JSONDecodeError as e:
+            if e.msg.startswith("Unterminated string") or not text[e.pos :].strip():
+                # 解析一直读到文本末尾：对象被截断，无需再做括号匹配
+                end = -1
+            else:
+                end = _match_brace(text, start)
+            pos = end if end > 0 else start + 1
+            continue
+        objects.append((start, end, value))
+        pos = end
 
 
 def parse_json_from_msg(msg: Msg) -> dict:
@@ -229,6 +273,18 @@ def _extract_structured_or_parse(msg: Msg) -> dict:
     return parse_json_from_msg(msg)
 
 
+def _is_interrupted(msg: Msg) -> bool:
+    """ReActAgent 被取消时不抛出 CancelledError，而是返回带 _is_interrupted 的消息。"""
+    return isinstance(msg.metadata, dict) and bool(msg.metadata.get("_is_interrupted"))
+
+
+def _raise_if_interrupted(msg: Msg) -> Msg:
+    """把 Agent 吞掉的取消还原为 CancelledError，让 worker 真正停止。"""
+    if _is_interrupted(msg):
+        raise asyncio.CancelledError
+    return msg
+
+
 def _normalize_sales_plan_data(raw: dict) -> dict:
     """标准化 Sales Orchestrator 输出，修复嵌套字段被字符串化的问题。"""
     normalized = dict(raw) if isinstance(raw, dict) else {}
@@ -258,17 +314,35 @@ def _normalize_sales_plan_data(raw: dict) -> dict:
     return normalized
 
 
-def merge_and_deduplicate(scan_results: list[Msg]) -> list[dict]:
-    """合并多次搜索结果并按公司名去重"""
-    seen: set[str] = set()
+def new_company_index() -> CompanyIndex:
+    """按 sales_leads.search.entity_similarity 创建线索实体索引。"""
+    return CompanyIndex(
+        similarity=float(Config().get("sales_leads.search.entity_similarity", 0.8))
+    )
+
+
+def merge_and_deduplicate(
+    scan_results: list[Msg],
+    seen: Optional[CompanyIndex] = None,
+) -> list[dict]:
+    """合并多次搜索结果并按公司实体去重
+
+    同一公司的不同写法（法律后缀、中英文名 + 相同域名、相似名称）
+    归并为一条，重复线索的补充信息合并到首条上。
+
+    Args:
+        scan_results: Market Scanner 返回的消息列表
+        seen: 可选的实体索引（就地更新），用于增量合并；
+            传入时只返回此前未出现过的公司
+    """
+    if seen is None:
+        seen = new_company_index()
     merged: list[dict] = []
     for msg in scan_results:
         try:
             data = _extract_structured_or_parse(msg)
             for lead in data.get("leads_found", []):
-                name = lead.get("company_name", "").strip().lower()
-                if name and name not in seen:
-                    seen.add(name)
+                if isinstance(lead, dict) and seen.add(lead):
                     merged.append(lead)
         except Exception:
             continue
@@ -456,27 +530,28 @@ async def _expand_leads_for_broad_mode(
     tasks_to_run: list[SearchTask],
     existing_leads: list[dict],
     target_count: int,
+    concurrency: int = 6,
+    max_queries: int = 80,
+    deadline: Optional[PipelineDeadline] = None,
 ) -> list[dict]:
-    """当广撒网结果过少时，使用 DDGS 直接扩量抓取。"""
+    """当广撒网结果过少时，使用 DDGS 直接扩量抓取。
+
+    查询以有限并发扇出（请求速率由 DuckDuckGo 共享限流器控制），
+    每批结果返回后立即按公司实体（名称 / 域名，见 CompanyIndex）去重入库；
+    达到 target_count 或 "expand" 时间片用完后取消其余在途查询。
+    """
     if len(existing_leads) >= target_count:
         return existing_leads
 
     try:
-        from ddgs import DDGS
+        import ddgs  # noqa: F401
     except Exception as e:
         print(f"[Broad] 扩量跳过：ddgs 不可用: {e}")
         return existing_leads
 
-    seen_company: set[str] = {
-        str(item.get("company_name", "")).strip().lower()
-        for item in existing_leads
-        if str(item.get("company_name", "")).strip()
-    }
-    seen_domain: set[str] = {
-        _extract_domain(str(item.get("website", "")))
-        for item in existing_leads
-        if _extract_domain(str(item.get("website", "")))
-    }
+    seen = new_company_index()
+    for item in existing_leads:
+        seen.add(item)
 
     queries: list[str] = []
     seen_query: set[str] = set()
@@ -491,58 +566,61 @@ async def _expand_leads_for_broad_mode(
             seen_query.add(k)
             queries.append(qq)
 
-    max_queries = min(len(queries), 80)
-    for query in queries[:max_queries]:
-        if len(existing_leads) >= target_count:
-            break
-
-        def _sync_search() -> list[dict]:
-            with DDGS() as ddgs:
-                raw = list(ddgs.text(query, max_results=50, region="cn-zh"))
-                if not raw:
-                    raw = list(ddgs.text(query, max_results=50))
-                return raw
-
-        try:
-            raw_results = await asyncio.to_thread(_sync_search)
-        except Exception:
-            continue
-
+    def _absorb(raw_results: list[dict]) -> None:
+        # 同步执行（中间没有 await），并发 worker 之间的去重天然是原子的
         for row in raw_results:
             if len(existing_leads) >= target_count:
                 break
-            url = str(row.get("href", "")).strip()
+            url = str(row.get("url", "")).strip()
             if not url:
                 continue
             domain = _extract_domain(url)
-            if domain and domain in seen_domain:
-                continue
-
             company_name = _guess_company_name(str(row.get("title", "")), url)
             if not company_name:
                 continue
-            company_key = company_name.strip().lower()
-            if company_key in seen_company:
-                continue
 
-            seen_company.add(company_key)
-            if domain:
-                seen_domain.add(domain)
+            lead = {
+                "company_name": company_name,
+                "website": f"https://{domain}" if domain else "",
+                "industry": "unknown",
+                "estimated_size": "unknown",
+                "employee_count_range": "",
+                "size_evidence": "来自搜索结果标题/摘要，待二次核验",
+                "match_signals": [str(row.get("snippet", "")).strip()],
+                "source_url": url,
+                "notes": "broad_mode_ddgs_expansion",
+            }
+            if seen.add(lead):
+                existing_leads.append(lead)
 
-            existing_leads.append(
-                {
-                    "company_name": company_name,
-                    "website": f"https://{domain}" if domain else "",
-                    "industry": "unknown",
-                    "estimated_size": "unknown",
-                    "employee_count_range": "",
-                    "size_evidence": "来自搜索结果标题/摘要，待二次核验",
-                    "match_signals": [str(row.get("body", "")).strip()],
-                    "source_url": url,
-                    "notes": "broad_mode_ddgs_expansion",
-                }
-            )
+    # 多个 worker 共享同一个查询迭代器
+    query_iter = iter(queries[:max_queries])
+    workers: list[asyncio.Task] = []
 
+    async def _worker() -> None:
+        for query in query_iter:
+            if len(existing_leads) >= target_count:
+                return
+            try:
+                # 与 web_search 工具共用同一份搜索缓存和限流器
+                with trace_span("tool", "search_duckduckgo", label=query[:80]):
+                    raw_results = await search_duckduckgo(query, max_results=50)
+            except Exception:
+                continue
+            _absorb(raw_results)
+            if len(existing_leads) >= target_count:
+                # 目标已达成，取消其余在途查询
+                current = asyncio.current_task()
+                for worker in workers:
+                    if worker is not current:
+                        worker.cancel()
+                return
+
+    workers.extend(
+        asyncio.create_task(_worker()) for _ in range(max(1, concurrency))
+    )
+    if not await (deadline or PipelineDeadline()).wait("expand", workers):
+        print(f"[Broad] 扩量时间片用完，当前 {len(existing_leads)} 条")
     return existing_leads
 
 
@@ -614,101 +692,110 @@ def build_enriched_leads(
     return results
 
 
-def generate_csv(leads: list[EnrichedLead], filepath: str) -> str:
-    """生成 CSV 文件"""
-    headers = [
-        "优先级",
-        "公司名",
-        "官网",
-        "行业",
-        "规模",
-        "员工规模区间",
-        "目标公司规模(ICP)",
-        "规模匹配",
-        "规模判断",
-        "规模依据",
-        "匹配度",
-        "BANT总分",
-        "Budget",
-        "Authority",
-        "Need",
-        "Timing",
-        "联系人姓名",
-        "联系人职位",
-        "联系人来源",
-        "联系人可信度",
-        "邮箱",
-        "电话",
-        "公司通用邮箱",
-        "公司电话",
-        "联系页面",
-        "地址",
-        "建议触达方式",
-        "触达话术",
+# 完整模式 CSV 表头（每个联系人一行，无联系人时一行）
+CSV_HEADERS: list[str] = [
+    "优先级",
+    "公司名",
+    "官网",
+    "行业",
+    "规模",
+    "员工规模区间",
+    "目标公司规模(ICP)",
+    "规模匹配",
+    "规模判断",
+    "规模依据",
+    "匹配度",
+    "BANT总分",
+    "Budget",
+    "Authority",
+    "Need",
+    "Timing",
+    "联系人姓名",
+    "联系人职位",
+    "联系人来源",
+    "联系人可信度",
+    "邮箱",
+    "电话",
+    "公司通用邮箱",
+    "公司电话",
+    "联系页面",
+    "地址",
+    "建议触达方式",
+    "触达话术",
+]
+
+
+def lead_csv_rows(lead: EnrichedLead) -> list[list]:
+    """单条 EnrichedLead 对应的 CSV 行（列顺序同 CSV_HEADERS）。"""
+    row_base = [
+        lead.priority,
+        lead.company_name,
+        lead.website,
+        lead.industry,
+        lead.estimated_size,
+        lead.employee_count_range,
+        ", ".join(lead.target_company_size),
+        lead.size_match,
+        lead.size_judgement,
+        lead.size_evidence,
+        lead.qualification_score,
+        lead.bant_assessment.total_score,
+        lead.bant_assessment.budget.score,
+        lead.bant_assessment.authority.score,
+        lead.bant_assessment.need.score,
+        lead.bant_assessment.timing.score,
     ]
-    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
-    with open(filepath, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        for lead in leads:
-            row_base = [
-                lead.priority,
-                lead.company_name,
-                lead.website,
-                lead.industry,
-                lead.estimated_size,
-                lead.employee_count_range,
-                ", ".join(lead.target_company_size),
-                lead.size_match,
-                lead.size_judgement,
-                lead.size_evidence,
-                lead.qualification_score,
-                lead.bant_assessment.total_score,
-                lead.bant_assessment.budget.score,
-                lead.bant_assessment.authority.score,
-                lead.bant_assessment.need.score,
-                lead.bant_assessment.timing.score,
+    if not lead.contacts:
+        return [
+            row_base
+            + [
+                "",
+                "",
+                "",
+                "",
+                lead.company_contact.general_email,
+                lead.company_contact.general_phone,
+                lead.company_contact.general_email,
+                lead.company_contact.general_phone,
+                lead.company_contact.contact_page,
+                lead.company_contact.address,
+                lead.recommended_approach,
+                "; ".join(lead.talking_points),
             ]
-            if lead.contacts:
-                for contact in lead.contacts:
-                    email = contact.email or lead.company_contact.general_email
-                    phone = contact.phone or lead.company_contact.general_phone
-                    writer.writerow(
-                        row_base
-                        + [
-                            contact.name,
-                            contact.title,
-                            contact.source,
-                            contact.confidence,
-                            email,
-                            phone,
-                            lead.company_contact.general_email,
-                            lead.company_contact.general_phone,
-                            lead.company_contact.contact_page,
-                            lead.company_contact.address,
-                            lead.recommended_approach,
-                            "; ".join(lead.talking_points),
-                        ]
-                    )
-            else:
-                writer.writerow(
-                    row_base
-                    + [
-                        "",
-                        "",
-                        "",
-                        "",
-                        lead.company_contact.general_email,
-                        lead.company_contact.general_phone,
-                        lead.company_contact.general_email,
-                        lead.company_contact.general_phone,
-                        lead.company_contact.contact_page,
-                        lead.company_contact.address,
-                        lead.recommended_approach,
-                        "; ".join(lead.talking_points),
-                    ]
-                )
-    return filepath
+        ]
+    rows = []
+    for contact in lead.contacts:
+        email = contact.email or lead.company_contact.general_email
+        phone = contact.phone or lead.company_contact.general_phone
+        rows.append(
+            row_base
+            + [
+                contact.name,
+                contact.title,
+                contact.source,
+                contact.confidence,
+                email,
+                phone,
+                lead.company_contact.general_email,
+                lead.company_contact.general_phone,
+                lead.company_contact.contact_page,
+                lead.company_contact.address,
+                lead.recommended_approach,
+                "; ".join(lead.talking_points),
+            ]
+        )
+    return rows
+
+
+def generate_csv(leads: list[EnrichedLead], filepath: str) -> str:
+    """生成 CSV 文件（原子写入）"""
+    return write_rows_atomic(
+        filepath,
+        "csv",
+        (row for lead in leads for row in lead_csv_rows(lead)),
+        header=CSV_HEADERS,
+        encoding="utf-8-sig",
+    )
 
 
 def _extract_reason_from_lead(lead: dict) -> str:
@@ -749,44 +836,52 @@ def build_broad_leads(raw_leads: list[dict]) -> list[EnrichedLead]:
     return leads
 
 
-def generate_broad_csv(raw_leads: list[dict], filepath: str) -> str:
-    """广撒网模式 CSV：公司信息 + reason + 来源。"""
-    headers = [
-        "公司名",
-        "官网",
-        "行业",
-        "规模",
-        "员工规模区间",
-        "目标公司规模(ICP)",
-        "规模匹配",
-        "规模判断",
-        "规模依据",
-        "reason",
-        "来源URL",
-        "备注",
+# 广撒网模式 CSV 表头
+BROAD_CSV_HEADERS: list[str] = [
+    "公司名",
+    "官网",
+    "行业",
+    "规模",
+    "员工规模区间",
+    "目标公司规模(ICP)",
+    "规模匹配",
+    "规模判断",
+    "规模依据",
+    "reason",
+    "来源URL",
+    "备注",
+]
+
+
+def broad_csv_rows(lead: dict) -> list[list]:
+    """单条原始线索对应的广撒网 CSV 行（列顺序同 BROAD_CSV_HEADERS）。"""
+    return [
+        [
+            lead.get("company_name", ""),
+            lead.get("website", ""),
+            lead.get("industry", ""),
+            lead.get("estimated_size", "unknown"),
+            lead.get("employee_count_range", ""),
+            ", ".join(lead.get("target_company_size", [])),
+            lead.get("size_match", "unknown"),
+            lead.get("size_judgement", ""),
+            lead.get("size_evidence", ""),
+            _extract_reason_from_lead(lead),
+            lead.get("source_url", ""),
+            lead.get("notes", ""),
+        ]
     ]
-    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
-    with open(filepath, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        for lead in raw_leads:
-            writer.writerow(
-                [
-                    lead.get("company_name", ""),
-                    lead.get("website", ""),
-                    lead.get("industry", ""),
-                    lead.get("estimated_size", "unknown"),
-                    lead.get("employee_count_range", ""),
-                    ", ".join(lead.get("target_company_size", [])),
-                    lead.get("size_match", "unknown"),
-                    lead.get("size_judgement", ""),
-                    lead.get("size_evidence", ""),
-                    _extract_reason_from_lead(lead),
-                    lead.get("source_url", ""),
-                    lead.get("notes", ""),
-                ]
-            )
-    return filepath
+
+
+def generate_broad_csv(raw_leads: list[dict], filepath: str) -> str:
+    """广撒网模式 CSV：公司信息 + reason + 来源（原子写入）。"""
+    return write_rows_atomic(
+        filepath,
+        "csv",
+        (row for lead in raw_leads for row in broad_csv_rows(lead)),
+        header=BROAD_CSV_HEADERS,
+        encoding="utf-8-sig",
+    )
 
 
 def generate_broad_markdown(
@@ -825,6 +920,986 @@ def generate_broad_markdown(
     return "\n".join(lines)
 
 
+def generate_basic_markdown(
+    product_profile: ProductProfile,
+    search_plan: SalesSearchPlan,
+    leads: list[EnrichedLead],
+) -> str:
+    """不经过 Lead Report Writer，直接由评估结果生成简版报告（超时兜底）。"""
+    lines = [
+        f"# {product_profile.product_name} 销售线索报告（简版）",
+        "",
+        "## 结果概要",
+        f"- 线索总数: **{len(leads)}**",
+        f"- 目标行业: {', '.join(search_plan.icp.target_industries) if search_plan.icp.target_industries else '未限定'}",
+        "",
+        "## 线索列表",
+        "| 公司 | 优先级 | 评分 | 行业 | 规模 | 联系人 | 建议切入方式 |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for lead in sorted(leads, key=lambda x: x.qualification_score, reverse=True):
+        contacts = "、".join(c.name for c in lead.contacts if c.name) or "-"
+        approach = lead.recommended_approach.replace("|", "/")
+        lines.append(
+            f"| {lead.company_name} | {lead.priority} | {lead.qualification_score} "
+            f"| {lead.industry} | {lead.estimated_size} | {contacts} | {approach} |"
+        )
+    return "\n".join(lines)
+
+
+def generate_delta_markdown(delta: DeltaSummary, max_rows: int = 50) -> str:
+    """增量运行报告开头的"本次新增"一节。"""
+    previous = delta.previous_run_id or "无（首次运行）"
+    new_hot_warm = [lead for lead in delta.new_leads if lead.priority in ("hot", "warm")]
+    lines = [
+        f"## 本次新增（相对上次运行 {previous}）",
+        f"- 新发现公司: **{len(delta.new_leads)}**（其中 Hot/Warm {len(new_hot_warm)}）",
+        f"- 结果超过 {delta.stale_days:g} 天、重新评估: {len(delta.refreshed_leads)}",
+        f"- 复用上次结果: {delta.unchanged_count}",
+        f"- 本次未搜到、沿用上次结果: {delta.carried_over_count}",
+        "",
+    ]
+    if delta.new_leads:
+        lines += ["### 新发现公司", "| 公司 | 优先级 | 评分 |", "|---|---|---|"]
+        for lead in delta.new_leads[:max_rows]:
+            lines.append(
+                f"| {lead.company_name} | {lead.priority or '-'} | {lead.qualification_score} |"
+            )
+        if len(delta.new_leads) > max_rows:
+            lines.append(f"\n其余 {len(delta.new_leads) - max_rows} 家见 CSV。")
+        lines.append("")
+    if delta.refreshed_leads:
+        lines += ["### 重新评估", "| 公司 | 上次 | 本次 |", "|---|---|---|"]
+        for lead in delta.refreshed_leads[:max_rows]:
+            lines.append(
+                f"| {lead.company_name} "
+                f"| {lead.previous_priority or '-'} ({lead.previous_score}) "
+                f"| {lead.priority or '-'} ({lead.qualification_score}) |"
+            )
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def _insert_delta_section(report_content: str, delta: DeltaSummary) -> str:
+    """把"本次新增"一节插到报告标题之后（没有一级标题时放在开头）。"""
+    section = generate_delta_markdown(delta)
+    title, _, body = report_content.partition("\n")
+    if title.startswith("# "):
+        return f"{title}\n\n{section}\n{body.lstrip()}"
+    return f"{section}\n{report_content}"
+
+
+def _prepend_truncation_notice(
+    report_content: str,
+    deadline: PipelineDeadline,
+    degraded_stages: Optional[list[str]] = None,
+) -> str:
+    """有阶段因超时被截断或因 token 预算不足而降级时，在报告开头注明结果不完整。"""
+    notice = ""
+    if deadline.truncated_stages:
+        stages = "、".join(deadline.describe_truncated())
+        notice += (
+            f"> ⚠️ 本次运行超出时间预算，以下阶段被提前结束：{stages}。"
+            "报告基于已完成部分生成，结果可能不完整。\n\n"
+        )
+    if degraded_stages:
+        stages = "、".join(STAGE_LABELS.get(s, s) for s in degraded_stages)
+        notice += (
+            f"> ⚠️ 本次运行 LLM token 预算不足，以下阶段已降级：{stages}。"
+            "部分搜索任务、评估或联系人补充未执行。\n\n"
+        )
+    return notice + report_content
+
+
+def _export_trace(
+    tracer: Tracer,
+    root_span: Span,
+    path: str,
+    log: Callable[[str], None],
+) -> str:
+    """结束 pipeline span，导出 JSONL 并输出按类型汇总和最慢 span 表。"""
+    root_span.finish()
+    try:
+        tracer.export_jsonl(path)
+    except OSError as e:
+        log(f"[Trace] 导出失败: {e}")
+        return ""
+    for kind, item in tracer.summary().items():
+        log(
+            f"[Trace] {kind}: {item['count']} 次，累计 {item['seconds']:.1f}s，"
+            f"tokens {item['input_tokens']}/{item['output_tokens']}，重试 {item['retries']}"
+        )
+    top_n = int(Config().get("tracing.top_n", 10))
+    log(f"[Trace] 最慢的 {top_n} 个调用:\n{format_slowest_table(tracer, top_n)}")
+    log(f"[Trace] 追踪已保存: {path}")
+    return path
+
+
+# ================================================================
+#  Step 1 / Step 2: 产品分析 + 搜索计划
+# ================================================================
+
+
+async def _run_product_profiler(
+    agent: ReActAgent,
+    product_input: str,
+    log: Callable[[str], None],
+    deadline: Optional[PipelineDeadline] = None,
+) -> tuple[Msg, dict, ProductProfile]:
+    """Step 1: 产品分析，返回 (Agent 回复消息, 原始数据, ProductProfile)。"""
+    log(f"[Product Profiler] 正在分析产品: {product_input}")
+    profiler_input = (
+        "这是我正在销售的产品，请以卖方视角分析，"
+        "目标是找到会采购/使用该产品的企业客户，而不是同类产品供应商。\n\n"
+        f"产品信息：{product_input}"
+    )
+    product_msg = await (deadline or PipelineDeadline()).call(
+        "profile",
+        agent(Msg("user", profiler_input, "user"), structured_model=ProductProfile),
+    )
+    if product_msg is None:
+        log("[Product Profiler] 超时，使用用户输入作为产品信息")
+        product_msg = Msg("Product_Profiler", product_input, "assistant")
+    product_data = _extract_structured_or_parse(product_msg)
+    try:
+        product_profile = ProductProfile(**product_data)
+    except Exception as e:
+        log(f"[Product Profiler] JSON 解析失败，使用基础信息: {e}")
+        # 从原始内容中提取产品名，使用用户输入作为后备
+        product_profile = ProductProfile(
+            product_name=product_data.get("product_name", product_input),
+            description=product_data.get(
+                "description",
+                product_data.get("raw_content", product_input)[:500],
+            ),
+        )
+    log(f"[Product Profiler] 产品分析完成: {product_profile.product_name}")
+    if product_profile.competitors:
+        log(f"  竞品: {[c.name for c in product_profile.competitors]}")
+    return product_msg, product_data, product_profile
+
+
+async def _build_search_plan(
+    agent: ReActAgent,
+    product_msg: Msg,
+    product_profile: ProductProfile,
+    max_tasks: int,
+    log: Callable[[str], None],
+    deadline: Optional[PipelineDeadline] = None,
+) -> tuple[dict, SalesSearchPlan]:
+    """Step 2: 构建 ICP + 搜索策略，任务不足 max_tasks 时自动补齐。
+
+    Returns:
+        (标准化后的原始计划数据, SalesSearchPlan)
+    """
+    config = Config()
+    log("[Sales Orchestrator] 构建理想客户画像 (ICP)...")
+    icp_msg = await (deadline or PipelineDeadline()).call(
+        "plan",
+        agent(product_msg, structured_model=SalesSearchPlan),
+    )
+    if icp_msg is None:
+        # 超时后走下方的默认搜索策略
+        log("[Sales Orchestrator] 超时，使用默认搜索计划")
+        icp_msg = Msg("Sales_Orchestrator", "", "assistant")
+    plan_data = _normalize_sales_plan_data(_extract_structured_or_parse(icp_msg))
+
+    # 诊断日志: Sales Orchestrator 返回的原始数据
+    log(f"[Sales Orchestrator] 原始数据 keys={list(plan_data.keys())}")
+    if "search_tasks" in plan_data:
+        log(f"  search_tasks 数量={len(plan_data['search_tasks'])}")
+    if "icp" in plan_data and isinstance(plan_data["icp"], dict):
+        log(
+            f"  icp.target_industries="
+            f"{plan_data['icp'].get('target_industries', [])}"
+        )
+
+    # 如果 metadata 为空，尝试从 content 文本中二次提取 JSON
+    if not plan_data.get("search_tasks") and not plan_data.get("icp"):
+        content_text = _extract_text_content(icp_msg)
+        if content_text:
+            parsed = _try_parse_json(content_text)
+            if parsed and (parsed.get("search_tasks") or parsed.get("icp")):
+                log("[Sales Orchestrator] 从 content 文本中二次提取到 JSON")
+                plan_data = _normalize_sales_plan_data(parsed)
+
+    try:
+        search_plan = SalesSearchPlan(**plan_data)
+    except Exception as e:
+        log(f"[Sales Orchestrator] JSON 解析失败，使用默认搜索计划: {e}")
+        search_plan = SalesSearchPlan(
+            product_name=product_profile.product_name,
+            product_summary=product_profile.description,
+        )
+
+    # 如果 Pydantic 构造成功但关键字段为空，尝试手动回填
+    if not search_plan.icp.target_industries and plan_data.get("icp"):
+        icp_raw = plan_data["icp"]
+        if isinstance(icp_raw, dict) and icp_raw.get("target_industries"):
+            try:
+                search_plan.icp = ICP(**icp_raw)
+                log("[Sales Orchestrator] 手动回填 ICP 成功")
+            except Exception:
+                pass
+
+    if not search_plan.search_tasks and plan_data.get("search_tasks"):
+        raw_tasks = plan_data["search_tasks"]
+        if isinstance(raw_tasks, list):
+            for t in raw_tasks:
+                if isinstance(t, dict):
+                    try:
+                        search_plan.search_tasks.append(SearchTask(**t))
+                    except Exception:
+                        continue
+            if search_plan.search_tasks:
+                log(
+                    f"[Sales Orchestrator] 手动回填 search_tasks 成功: "
+                    f"{len(search_plan.search_tasks)} 个"
+                )
+
+    log("[Sales Orchestrator] ICP 完成")
+    log(f"  目标行业: {search_plan.icp.target_industries}")
+    log(f"  目标规模: {search_plan.icp.company_size}")
+    log(f"  搜索任务数: {len(search_plan.search_tasks)}")
+
+    # 如果没有搜索任务，生成默认任务
+    if not search_plan.search_tasks:
+        log("[Sales Orchestrator] 无搜索任务，生成默认搜索策略...")
+        fallback_count = int(config.get("sales_leads.search.max_search_tasks", 60))
+        desired_count = max(max_tasks, min(fallback_count, 60))
+        search_plan.search_tasks = _generate_default_search_tasks(
+            product_profile=product_profile,
+            desired_count=desired_count,
+        )
+        log(
+            f"[Sales Orchestrator] 默认策略生成完成: "
+            f"{len(search_plan.search_tasks)} 个任务"
+        )
+
+    # 如果任务数不足，自动补齐（广撒网优先）
+    if len(search_plan.search_tasks) < max_tasks:
+        missing = max_tasks - len(search_plan.search_tasks)
+        log(f"[Sales Orchestrator] 搜索任务不足，自动补齐 {missing} 个任务...")
+        extra_tasks = _generate_default_search_tasks(
+            product_profile=product_profile,
+            desired_count=max_tasks * 2,
+        )
+        existing_keys = {_task_query_key(t) for t in search_plan.search_tasks}
+        for task in extra_tasks:
+            key = _task_query_key(task)
+            if key in existing_keys:
+                continue
+            search_plan.search_tasks.append(task)
+            existing_keys.add(key)
+            if len(search_plan.search_tasks) >= max_tasks:
+                break
+        log(f"[Sales Orchestrator] 补齐后任务数: {len(search_plan.search_tasks)}")
+
+    return plan_data, search_plan
+
+
+# ================================================================
+#  Market Scanner 工作池
+# ================================================================
+
+
+def _build_scan_task_msg(task: SearchTask, target_sizes: list[str]) -> Msg:
+    """把搜索任务封装为 Market Scanner 的输入消息。"""
+    strategy = task.strategy
+    if isinstance(strategy, SearchStrategy):
+        strategy = strategy.value
+    return Msg(
+        "Sales_Orchestrator",
+        json.dumps(
+            {
+                "task_id": task.task_id,
+                "strategy": strategy,
+                "query_zh": task.query_zh,
+                "query_en": task.query_en,
+                "expected_result": task.expected_result,
+                "target_company_size": target_sizes,
+            },
+            ensure_ascii=False,
+        ),
+        "assistant",
+    )
+
+
+async def _run_market_scanner_pool(
+    tasks_to_run: list[SearchTask],
+    scanners: list[ReActAgent],
+    target_sizes: list[str],
+    log: Callable[[str], None],
+    completed: Optional[dict[int, dict]] = None,
+    on_task_done: Optional[Callable[[int, SearchTask, dict], None]] = None,
+    deadline: Optional[PipelineDeadline] = None,
+    on_leads: Optional[Callable[[list[dict]], Awaitable[None]]] = None,
+) -> list[dict]:
+    """用多个独立的 Market Scanner 实例并发执行搜索任务。
+
+    每个实例作为一个 worker 从共享队列中领取任务，任务完成后立即
+    通过 merge_and_deduplicate 增量合并，返回去重后的线索列表。
+
+    Args:
+        tasks_to_run: 待执行的搜索任务
+        scanners: Market Scanner 实例列表，长度即并发上限
+        target_sizes: ICP 目标公司规模
+        log: 日志函数
+        completed: 已完成任务的结果（序号从 1 开始 -> ScanResult 数据），
+            恢复运行时直接合并，不再重复搜索
+        on_task_done: 每个任务成功后的回调 (序号, 任务, ScanResult 数据)
+        deadline: 截止时间调度器，"scan" 时间片用完时取消未完成的任务
+        on_leads: 每批新增（已去重）线索的异步回调，流式模式用它向下游投递
+
+    Returns:
+        去重后的原始线索列表
+    """
+    completed = completed or {}
+    total = len(tasks_to_run)
+    seen = new_company_index()
+    all_leads: list[dict] = []
+
+    queue: asyncio.Queue[tuple[int, SearchTask]] = asyncio.Queue()
+    for i, task in enumerate(tasks_to_run, 1):
+        if i in completed:
+            all_leads.extend(
+                merge_and_deduplicate(
+                    [Msg("Market_Scanner", "", "assistant", metadata=completed[i])],
+                    seen,
+                )
+            )
+        else:
+            queue.put_nowait((i, task))
+    if completed:
+        log(
+            f"  [Checkpoint] 复用 {total - queue.qsize()} 个已完成任务，"
+            f"{len(all_leads)} 条线索"
+        )
+    if on_leads is not None and all_leads:
+        await on_leads(list(all_leads))
+
+    async def _worker(scanner: ReActAgent) -> None:
+        while True:
+            # token 预算不足时不再领取新任务，已完成的结果保留
+            if not token_budget_allows("scan"):
+                return
+            try:
+                i, task = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            log(f"  [{i}/{total}] 搜索: {task.query_zh[:40]}...")
+            try:
+                # 每次调用前清空 memory 避免上一轮任务的信息污染
+                await scanner.memory.clear()
+                result = _raise_if_interrupted(
+                    await scanner(
+                        _build_scan_task_msg(task, target_sizes),
+                        structured_model=ScanResult,
+                    )
+                )
+            except asyncio.CancelledError:
+                raise
+            except BaseException as e:
+                log(f"  [{i}/{total}] 搜索失败: {e}")
+                continue
+            new_leads = merge_and_deduplicate([result], seen)
+            all_leads.extend(new_leads)
+            if on_task_done is not None:
+                on_task_done(i, task, _extract_structured_or_parse(result))
+            if on_leads is not None and new_leads:
+                await on_leads(new_leads)
+            log(f"  [{i}/{total}] 完成，新增 {len(new_leads)} 条线索")
+
+    workers = [asyncio.create_task(_worker(scanner)) for scanner in scanners]
+    if not await (deadline or PipelineDeadline()).wait("scan", workers):
+        log(f"  [Market Scanner] 时间片用完，剩余 {queue.qsize()} 个任务未执行")
+    elif not queue.empty():
+        log(f"  [Market Scanner] token 预算不足，剩余 {queue.qsize()} 个任务未执行")
+    if seen.merged:
+        log(f"  [Market Scanner] 实体消歧合并 {seen.merged} 条重复线索")
+    return all_leads
+
+
+# ================================================================
+#  Lead Qualifier 分批并发评估
+# ================================================================
+
+
+def _extract_qualified_leads(
+    qualified_data: dict,
+    log: Callable[[str], None],
+    label: str = "",
+) -> list[dict]:
+    """从 Lead Qualifier 输出中取出 qualified_leads，兼容嵌套/字符串化结果。"""
+    # 回退: 如果 structured_model 和首次解析都未拿到 qualified_leads，
+    # 尝试从嵌套 key 中二次提取
+    if "qualified_leads" not in qualified_data:
+        # 日志记录首次解析失败的情况
+        if "raw_content" in qualified_data:
+            raw = qualified_data["raw_content"]
+            log(
+                f"[Lead Qualifier]{label} JSON 解析失败，原始内容长度={len(raw)}，"
+                f"前200字: {raw[:200]}"
+            )
+        for key in ("content", "text", "result", "output"):
+            nested = qualified_data.get(key)
+            if nested is None:
+                continue
+            if isinstance(nested, str):
+                nested = _try_parse_json(nested)
+            if isinstance(nested, dict) and "qualified_leads" in nested:
+                qualified_data = nested
+                break
+
+    qualified_leads = qualified_data.get("qualified_leads", [])
+    if not isinstance(qualified_leads, list):
+        return []
+    if not qualified_leads:
+        log(
+            f"[Lead Qualifier]{label} 警告: qualified_leads 为空，"
+            f"返回数据 keys={list(qualified_data.keys())}"
+        )
+    return [lead for lead in qualified_leads if isinstance(lead, dict)]
+
+
+def _summarize_qualified_leads(qualified_leads: list[dict]) -> dict:
+    """按优先级统计合并后的评估结果。"""
+    priorities = [ql.get("priority", "cold") for ql in qualified_leads]
+    return {
+        "total_evaluated": len(qualified_leads),
+        "hot_leads": priorities.count("hot"),
+        "warm_leads": priorities.count("warm"),
+        "cold_leads": priorities.count("cold"),
+    }
+
+
+async def _qualify_batch(
+    batch: list[dict],
+    product_data: dict,
+    icp_data: dict,
+    agent: ReActAgent,
+    log: Callable[[str], None],
+    label: str = "",
+) -> list[dict]:
+    """用一个 Lead Qualifier 实例评估一批线索；失败（异常或 JSON 截断）返回空列表。"""
+    if not token_budget_allows("qualify"):
+        log(f"[Lead Qualifier]{label} token 预算不足，跳过 {len(batch)} 条")
+        return []
+    qualification_input = Msg(
+        "Market_Scanner",
+        json.dumps(
+            {
+                "product_profile": product_data,
+                "icp": icp_data,
+                "raw_leads": batch,
+            },
+            ensure_ascii=False,
+        ),
+        "assistant",
+    )
+    try:
+        qualification_msg = _raise_if_interrupted(
+            await agent(qualification_input, structured_model=QualificationResult)
+        )
+        qualified_data = _extract_structured_or_parse(qualification_msg)
+        qualified = _extract_qualified_leads(qualified_data, log, label)
+    except asyncio.CancelledError:
+        raise
+    except BaseException as e:
+        log(f"[Lead Qualifier]{label} 评估失败: {e}")
+        return []
+    log(f"[Lead Qualifier]{label} 完成，{len(qualified)}/{len(batch)} 条")
+    return qualified
+
+
+async def _qualify_leads_in_batches(
+    raw_leads: list[dict],
+    product_data: dict,
+    icp_data: dict,
+    agent_factory: Callable[[], ReActAgent],
+    batch_size: int,
+    concurrency: int,
+    log: Callable[[str], None],
+    deadline: Optional[PipelineDeadline] = None,
+    on_qualified: Optional[Callable[[list[dict]], None]] = None,
+) -> list[dict]:
+    """把原始线索按 batch_size 分批，用独立的 Lead Qualifier 实例并发评估。
+
+    单批失败（异常或 JSON 截断）只丢失该批结果，不影响其余批次。
+    返回按批次顺序合并的 qualified_leads。
+
+    Args:
+        raw_leads: 去重后的原始线索
+        product_data: Product Profiler 输出
+        icp_data: ICP 数据
+        agent_factory: 创建 Lead Qualifier 实例的工厂函数
+        batch_size: 每批线索数（sales_leads.qualification.max_qualification_batch）
+        concurrency: 最大并发批次数
+        log: 日志函数
+        deadline: 截止时间调度器，"qualify" 时间片用完时只保留已完成批次
+        on_qualified: 每批评估完成后的回调（用于增量导出）
+
+    Returns:
+        合并后的 qualified_leads
+    """
+    batch_size = max(1, batch_size)
+    batches = [
+        raw_leads[i : i + batch_size] for i in range(0, len(raw_leads), batch_size)
+    ]
+    total = len(batches)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results: list[list[dict]] = [[] for _ in batches]
+
+    async def _run_batch(k: int, batch: list[dict]) -> None:
+        async with semaphore:
+            results[k] = await _qualify_batch(
+                batch,
+                product_data,
+                icp_data,
+                agent_factory(),
+                log,
+                label=f" [批次 {k + 1}/{total}]",
+            )
+        if on_qualified is not None:
+            on_qualified(results[k])
+
+    workers = [asyncio.create_task(_run_batch(k, b)) for k, b in enumerate(batches)]
+    if not await (deadline or PipelineDeadline()).wait("qualify", workers):
+        finished = sum(1 for r in results if r)
+        log(f"[Lead Qualifier] 时间片用完，仅 {finished}/{total} 批有结果")
+    return [lead for batch_result in results for lead in batch_result]
+
+
+# ================================================================
+#  Contact Enrichment 并发执行器
+# ================================================================
+
+
+async def _enrich_lead(
+    lead: dict,
+    agent: ReActAgent,
+    product_type: str,
+    lead_timeout: float,
+    log: Callable[[str], None],
+    label: str = "",
+) -> Optional[tuple[str, dict]]:
+    """为单条线索查找联系人，返回 (小写公司名, 结果)；失败、超时或 token 预算不足返回 None。"""
+    if not token_budget_allows("enrich"):
+        return None
+    lead_msg = Msg(
+        "Lead_Qualifier",
+        json.dumps(
+            {
+                "company_name": lead.get("company_name"),
+                "website": lead.get("website", ""),
+                "industry": lead.get("industry", ""),
+                "product_type": product_type,
+            },
+            ensure_ascii=False,
+        ),
+        "assistant",
+    )
+    log(f"  {label} {lead.get('company_name', '?')}...")
+    try:
+        call = agent(lead_msg, structured_model=ContactEnrichmentResult)
+        if lead_timeout > 0:
+            # wait_for 超时取消 Agent 时拿到的是中断消息，同样按超时处理
+            result = await asyncio.wait_for(call, timeout=lead_timeout)
+            if _is_interrupted(result):
+                raise asyncio.TimeoutError
+        else:
+            result = _raise_if_interrupted(await call)
+    except asyncio.TimeoutError:
+        log(f"  {label} 联系人搜索超时（>{lead_timeout:.0f}s），已跳过")
+        return None
+    except asyncio.CancelledError:
+        raise
+    except BaseException as e:
+        log(f"  {label} 联系人搜索失败: {e}")
+        return None
+    data = _extract_structured_or_parse(result)
+    company_key = data.get("company_name", "").strip().lower()
+    if not company_key:
+        company_key = lead.get("company_name", "").strip().lower()
+    if not company_key:
+        return None
+    return company_key, data
+
+
+async def _run_contact_enrichment(
+    hot_warm: list[dict],
+    agent_factory: Callable[[], ReActAgent],
+    product_type: str,
+    enrichment_map: dict[str, dict],
+    concurrency: int,
+    lead_timeout: float,
+    log: Callable[[str], None],
+    on_lead_done: Optional[Callable[[str, dict], None]] = None,
+    deadline: Optional[PipelineDeadline] = None,
+    on_enriched: Optional[Callable[[dict, Optional[dict]], None]] = None,
+) -> None:
+    """并发查找 Hot/Warm 线索的联系人。
+
+    每条在途线索使用一个新建的 Contact Enrichment 实例（独立 memory），
+    并发数由信号量限制；单条线索超过 lead_timeout 秒即放弃。
+    结果完成一条即写入 enrichment_map（key 为小写公司名）。
+
+    Args:
+        hot_warm: 待补充联系人的线索
+        agent_factory: 创建 Contact Enrichment 实例的工厂函数
+        product_type: 产品描述，供 Agent 判断目标部门
+        enrichment_map: 输出字典，就地写入
+        concurrency: 最大并发线索数
+        lead_timeout: 单条线索超时（秒），<=0 表示不限
+        log: 日志函数
+        on_lead_done: 每写入一条结果后的回调 (公司 key, 联系人结果)，用于保存检查点
+        deadline: 截止时间调度器，"enrich" 时间片用完时取消在途线索
+        on_enriched: 每条线索处理结束后的回调 (线索, 联系人结果或 None)，用于增量导出
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    total = len(hot_warm)
+
+    async def _enrich_one(j: int, lead: dict) -> None:
+        async with semaphore:
+            enriched = await _enrich_lead(
+                lead,
+                agent_factory(),
+                product_type,
+                lead_timeout,
+                log,
+                label=f"[{j}/{total}]",
+            )
+        if enriched is not None:
+            company_key, data = enriched
+            enrichment_map[company_key] = data
+            if on_lead_done is not None:
+                on_lead_done(company_key, data)
+        if on_enriched is not None:
+            on_enriched(lead, enriched[1] if enriched is not None else None)
+
+    workers = [
+        asyncio.create_task(_enrich_one(j, lead)) for j, lead in enumerate(hot_warm, 1)
+    ]
+    if not await (deadline or PipelineDeadline()).wait("enrich", workers):
+        log("  [Contact Enrichment] 时间片用完，已取消剩余线索")
+
+
+# ================================================================
+#  跨运行线索库（复用已评估 / 已补充联系人的公司）
+# ================================================================
+
+
+def _reuse_stored_qualified(
+    leads: list[dict],
+    lead_store: Optional[LeadStore],
+    product: str,
+    log: Callable[[str], None],
+    label: str = "",
+) -> tuple[list[dict], list[dict]]:
+    """从线索库取出已评估的线索，返回 (复用的 qualified leads, 仍需评估的原始线索)。"""
+    if lead_store is None or not leads:
+        return [], leads
+    found = lead_store.lookup_qualified(product, leads)
+    if not found:
+        return [], leads
+    log(f"[Lead Store]{label} 复用 {len(found)}/{len(leads)} 条 BANT 评估结果")
+    remaining = [lead for i, lead in enumerate(leads) if i not in found]
+    return list(found.values()), remaining
+
+
+def _prefill_stored_enrichment(
+    leads: list[dict],
+    lead_store: Optional[LeadStore],
+    product: str,
+    enrichment_map: dict[str, dict],
+) -> int:
+    """把线索库中已有的联系人结果写入 enrichment_map，返回复用的公司数。"""
+    if lead_store is None:
+        return 0
+    pending = [
+        lead
+        for lead in leads
+        if lead.get("company_name", "").strip().lower() not in enrichment_map
+    ]
+    if not pending:
+        return 0
+    found = lead_store.lookup_enrichment(product, pending)
+    for i, data in found.items():
+        enrichment_map[pending[i].get("company_name", "").strip().lower()] = data
+    return len(found)
+
+
+def _save_to_lead_store(
+    lead_store: Optional[LeadStore],
+    product: str,
+    run_id: str,
+    log: Callable[[str], None],
+    raw_leads: list[dict],
+    qualified_leads: Optional[list[dict]] = None,
+    enrichment_map: Optional[dict[str, dict]] = None,
+    enriched_leads: Optional[list[EnrichedLead]] = None,
+) -> None:
+    """把本次运行的结果批量写回线索库（写入失败不影响报告输出）。"""
+    if lead_store is None:
+        return
+    try:
+        saved = lead_store.save_run(
+            product,
+            run_id,
+            raw_leads,
+            qualified_leads=qualified_leads,
+            enrichment_map=enrichment_map,
+            enriched_leads=enriched_leads,
+        )
+    except sqlite3.Error as e:
+        log(f"[Lead Store] 写入失败: {e}")
+        return
+    log(f"[Lead Store] 已写入 {saved} 家公司")
+
+
+# ================================================================
+#  流式流水线（扫描 → BANT 评估 → 联系人补充 重叠执行）
+# ================================================================
+
+
+async def _queue_get(queue: asyncio.Queue, timeout: float) -> Any:
+    """带超时的 queue.get()，超时抛出 asyncio.TimeoutError。
+
+    不用 asyncio.wait_for：Python 3.11 及以前取消与 get 同时完成时 wait_for
+    会吞掉取消，阶段被取消后仍继续运行。超时取消 get 不会丢失队列中的元素。
+    """
+    getter = asyncio.ensure_future(queue.get())
+    try:
+        done, _ = await asyncio.wait({getter}, timeout=timeout)
+    except asyncio.CancelledError:
+        getter.cancel()
+        raise
+    if getter not in done:
+        getter.cancel()
+        raise asyncio.TimeoutError
+    return getter.result()
+
+
+async def _send_stop(queue: asyncio.Queue, count: int, wait: bool = True) -> None:
+    """向下游队列发送 count 个结束标记 None。
+
+    wait=False 用于本阶段已被取消的情况：下游 worker 可能已一并取消，
+    队列满时直接放弃，避免在 finally 中永久等待。
+    """
+    for _ in range(count):
+        if wait:
+            await queue.put(None)
+            continue
+        try:
+            queue.put_nowait(None)
+        except asyncio.QueueFull:
+            return
+
+
+async def _run_streaming_pipeline(
+    tasks_to_run: list[SearchTask],
+    scanners: list[ReActAgent],
+    target_sizes: list[str],
+    product_data: dict,
+    icp_data: dict,
+    product_type: str,
+    qualifier_factory: Callable[[], ReActAgent],
+    enrichment_factory: Callable[[], ReActAgent],
+    enrichment_map: dict[str, dict],
+    log: Callable[[str], None],
+    micro_batch_size: int = 10,
+    micro_batch_wait: float = 8.0,
+    qualify_concurrency: int = 4,
+    enrich_concurrency: int = 4,
+    lead_timeout: float = 180.0,
+    queue_size: int = 100,
+    completed: Optional[dict[int, dict]] = None,
+    on_task_done: Optional[Callable[[int, SearchTask, dict], None]] = None,
+    on_lead_done: Optional[Callable[[str, dict], None]] = None,
+    deadline: Optional[PipelineDeadline] = None,
+    lead_store: Optional[LeadStore] = None,
+    product: str = "",
+    on_qualified: Optional[Callable[[list[dict]], None]] = None,
+    on_enriched: Optional[Callable[[dict, Optional[dict]], None]] = None,
+) -> tuple[list[dict], list[dict]]:
+    """Step 3-5 的流式版本：三个阶段通过有界队列串联并重叠执行。
+
+    - Market Scanner 池每得到一批去重后的新线索就投入线索队列
+    - 批处理器把线索凑成微批次（满 micro_batch_size 条或等待 micro_batch_wait 秒），
+      以最多 qualify_concurrency 个并发 Lead Qualifier 评估
+    - Hot/Warm 结果立即进入联系人队列，由 enrich_concurrency 个 worker 补充联系人
+    队列满时上游等待（背压），总耗时趋近于最慢的阶段而非各阶段之和。
+    联系人结果就地写入 enrichment_map，已存在的公司（检查点恢复）直接跳过。
+    传入 lead_store 时每个微批次先查库，已评估 / 已有联系人的公司不再调用 Agent。
+    on_qualified / on_enriched 在每个微批次评估完、每条线索联系人处理完时回调（增量导出）。
+
+    Returns:
+        (去重后的原始线索, qualified_leads)
+    """
+    lead_queue: asyncio.Queue[Optional[dict]] = asyncio.Queue(maxsize=max(1, queue_size))
+    enrich_queue: asyncio.Queue[Optional[dict]] = asyncio.Queue(
+        maxsize=max(1, queue_size)
+    )
+    qualify_slots = asyncio.Semaphore(max(1, qualify_concurrency))
+    enrich_workers = max(1, enrich_concurrency)
+    all_leads: list[dict] = []
+    qualified_leads: list[dict] = []
+
+    async def _push_leads(new_leads: list[dict]) -> None:
+        new_leads = _annotate_size_match(new_leads, target_sizes)
+        all_leads.extend(new_leads)
+        for lead in new_leads:
+            await lead_queue.put(lead)
+
+    async def _scan_stage() -> None:
+        cancelled = False
+        try:
+            await _run_market_scanner_pool(
+                tasks_to_run=tasks_to_run,
+                scanners=scanners,
+                target_sizes=target_sizes,
+                log=log,
+                completed=completed,
+                on_task_done=on_task_done,
+                on_leads=_push_leads,
+            )
+            log(f"[Market Scanner] 搜索完成，共发现 {len(all_leads)} 条去重线索")
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            # 出错时也结束下游，避免评估阶段一直等待
+            await _send_stop(lead_queue, 1, wait=not cancelled)
+
+    async def _qualify_micro_batch(batch: list[dict], label: str) -> None:
+        try:
+            qualified, batch = _reuse_stored_qualified(
+                batch, lead_store, product, log, label=label
+            )
+            if batch:
+                qualified += await _qualify_batch(
+                    batch,
+                    product_data,
+                    icp_data,
+                    qualifier_factory(),
+                    log,
+                    label=label,
+                )
+        finally:
+            qualify_slots.release()
+        qualified = _annotate_size_match(qualified, target_sizes)
+        _prefill_stored_enrichment(
+            filter_hot_warm(qualified), lead_store, product, enrichment_map
+        )
+        if on_qualified is not None:
+            on_qualified(qualified)
+        qualified_leads.extend(qualified)
+        for lead in filter_hot_warm(qualified):
+            await enrich_queue.put(lead)
+
+    async def _qualify_stage() -> None:
+        loop = asyncio.get_running_loop()
+        stage_task = asyncio.current_task()
+        in_flight: set[asyncio.Task] = set()
+        errors: list[BaseException] = []
+        batch_no = 0
+        stream_ended = False
+        cancelled = False
+
+        def _batch_done(task: asyncio.Task) -> None:
+            in_flight.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                # 微批次失败：记录异常并中断本阶段（可能正阻塞在线索队列上）
+                errors.append(task.exception())
+                stage_task.cancel()
+
+        try:
+            while not stream_ended:
+                # 首条线索无限等待，之后最多再等 micro_batch_wait 秒凑满一批
+                lead = await lead_queue.get()
+                if lead is None:
+                    break
+                batch = [lead]
+                flush_at = loop.time() + micro_batch_wait
+                while len(batch) < micro_batch_size:
+                    timeout = flush_at - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        lead = await _queue_get(lead_queue, timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if lead is None:
+                        stream_ended = True
+                        break
+                    batch.append(lead)
+                # 评估并发已满时在这里等待，线索队列随之积压并反压扫描器
+                await qualify_slots.acquire()
+                batch_no += 1
+                task = asyncio.create_task(
+                    _qualify_micro_batch(batch, f" [微批次 {batch_no}]")
+                )
+                in_flight.add(task)
+                task.add_done_callback(_batch_done)
+            if in_flight:
+                await asyncio.gather(*in_flight)
+            log(f"[Lead Qualifier] 评估完成，共 {len(qualified_leads)} 条")
+        except asyncio.CancelledError:
+            if errors:
+                raise errors[0] from None
+            cancelled = True
+            raise
+        finally:
+            # 出错时取消在途微批次，并照常结束联系人 worker
+            pending = list(in_flight)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            await _send_stop(enrich_queue, enrich_workers, wait=not cancelled)
+
+    enriched_count = 0
+
+    async def _enrich_worker() -> None:
+        nonlocal enriched_count
+        while True:
+            lead = await enrich_queue.get()
+            if lead is None:
+                return
+            existing = enrichment_map.get(lead.get("company_name", "").strip().lower())
+            if existing is not None:
+                if on_enriched is not None:
+                    on_enriched(lead, existing)
+                continue
+            enriched_count += 1
+            enriched = await _enrich_lead(
+                lead,
+                enrichment_factory(),
+                product_type,
+                lead_timeout,
+                log,
+                label=f"[联系人 {enriched_count}]",
+            )
+            if enriched is not None:
+                company_key, data = enriched
+                enrichment_map[company_key] = data
+                if on_lead_done is not None:
+                    on_lead_done(company_key, data)
+            if on_enriched is not None:
+                on_enriched(lead, enriched[1] if enriched is not None else None)
+
+    workers = [
+        asyncio.create_task(_scan_stage()),
+        asyncio.create_task(_qualify_stage()),
+        *(asyncio.create_task(_enrich_worker()) for _ in range(enrich_workers)),
+    ]
+    if not await (deadline or PipelineDeadline()).wait("stream", workers):
+        log(
+            f"[Pipeline] 时间片用完，已取消流式流水线"
+            f"（线索 {len(all_leads)}，已评估 {len(qualified_leads)}）"
+        )
+    return all_leads, qualified_leads
+
+
 # ================================================================
 #  主编排逻辑
 # ================================================================
@@ -834,14 +1909,25 @@ async def run_sales_lead_search(
     product_input: str,
     depth: str = "standard",
     log_callback: Optional[Callable[[str], None]] = None,
+    resume_run_id: Optional[str] = None,
+    runtime: Optional[SalesRuntime] = None,
+    delta: bool = False,
 ) -> SalesLeadReport:
     """
     销售线索获取主流程
 
+    每个阶段的输出都会写入 outputs/runs/<run_id>/ 检查点，
+    传入 resume_run_id 时跳过已完成的阶段和搜索任务。
+
     Args:
-        product_input: 用户输入的产品名称或描述
-        depth: 搜索深度 ("quick" / "standard" / "deep")
+        product_input: 用户输入的产品名称或描述（恢复运行时可为空，取检查点中的值）
+        depth: 搜索深度 ("quick" / "standard" / "deep")，恢复运行时以检查点为准
         log_callback: 可选的日志回调函数 (用于 Gradio UI 实时展示)
+        resume_run_id: 要恢复的运行 ID
+        runtime: 可选的共享运行时（长驻进程中复用工具集 / MCP / Agent），
+            为空时本次运行临时创建并在结束时关闭
+        delta: 增量模式，只评估线索库中没有或结果已过期的公司，
+            报告合并上次结果并附"本次新增"一节（恢复运行时以检查点为准）
 
     Returns:
         SalesLeadReport: 完整的销售线索报告
@@ -857,195 +1943,313 @@ async def run_sales_lead_search(
             log_callback(formatted)
         print(formatted)
 
-    mcp_clients: list = []
+    if resume_run_id:
+        checkpoint = RunCheckpoint.load(resume_run_id)
+        product_input = checkpoint.meta.get("product_input") or product_input
+        depth = checkpoint.meta.get("depth") or depth
+        delta = bool(checkpoint.meta.get("delta", delta))
+        log(f"[Checkpoint] 恢复运行 {checkpoint.run_id}（{checkpoint.run_dir}）")
+    else:
+        checkpoint = RunCheckpoint.create(product_input, depth, delta=delta)
+        log(f"[Checkpoint] 运行 ID: {checkpoint.run_id}")
+
+    # 追踪：span 挂在本次运行的 Tracer 上，结束时导出为与报告同名的 .trace.jsonl
+    tracer = Tracer(checkpoint.run_id) if tracing_enabled() else None
+    tracer_token = activate_tracer(tracer) if tracer is not None else None
+    root_span = trace_span("pipeline", "run_sales_lead_search", depth=depth)
+    trace_path = ""
+
+    # 按搜索深度限制任务数，timeout_minutes 作为整条流水线的时间预算
+    depth_preset = config.get_depth_preset(depth)
+    max_tasks = int(depth_preset.get("search_tasks", 30))
+    deadline = build_pipeline_deadline(
+        float(depth_preset.get("timeout_minutes", 0) or 0),
+        pipeline_mode,
+    )
+    if deadline.enabled:
+        log(f"[Deadline] 时间预算 {depth_preset.get('timeout_minutes')} 分钟")
+
+    # token 计量：按 Agent / 阶段汇总用量，超出阶段上限时降级
+    meter = build_token_meter(
+        int(depth_preset.get("token_budget", 0) or 0),
+        pipeline_mode,
+        stage_getter=lambda: deadline.current_stage,
+        log=log,
+    )
+    meter_token = activate_meter(meter)
+    if meter.usage.budget > 0:
+        log(f"[Token] 预算 {meter.usage.budget} tokens")
+
+    # 未传入运行时则本次运行独占一个，结束时关闭
+    owns_runtime = runtime is None
+    if runtime is None:
+        runtime = SalesRuntime(enable_qcc=True)
+    agents: dict[str, ReActAgent] = {}
+    export: Optional[LeadExport] = None
 
     try:
         # ── Step 0: 初始化 ──────────────────────────────────────
         log("初始化 Agent 和工具...")
         log(f"[Pipeline] 当前模式: {pipeline_mode}")
-        search_toolkit, mcp_clients = await setup_search_toolkit(enable_qcc=True)
-        file_toolkit = await setup_file_toolkit()
-        agents = create_agents(search_toolkit, file_toolkit)
+        await runtime.start()
+        search_toolkit = runtime.search_toolkit
+        agents = await runtime.acquire_agents()
 
         # ── Step 1: 产品分析 ────────────────────────────────────
-        log(f"[Product Profiler] 正在分析产品: {product_input}")
-        profiler_input = (
-            "这是我正在销售的产品，请以卖方视角分析，"
-            "目标是找到会采购/使用该产品的企业客户，而不是同类产品供应商。\n\n"
-            f"产品信息：{product_input}"
-        )
-        product_msg = await agents["product_profiler"](
-            Msg("user", profiler_input, "user"),
-            structured_model=ProductProfile,
-        )
-        product_data = _extract_structured_or_parse(product_msg)
-        try:
-            product_profile = ProductProfile(**product_data)
-        except Exception as e:
-            log(f"[Product Profiler] JSON 解析失败，使用基础信息: {e}")
-            # 从原始内容中提取产品名，使用用户输入作为后备
-            product_profile = ProductProfile(
-                product_name=product_data.get("product_name", product_input),
-                description=product_data.get(
-                    "description",
-                    product_data.get("raw_content", product_input)[:500],
-                ),
+        saved_profile = checkpoint.load_stage("product_profile")
+        if saved_profile is not None:
+            product_data = saved_profile["product_data"]
+            product_profile = ProductProfile(**saved_profile["product_profile"])
+            product_msg = Msg(
+                "Product_Profiler",
+                json.dumps(product_data, ensure_ascii=False),
+                "assistant",
+            )
+            log(f"[Checkpoint] 跳过 Product Profiler: {product_profile.product_name}")
+            deadline.skip_stage("profile")
+        else:
+            product_msg, product_data, product_profile = await _run_product_profiler(
+                agents["product_profiler"],
+                product_input,
+                log,
+                deadline=deadline,
+            )
+            checkpoint.save_stage(
+                "product_profile",
+                {
+                    "product_data": product_data,
+                    "product_profile": product_profile.model_dump(mode="json"),
+                },
             )
-        log(f"[Product Profiler] 产品分析完成: {product_profile.product_name}")
-        if product_profile.competitors:
-            log(f"  竞品: {[c.name for c in product_profile.competitors]}")
 
         # ── Step 2: 构建 ICP + 搜索策略 ─────────────────────────
-        log("[Sales Orchestrator] 构建理想客户画像 (ICP)...")
-        icp_msg = await agents["sales_orchestrator"](
-            product_msg,
-            structured_model=SalesSearchPlan,
-        )
-        plan_data = _normalize_sales_plan_data(_extract_structured_or_parse(icp_msg))
-
-        # 诊断日志: Sales Orchestrator 返回的原始数据
-        log(f"[Sales Orchestrator] 原始数据 keys={list(plan_data.keys())}")
-        if "search_tasks" in plan_data:
-            log(f"  search_tasks 数量={len(plan_data['search_tasks'])}")
-        if "icp" in plan_data and isinstance(plan_data["icp"], dict):
+        saved_plan = checkpoint.load_stage("search_plan")
+        if saved_plan is not None:
+            plan_data = saved_plan["plan_data"]
+            search_plan = SalesSearchPlan(**saved_plan["search_plan"])
             log(
-                f"  icp.target_industries="
-                f"{plan_data['icp'].get('target_industries', [])}"
+                f"[Checkpoint] 跳过 Sales Orchestrator: "
+                f"{len(search_plan.search_tasks)} 个搜索任务"
+            )
+            deadline.skip_stage("plan")
+        else:
+            plan_data, search_plan = await _build_search_plan(
+                agents["sales_orchestrator"],
+                product_msg,
+                product_profile,
+                max_tasks,
+                log,
+                deadline=deadline,
+            )
+            checkpoint.save_stage(
+                "search_plan",
+                {
+                    "plan_data": plan_data,
+                    "search_plan": search_plan.model_dump(mode="json"),
+                },
             )
 
-        # 如果 metadata 为空，尝试从 content 文本中二次提取 JSON
-        if not plan_data.get("search_tasks") and not plan_data.get("icp"):
-            content_text = _extract_text_content(icp_msg)
-            if content_text:
-                parsed = _try_parse_json(content_text)
-                if parsed and (parsed.get("search_tasks") or parsed.get("icp")):
-                    log("[Sales Orchestrator] 从 content 文本中二次提取到 JSON")
-                    plan_data = _normalize_sales_plan_data(parsed)
+        tasks_to_run = search_plan.search_tasks[:max_tasks]
 
-        try:
-            search_plan = SalesSearchPlan(**plan_data)
-        except Exception as e:
-            log(f"[Sales Orchestrator] JSON 解析失败，使用默认搜索计划: {e}")
-            search_plan = SalesSearchPlan(
-                product_name=product_profile.product_name,
-                product_summary=product_profile.description,
+        # ── Step 3: 并行搜索潜在客户 ───────────────────────────
+        # 同一个 agent 实例不能并行调用（共享 memory 会冲突），
+        # 所以为每个并发槽位创建独立的 Market Scanner 实例。
+        concurrency = int(config.get("sales_leads.search.concurrency", 4))
+        pool_size = max(1, min(concurrency, len(tasks_to_run)))
+        scanners = [agents["market_scanner"]] + [
+            create_agent(
+                "market_scanner",
+                search_toolkit,
+                model=agents["market_scanner"].model,
             )
+            for _ in range(pool_size - 1)
+        ]
+        log(
+            f"[Market Scanner] 启动 {len(tasks_to_run)} 个搜索任务 "
+            f"(并发 {pool_size})..."
+        )
 
-        # 如果 Pydantic 构造成功但关键字段为空，尝试手动回填
-        if not search_plan.icp.target_industries and plan_data.get("icp"):
-            icp_raw = plan_data["icp"]
-            if isinstance(icp_raw, dict) and icp_raw.get("target_industries"):
-                try:
-                    search_plan.icp = ICP(**icp_raw)
-                    log("[Sales Orchestrator] 手动回填 ICP 成功")
-                except Exception:
-                    pass
-
-        if not search_plan.search_tasks and plan_data.get("search_tasks"):
-            raw_tasks = plan_data["search_tasks"]
-            if isinstance(raw_tasks, list):
-                for t in raw_tasks:
-                    if isinstance(t, dict):
-                        try:
-                            search_plan.search_tasks.append(SearchTask(**t))
-                        except Exception:
-                            continue
-                if search_plan.search_tasks:
-                    log(
-                        f"[Sales Orchestrator] 手动回填 search_tasks 成功: "
-                        f"{len(search_plan.search_tasks)} 个"
-                    )
+        # Step 4/5 的 Agent 工厂：共享模型客户端，memory 各自独立
+        qualifier_model = agents["lead_qualifier"].model
+        enrichment_model = agents["contact_enrichment"].model
 
-        log("[Sales Orchestrator] ICP 完成")
-        log(f"  目标行业: {search_plan.icp.target_industries}")
-        log(f"  目标规模: {search_plan.icp.company_size}")
-        log(f"  搜索任务数: {len(search_plan.search_tasks)}")
-
-        # 按搜索深度限制任务数
-        depth_preset = config.get_depth_preset(depth)
-        max_tasks = int(depth_preset.get("search_tasks", 30))
-
-        # 如果没有搜索任务，生成默认任务
-        if not search_plan.search_tasks:
-            log("[Sales Orchestrator] 无搜索任务，生成默认搜索策略...")
-            fallback_count = int(config.get("sales_leads.search.max_search_tasks", 60))
-            desired_count = max(max_tasks, min(fallback_count, 60))
-            search_plan.search_tasks = _generate_default_search_tasks(
-                product_profile=product_profile,
-                desired_count=desired_count,
-            )
-            log(
-                f"[Sales Orchestrator] 默认策略生成完成: "
-                f"{len(search_plan.search_tasks)} 个任务"
-            )
+        def _new_qualifier() -> ReActAgent:
+            return create_agent("lead_qualifier", search_toolkit, model=qualifier_model)
 
-        # 如果任务数不足，自动补齐（广撒网优先）
-        if len(search_plan.search_tasks) < max_tasks:
-            missing = max_tasks - len(search_plan.search_tasks)
-            log(f"[Sales Orchestrator] 搜索任务不足，自动补齐 {missing} 个任务...")
-            extra_tasks = _generate_default_search_tasks(
-                product_profile=product_profile,
-                desired_count=max_tasks * 2,
+        def _new_enricher() -> ReActAgent:
+            return create_agent(
+                "contact_enrichment",
+                search_toolkit,
+                model=enrichment_model,
             )
-            existing_keys = {_task_query_key(t) for t in search_plan.search_tasks}
-            for task in extra_tasks:
-                key = _task_query_key(task)
-                if key in existing_keys:
-                    continue
-                search_plan.search_tasks.append(task)
-                existing_keys.add(key)
-                if len(search_plan.search_tasks) >= max_tasks:
-                    break
-            log(f"[Sales Orchestrator] 补齐后任务数: {len(search_plan.search_tasks)}")
 
-        tasks_to_run = search_plan.search_tasks[:max_tasks]
+        qualify_concurrency = int(config.get("sales_leads.qualification.concurrency", 4))
+        enrich_concurrency = int(
+            config.get("sales_leads.contact_enrichment.concurrency", 4)
+        )
+        lead_timeout = float(
+            config.get("sales_leads.contact_enrichment.lead_timeout_seconds", 180)
+        )
+
+        # 每完成一家即写该公司的检查点文件，恢复时只处理尚无结果的线索
+        enrichment_map: dict[str, dict] = checkpoint.load_enrichment()
 
-        # ── Step 3: 逐个搜索潜在客户 ───────────────────────────
-        # 注意: 使用同一个 agent 实例不能并行调用（共享 memory 会冲突），
-        # 所以改为逐个执行搜索任务。
-        log(f"[Market Scanner] 启动 {len(tasks_to_run)} 个搜索任务...")
-        valid_results: list[Msg] = []
-        for i, task in enumerate(tasks_to_run, 1):
-            strategy = task.strategy
-            if isinstance(strategy, SearchStrategy):
-                strategy = strategy.value
-            task_msg = Msg(
-                "Sales_Orchestrator",
-                json.dumps(
-                    {
-                        "task_id": task.task_id,
-                        "strategy": strategy,
-                        "query_zh": task.query_zh,
-                        "query_en": task.query_en,
-                        "expected_result": task.expected_result,
-                        "target_company_size": search_plan.icp.company_size,
-                    },
-                    ensure_ascii=False,
+        # 跨运行线索库：同一产品下已评估 / 已补充联系人的公司直接复用
+        lead_store = get_lead_store()
+        product_key = normalize_product_name(product_profile.product_name)
+        if delta and (pipeline_mode == "broad" or lead_store is None):
+            log("[Delta] 增量模式需要 full 模式并启用 sales_leads.lead_store，本次按完整运行处理")
+            delta = False
+
+        # 输出文件：运行中增量写入 <文件>.partial，结束时原子替换为最终文件
+        output_dir = config.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        product_slug = product_profile.product_name.replace(" ", "_")[:30]
+        md_path = os.path.join(output_dir, f"{product_slug}_{timestamp_str}.md")
+        csv_path = os.path.join(output_dir, f"{product_slug}_{timestamp_str}.csv")
+        jsonl_path = (
+            os.path.join(output_dir, f"{product_slug}_{timestamp_str}.jsonl")
+            if config.get("sales_leads.output.jsonl", True)
+            else ""
+        )
+        parquet_path = (
+            os.path.join(output_dir, f"{product_slug}_{timestamp_str}.parquet")
+            if config.get("sales_leads.output.parquet", False)
+            else ""
+        )
+        target_sizes = search_plan.icp.company_size
+        export_options: dict[str, Any] = {
+            "stream": bool(config.get("sales_leads.output.streaming_export", True)),
+            "flush_rows": int(config.get("sales_leads.output.flush_rows", 20)),
+            "flush_seconds": float(config.get("sales_leads.output.flush_seconds", 5)),
+        }
+        if pipeline_mode == "broad":
+            export = LeadExport(
+                csv_path,
+                BROAD_CSV_HEADERS,
+                broad_csv_rows,
+                jsonl_path=jsonl_path,
+                jsonl_record=lambda lead: build_broad_leads([lead])[0].model_dump(
+                    mode="json"
                 ),
-                "assistant",
+                **export_options,
+            )
+        else:
+            export = LeadExport(
+                csv_path,
+                CSV_HEADERS,
+                lead_csv_rows,
+                jsonl_path=jsonl_path,
+                jsonl_record=lambda lead: lead.model_dump(mode="json"),
+                **export_options,
+            )
+        exported: set[str] = set()
+
+        def _export_leads(leads: list[dict], enrichment: dict[str, dict]) -> None:
+            new_leads = []
+            for lead in leads:
+                company_key = lead.get("company_name", "").strip().lower()
+                if company_key not in exported:
+                    exported.add(company_key)
+                    new_leads.append(lead)
+            export.append(build_enriched_leads(new_leads, enrichment))
+
+        def _export_qualified(leads: list[dict]) -> None:
+            # Hot/Warm 线索等联系人结果出来后再导出
+            _export_leads(
+                [
+                    lead
+                    for lead in _annotate_size_match(leads, target_sizes)
+                    if lead.get("priority") not in ("hot", "warm")
+                ],
+                {},
             )
-            log(f"  [{i}/{len(tasks_to_run)}] 搜索: {task.query_zh[:40]}...")
-            try:
-                # 每次调用前清空 memory 避免上一轮任务的信息污染
-                await agents["market_scanner"].memory.clear()
-                result = await agents["market_scanner"](
-                    task_msg,
-                    structured_model=ScanResult,
-                )
-                valid_results.append(result)
-            except BaseException as e:
-                log(f"  [{i}/{len(tasks_to_run)}] 搜索失败: {e}")
-                continue
 
-        all_leads = merge_and_deduplicate(valid_results)
-        log(f"[Market Scanner] 搜索完成，共发现 {len(all_leads)} 条去重线索")
+        def _export_enriched(lead: dict, data: Optional[dict]) -> None:
+            company_key = lead.get("company_name", "").strip().lower()
+            _export_leads([lead], {company_key: data} if data else {})
+
+        async def _export_scanned(new_leads: list[dict]) -> None:
+            export.append(_annotate_size_match(new_leads, target_sizes))
+
+        # 流式模式：扫描、评估、联系人补充重叠执行（BANT 已有检查点时按顺序模式恢复；
+        # 增量模式需要先拿到完整的扫描结果再与上次运行比对，也按顺序模式执行）
+        streaming = (
+            pipeline_mode != "broad"
+            and bool(config.get("sales_leads.pipeline.streaming.enabled", False))
+            and checkpoint.load_stage("qualified_leads") is None
+            and not delta
+        )
+        streamed_qualified: Optional[list[dict]] = None
+        if streaming:
+            log("[Pipeline] 流式模式：扫描 / BANT 评估 / 联系人补充重叠执行")
+            deadline.merge_stages("stream", ["scan", "qualify", "enrich"])
+            all_leads, streamed_qualified = await _run_streaming_pipeline(
+                tasks_to_run=tasks_to_run,
+                scanners=scanners,
+                target_sizes=search_plan.icp.company_size,
+                product_data=product_data,
+                icp_data=plan_data.get("icp", {}),
+                product_type=product_profile.description,
+                qualifier_factory=_new_qualifier,
+                enrichment_factory=_new_enricher,
+                enrichment_map=enrichment_map,
+                log=log,
+                micro_batch_size=int(
+                    config.get("sales_leads.pipeline.streaming.micro_batch_size", 10)
+                ),
+                micro_batch_wait=float(
+                    config.get(
+                        "sales_leads.pipeline.streaming.micro_batch_wait_seconds", 8
+                    )
+                ),
+                qualify_concurrency=qualify_concurrency,
+                enrich_concurrency=enrich_concurrency,
+                lead_timeout=lead_timeout,
+                queue_size=int(
+                    config.get("sales_leads.pipeline.streaming.queue_size", 100)
+                ),
+                completed=checkpoint.load_scan_results(),
+                on_task_done=lambda i, task, data: checkpoint.save_scan_result(
+                    i, task.task_id, data
+                ),
+                on_lead_done=checkpoint.save_enrichment,
+                deadline=deadline,
+                lead_store=lead_store,
+                product=product_key,
+                on_qualified=_export_qualified,
+                on_enriched=_export_enriched,
+            )
+            if "stream" not in deadline.truncated_stages:
+                checkpoint.save_stage("qualified_leads", streamed_qualified)
+        else:
+            all_leads = await _run_market_scanner_pool(
+                tasks_to_run=tasks_to_run,
+                scanners=scanners,
+                target_sizes=search_plan.icp.company_size,
+                log=log,
+                completed=checkpoint.load_scan_results(),
+                on_task_done=lambda i, task, data: checkpoint.save_scan_result(
+                    i, task.task_id, data
+                ),
+                on_leads=_export_scanned if pipeline_mode == "broad" else None,
+                deadline=deadline,
+            )
+            log(f"[Market Scanner] 搜索完成，共发现 {len(all_leads)} 条去重线索")
 
         if not all_leads:
             log("[Market Scanner] 未发现任何线索，流程结束")
+            export.discard()
             return SalesLeadReport(
+                run_id=checkpoint.run_id,
                 product_name=product_profile.product_name,
                 product_profile=product_profile,
                 icp=search_plan.icp,
+                truncated_stages=deadline.truncated_stages,
+                stage_timings=deadline.stage_seconds,
+                trace_filepath=trace_path,
+                token_usage=meter.usage,
                 execution_time_seconds=time.time() - start_time,
             )
 
@@ -1067,6 +2271,13 @@ async def run_sales_lead_search(
                     tasks_to_run=tasks_to_run,
                     existing_leads=all_leads,
                     target_count=min(min_leads, max_leads),
+                    concurrency=int(
+                        config.get("sales_leads.pipeline.broad.expansion_concurrency", 6)
+                    ),
+                    max_queries=int(
+                        config.get("sales_leads.pipeline.broad.expansion_max_queries", 80)
+                    ),
+                    deadline=deadline,
                 )
                 all_leads = _annotate_size_match(all_leads, search_plan.icp.company_size)
                 log(f"[Broad] 扩量后线索数: {len(all_leads)}")
@@ -1075,30 +2286,39 @@ async def run_sales_lead_search(
                 all_leads = all_leads[:max_leads]
             log(f"[Pipeline] 广撒网模式：保留 {len(all_leads)} 条潜在公司线索")
 
-            output_dir = config.output_dir
-            os.makedirs(output_dir, exist_ok=True)
-            timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-            product_slug = product_profile.product_name.replace(" ", "_")[:30]
-            md_path = os.path.join(output_dir, f"{product_slug}_{timestamp_str}.md")
-            csv_path = os.path.join(output_dir, f"{product_slug}_{timestamp_str}.csv")
-
             report_content = generate_broad_markdown(
                 product_profile=product_profile,
                 search_plan=search_plan,
                 raw_leads=all_leads,
                 tasks_to_run=tasks_to_run,
             )
+            report_content = _prepend_truncation_notice(
+                report_content, deadline, meter.usage.degraded_stages
+            )
             with open(md_path, "w", encoding="utf-8") as f:
                 f.write(report_content)
             log(f"报告已保存: {md_path}")
 
-            generate_broad_csv(all_leads, csv_path)
+            export.finalize(all_leads)
             log(f"CSV 已保存: {csv_path}")
+            if jsonl_path:
+                log(f"JSONL 已保存: {jsonl_path}")
 
             enriched_leads = build_broad_leads(all_leads)
+            _save_to_lead_store(
+                lead_store, product_key, checkpoint.run_id, log, all_leads
+            )
             elapsed = time.time() - start_time
             log(f"全部完成！耗时 {elapsed:.1f} 秒")
-            return SalesLeadReport(
+            if tracer is not None:
+                trace_path = _export_trace(
+                    tracer,
+                    root_span,
+                    f"{os.path.splitext(md_path)[0]}.trace.jsonl",
+                    log,
+                )
+            report = SalesLeadReport(
+                run_id=checkpoint.run_id,
                 product_name=product_profile.product_name,
                 product_profile=product_profile,
                 icp=search_plan.icp,
@@ -1109,73 +2329,84 @@ async def run_sales_lead_search(
                 cold_leads=0,
                 report_filepath=md_path,
                 csv_filepath=csv_path,
+                jsonl_filepath=jsonl_path,
                 search_strategies_used=[t.strategy for t in tasks_to_run],
                 total_search_queries=len(tasks_to_run),
+                truncated_stages=deadline.truncated_stages,
+                stage_timings=deadline.stage_seconds,
+                trace_filepath=trace_path,
+                token_usage=meter.usage,
                 execution_time_seconds=elapsed,
             )
+            if parquet_path:
+                report.parquet_filepath = (
+                    export_report_parquet(report, parquet_path, log) or ""
+                )
+            return report
 
         # ── Step 4: BANT 评估 ──────────────────────────────────
-        log(f"[Lead Qualifier] 正在评估 {len(all_leads)} 条线索 (BANT)...")
-        qualification_input = Msg(
-            "Market_Scanner",
-            json.dumps(
-                {
-                    "product_profile": product_data,
-                    "icp": plan_data.get("icp", {}),
-                    "raw_leads": all_leads,
-                },
-                ensure_ascii=False,
-            ),
-            "assistant",
-        )
-        qualification_msg = await agents["lead_qualifier"](
-            qualification_input,
-            structured_model=QualificationResult,
-        )
-        qualified_data = _extract_structured_or_parse(qualification_msg)
-
-        # 回退: 如果 structured_model 和首次解析都未拿到 qualified_leads，
-        # 尝试从嵌套 key 中二次提取
-        if "qualified_leads" not in qualified_data:
-            # 日志记录首次解析失败的情况
-            if "raw_content" in qualified_data:
-                raw = qualified_data["raw_content"]
+        delta_plan: Optional[DeltaPlan] = None
+        if delta and lead_store is not None:
+            delta_plan = plan_delta(
+                lead_store,
+                product_key,
+                all_leads,
+                stale_days=float(config.get("sales_leads.delta.stale_days", 7)),
+                carry_over=bool(config.get("sales_leads.delta.carry_over", True)),
+            )
+            log(f"[Delta] {delta_plan.describe()}")
+        saved_qualified = checkpoint.load_stage("qualified_leads")
+        if streamed_qualified is not None:
+            qualified_leads = streamed_qualified
+        elif saved_qualified is not None:
+            qualified_leads = saved_qualified
+            log(f"[Checkpoint] 跳过 BANT 评估: 复用 {len(qualified_leads)} 条结果")
+            deadline.skip_stage("qualify")
+        else:
+            batch_size = int(
+                config.get("sales_leads.qualification.max_qualification_batch", 30)
+            )
+            if delta_plan is not None:
+                qualified_leads = list(delta_plan.reused)
+                pending_leads = delta_plan.pending
+            else:
+                qualified_leads, pending_leads = _reuse_stored_qualified(
+                    all_leads, lead_store, product_key, log
+                )
+            if pending_leads:
                 log(
-                    f"[Lead Qualifier] JSON 解析失败，原始内容长度={len(raw)}，"
-                    f"前200字: {raw[:200]}"
+                    f"[Lead Qualifier] 正在评估 {len(pending_leads)} 条线索 (BANT，"
+                    f"每批 {batch_size} 条)..."
                 )
-            for key in ("content", "text", "result", "output"):
-                nested = qualified_data.get(key)
-                if nested is None:
-                    continue
-                if isinstance(nested, str):
-                    nested = _try_parse_json(nested)
-                if isinstance(nested, dict) and "qualified_leads" in nested:
-                    qualified_data = nested
-                    break
-
-        qualified_leads = qualified_data.get("qualified_leads", [])
+                qualified_leads += await _qualify_leads_in_batches(
+                    raw_leads=pending_leads,
+                    product_data=product_data,
+                    icp_data=plan_data.get("icp", {}),
+                    agent_factory=_new_qualifier,
+                    batch_size=batch_size,
+                    concurrency=qualify_concurrency,
+                    log=log,
+                    deadline=deadline,
+                    on_qualified=_export_qualified,
+                )
+            else:
+                deadline.skip_stage("qualify")
+            # 被截断的评估结果不写检查点，恢复时重新评估
+            if "qualify" not in deadline.truncated_stages:
+                checkpoint.save_stage("qualified_leads", qualified_leads)
+        if delta_plan is not None and delta_plan.carried:
+            # 上次运行中出现、本次未搜到的公司沿用上次结果，报告为合并后的全量
+            log(f"[Delta] 沿用上次运行的 {len(delta_plan.carried)} 条线索")
+            qualified_leads = qualified_leads + delta_plan.carried
         qualified_leads = _annotate_size_match(
             qualified_leads,
             search_plan.icp.company_size,
         )
-        summary = qualified_data.get("summary", {})
-
-        # 如果 summary 为空但 qualified_leads 不为空，手动构建 summary
-        if qualified_leads and not summary:
-            priorities = [ql.get("priority", "cold") for ql in qualified_leads]
-            summary = {
-                "total_evaluated": len(qualified_leads),
-                "hot_leads": priorities.count("hot"),
-                "warm_leads": priorities.count("warm"),
-                "cold_leads": priorities.count("cold"),
-            }
+        _export_qualified(qualified_leads)
+        summary = _summarize_qualified_leads(qualified_leads)
 
         if not qualified_leads:
-            log(
-                "[Lead Qualifier] 警告: qualified_leads 为空，"
-                f"返回数据 keys={list(qualified_data.keys())}"
-            )
+            log("[Lead Qualifier] 警告: 所有批次的 qualified_leads 均为空")
 
         log("[Lead Qualifier] 评估完成:")
         log(f"  Hot:  {summary.get('hot_leads', 0)} 条")
@@ -1184,48 +2415,78 @@ async def run_sales_lead_search(
 
         # ── Step 5: 联系人信息补充 (仅 Hot + Warm) ──────────────
         hot_warm = filter_hot_warm(qualified_leads)
-        log(
-            f"[Contact Enrichment] 正在为 {len(hot_warm)} 条 Hot/Warm 线索查找联系人..."
-        )
-
-        enrichment_map: dict[str, dict] = {}
-        if hot_warm:
-            for j, lead in enumerate(hot_warm, 1):
-                lead_msg = Msg(
-                    "Lead_Qualifier",
-                    json.dumps(
-                        {
-                            "company_name": lead.get("company_name"),
-                            "website": lead.get("website", ""),
-                            "industry": lead.get("industry", ""),
-                            "product_type": product_profile.description,
-                        },
-                        ensure_ascii=False,
-                    ),
-                    "assistant",
+        # 流式模式下 Hot/Warm 线索已在 Step 3 期间完成联系人搜索
+        pending: list[dict] = []
+        if streamed_qualified is not None:
+            log(
+                f"[Contact Enrichment] 流式模式已完成联系人搜索 "
+                f"({len(enrichment_map)}/{len(hot_warm)} 家成功)"
+            )
+        else:
+            log(
+                f"[Contact Enrichment] 正在为 {len(hot_warm)} 条 Hot/Warm 线索查找联系人..."
+            )
+            restored = sum(
+                1
+                for lead in hot_warm
+                if lead.get("company_name", "").strip().lower() in enrichment_map
+            )
+            if delta_plan is not None:
+                stored = delta_plan.prefill_enrichment(enrichment_map)
+            else:
+                stored = _prefill_stored_enrichment(
+                    hot_warm, lead_store, product_key, enrichment_map
                 )
-                log(f"  [{j}/{len(hot_warm)}] {lead.get('company_name', '?')}...")
-                try:
-                    await agents["contact_enrichment"].memory.clear()
-                    result = await agents["contact_enrichment"](
-                        lead_msg,
-                        structured_model=ContactEnrichmentResult,
-                    )
-                    data = _extract_structured_or_parse(result)
-                    company_key = data.get("company_name", "").strip().lower()
-                    if not company_key:
-                        company_key = lead.get("company_name", "").strip().lower()
-                    if company_key:
-                        enrichment_map[company_key] = data
-                except BaseException as e:
-                    log(f"  [{j}/{len(hot_warm)}] 联系人搜索失败: {e}")
-                    continue
+            pending = [
+                lead
+                for lead in hot_warm
+                if lead.get("company_name", "").strip().lower() not in enrichment_map
+            ]
+            if restored:
+                log(
+                    f"[Checkpoint] 复用 {restored} 家联系人结果，"
+                    f"剩余 {len(hot_warm) - restored} 家"
+                )
+            if stored:
+                log(f"[Lead Store] 复用 {stored} 家联系人结果，剩余 {len(pending)} 家")
+            for lead in hot_warm:
+                existing = enrichment_map.get(lead.get("company_name", "").strip().lower())
+                if existing is not None:
+                    _export_enriched(lead, existing)
+        if pending:
+            await _run_contact_enrichment(
+                hot_warm=pending,
+                agent_factory=_new_enricher,
+                product_type=product_profile.description,
+                enrichment_map=enrichment_map,
+                concurrency=enrich_concurrency,
+                lead_timeout=lead_timeout,
+                log=log,
+                on_lead_done=checkpoint.save_enrichment,
+                deadline=deadline,
+                on_enriched=_export_enriched,
+            )
             log(f"[Contact Enrichment] 联系人搜索完成 ({len(enrichment_map)} 家成功)")
         else:
-            log("[Contact Enrichment] 无 Hot/Warm 线索，跳过联系人搜索")
+            deadline.skip_stage("enrich")
+            if not hot_warm and streamed_qualified is None:
+                log("[Contact Enrichment] 无 Hot/Warm 线索，跳过联系人搜索")
 
         # 构建 EnrichedLead 列表
         enriched_leads = build_enriched_leads(qualified_leads, enrichment_map)
+        delta_summary = (
+            delta_plan.summarize(qualified_leads) if delta_plan is not None else None
+        )
+        _save_to_lead_store(
+            lead_store,
+            product_key,
+            checkpoint.run_id,
+            log,
+            all_leads,
+            qualified_leads=qualified_leads,
+            enrichment_map=enrichment_map,
+            enriched_leads=enriched_leads,
+        )
 
         # ── Step 6: 生成报告 ───────────────────────────────────
         log("[Lead Report Writer] 正在生成销售线索报告...")
@@ -1248,14 +2509,31 @@ async def run_sales_lead_search(
             ),
             "assistant",
         )
-        report_msg = await agents["lead_report_writer"](
-            report_input,
-            structured_model=ReportContent,
-        )
+        report_msg = None
+        if token_budget_allows("report"):
+            report_msg = await deadline.call(
+                "report",
+                agents["lead_report_writer"](report_input, structured_model=ReportContent),
+            )
+        else:
+            deadline.skip_stage("report")
 
-        # 优先从 structured_model 的 metadata 中获取报告内容
         report_content = ""
-        if isinstance(report_msg.metadata, dict) and report_msg.metadata:
+        if report_msg is None:
+            # 超时或 token 预算不足: 用评估结果直接生成简版报告
+            log("[Lead Report Writer] 未生成报告，改为生成简版报告")
+            report_msg = Msg("Lead_Report_Writer", "", "assistant")
+            report_content = generate_basic_markdown(
+                product_profile=product_profile,
+                search_plan=search_plan,
+                leads=enriched_leads,
+            )
+        # 优先从 structured_model 的 metadata 中获取报告内容
+        if (
+            not report_content
+            and isinstance(report_msg.metadata, dict)
+            and report_msg.metadata
+        ):
             report_content = report_msg.metadata.get("report_markdown", "")
         # 回退: 从 content / metadata 的其他字段中提取文本
         if not report_content:
@@ -1278,30 +2556,36 @@ async def run_sales_lead_search(
             log(f"[Lead Report Writer] 报告内容提取成功，长度={len(report_content)}")
 
         # ── Step 7: 保存文件 ───────────────────────────────────
-        output_dir = config.output_dir
-        os.makedirs(output_dir, exist_ok=True)
-
-        timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-        product_slug = product_profile.product_name.replace(" ", "_")[:30]
-
-        md_path = os.path.join(output_dir, f"{product_slug}_{timestamp_str}.md")
-        csv_path = os.path.join(output_dir, f"{product_slug}_{timestamp_str}.csv")
-
         # Markdown 报告
+        if delta_summary is not None:
+            report_content = _insert_delta_section(report_content, delta_summary)
+        report_content = _prepend_truncation_notice(
+            report_content, deadline, meter.usage.degraded_stages
+        )
         with open(md_path, "w", encoding="utf-8") as f:
             f.write(report_content)
         log(f"报告已保存: {md_path}")
 
-        # CSV
-        generate_csv(enriched_leads, csv_path)
+        # CSV / JSONL（替换运行中的 .partial）
+        export.finalize(enriched_leads)
         log(f"CSV 已保存: {csv_path}")
+        if jsonl_path:
+            log(f"JSONL 已保存: {jsonl_path}")
 
         # ── Step 8: 构建返回结果 ───────────────────────────────
         elapsed = time.time() - start_time
         log(f"全部完成！耗时 {elapsed:.1f} 秒")
+        if tracer is not None:
+            trace_path = _export_trace(
+                tracer,
+                root_span,
+                f"{os.path.splitext(md_path)[0]}.trace.jsonl",
+                log,
+            )
 
         strategies_used = [t.strategy for t in tasks_to_run]
         report = SalesLeadReport(
+            run_id=checkpoint.run_id,
             product_name=product_profile.product_name,
             product_profile=product_profile,
             icp=search_plan.icp,
@@ -1312,14 +2596,68 @@ async def run_sales_lead_search(
             cold_leads=summary.get("cold_leads", 0),
             report_filepath=md_path,
             csv_filepath=csv_path,
+            jsonl_filepath=jsonl_path,
             search_strategies_used=strategies_used,
             total_search_queries=len(tasks_to_run),
+            truncated_stages=deadline.truncated_stages,
+            stage_timings=deadline.stage_seconds,
+            trace_filepath=trace_path,
+            token_usage=meter.usage,
+            delta=delta_summary,
             execution_time_seconds=elapsed,
         )
+        if parquet_path:
+            report.parquet_filepath = export_report_parquet(report, parquet_path, log) or ""
 
         return report
 
     finally:
-        # 清理 MCP 连接
-        if mcp_clients:
-            await close_mcp_clients(mcp_clients)
+        search_cache = get_search_cache()
+        if search_cache is not None:
+            search_cache.flush()
+            stats = search_cache.stats()
+            log(
+                f"[Search Cache] 命中 {stats['hits']} / 未命中 {stats['misses']}"
+                f"（缓存条目 {stats['entries']}）"
+            )
+        llm_cache = get_llm_cache()
+        if llm_cache is not None:
+            llm_cache.flush()
+            stats = llm_cache.stats()
+            log(
+                f"[LLM Cache] 命中 {stats['hits']} / 未命中 {stats['misses']}"
+                f"（缓存条目 {stats['entries']}）"
+            )
+        lead_store = get_lead_store()
+        if lead_store is not None:
+            stats = lead_store.stats()
+            log(
+                f"[Lead Store] 复用评估 {stats['qualified_hits']} / "
+                f"联系人 {stats['enrichment_hits']}（记录 {stats['entries']}）"
+            )
+        if meter.usage.calls:
+            log(f"[Token] {meter.describe()}")
+            for agent_id, item in meter.usage.by_agent.items():
+                log(
+                    f"[Token]   {agent_id}: {item.calls} 次，"
+                    f"{item.input_tokens}/{item.output_tokens} tokens"
+                )
+        deactivate_meter(meter_token)
+        if export is not None:
+            # 未正常结束时保留已写出的 .partial
+            export.close()
+        if agents:
+            runtime.release_agents(agents)
+        # 独占的运行时: 清理 MCP 连接和共享 HTTP 连接池
+        if owns_runtime:
+            await runtime.close()
+        if tracer is not None:
+            # 未生成报告（失败或无线索）时追踪写入检查点目录，便于排查
+            if not trace_path:
+                _export_trace(
+                    tracer,
+                    root_span,
+                    os.path.join(checkpoint.run_dir, "trace.jsonl"),
+                    log,
+                )
+            deactivate_tracer(tracer_token)
@@ -0,0 +1,192 @@
+"""
+InsightFlow 销售线索模块 - 进程级运行时
+文件路径: src/runtime.py
+
+在长驻进程（Gradio 服务等）中复用每次运行都要重建的昂贵资源：
+搜索工具集、MCP 客户端（Tavily 需要 npx 拉起子进程）、
+模型客户端和 Agent 实例。
+
+  - start(): 首次构建；之后每次调用对有状态 MCP 客户端做 ping 健康检查，
+    失败时关闭并重建工具集
+  - acquire_agents() / release_agents(): 按运行借出一组 Agent，借出时清空 memory；
+    并发运行各自拿到独立的一组（共享模型客户端）
+  - close(): 关闭 MCP 客户端和共享 HTTP 连接池
+  - shutdown_runtime() / shutdown_runtime_sync(): 进程退出前关闭共享运行时
+    （run_cli.py 运行结束后、app_sales.py 服务停止前调用）
+
+资源绑定在创建它们的事件循环上，事件循环切换时自动重建。
+"""
+
+import asyncio
+from typing import Optional
+
+from agentscope.agent import ReActAgent
+from agentscope.mcp import StatefulClientBase
+from agentscope.model import ChatModelBase
+from agentscope.tool import Toolkit
+
+from src.agents import create_agents
+from src.config import Config
+from src.tools.web_search import (
+    close_mcp_clients,
+    close_search_clients,
+    setup_file_toolkit,
+    setup_search_toolkit,
+)
+
+
+class SalesRuntime:
+    """可跨多次 run_sales_lead_search 复用的工具集 / MCP 客户端 / Agent"""
+
+    def __init__(self, enable_qcc: bool = True):
+        self.enable_qcc = enable_qcc
+        self.search_toolkit: Optional[Toolkit] = None
+        self.file_toolkit: Optional[Toolkit] = None
+        self.mcp_clients: list = []
+        self._models: dict[str, ChatModelBase] = {}
+        self._idle_agents: list[dict[str, ReActAgent]] = []
+        # 借出的 Agent 组 -> 构建时的工具集版本（工具集重建后旧 Agent 不再回收）
+        self._leased: dict[int, int] = {}
+        self._generation = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def started(self) -> bool:
+        return self.search_toolkit is not None
+
+    def _drop_resources(self) -> None:
+        """丢弃（不关闭）当前资源，用于事件循环已切换、无法在原循环中关闭的情况。"""
+        self.search_toolkit = None
+        self.file_toolkit = None
+        self.mcp_clients = []
+        self._models.clear()
+        self._idle_agents.clear()
+        self._leased.clear()
+        self._generation += 1
+
+    async def _mcp_healthy(self) -> bool:
+        """对有状态 MCP 客户端发送 ping；无状态客户端每次调用独立建连，无需检查。"""
+        timeout = float(Config().get("runtime.mcp_ping_timeout_seconds", 5))
+        for client in self.mcp_clients:
+            if not isinstance(client, StatefulClientBase):
+                continue
+            if not client.is_connected or client.session is None:
+                return False
+            try:
+                await asyncio.wait_for(client.session.send_ping(), timeout=timeout)
+            except Exception as e:
+                print(f"[Runtime] MCP 客户端 {client.name} 健康检查失败: {e}")
+                return False
+        return True
+
+    async def start(self) -> None:
+        """构建工具集；已构建时做健康检查，MCP 异常则重建。可重复调用。"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not None and self._loop is not loop:
+            print("[Runtime] 事件循环已切换，重建运行时资源")
+            self._drop_resources()
+            self._lock = None
+        self._loop = loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self.started:
+                if await self._mcp_healthy():
+                    return
+                print("[Runtime] 重新初始化搜索工具集和 MCP 连接...")
+                await close_mcp_clients(self.mcp_clients)
+                self.mcp_clients = []
+                # Agent 持有的是旧工具集的克隆，全部作废
+                self._idle_agents.clear()
+                self._generation += 1
+
+            self.search_toolkit, self.mcp_clients = await setup_search_toolkit(
+                enable_qcc=self.enable_qcc,
+            )
+            if self.file_toolkit is None:
+                self.file_toolkit = await setup_file_toolkit()
+
+    async def acquire_agents(self) -> dict[str, ReActAgent]:
+        """借出一组 Agent（memory 已清空），用完后调用 release_agents 归还。"""
+        if not self.started:
+            await self.start()
+        if self._idle_agents:
+            agents = self._idle_agents.pop()
+            for agent in agents.values():
+                await agent.memory.clear()
+        else:
+            agents = create_agents(
+                self.search_toolkit,
+                self.file_toolkit,
+                models=self._models,
+            )
+            if not self._models:
+                self._models = {agent_id: agent.model for agent_id, agent in agents.items()}
+        self._leased[id(agents)] = self._generation
+        return agents
+
+    def release_agents(self, agents: dict[str, ReActAgent]) -> None:
+        """归还 Agent 组；工具集在借出期间被重建过的直接丢弃。"""
+        generation = self._leased.pop(id(agents), None)
+        if generation == self._generation:
+            self._idle_agents.append(agents)
+
+    async def close(self) -> None:
+        """关闭 MCP 客户端和共享 HTTP 连接池。"""
+        clients, self.mcp_clients = self.mcp_clients, []
+        if self._loop is asyncio.get_running_loop():
+            await close_search_clients(clients)
+        self._drop_resources()
+        self._loop = None
+        self._lock = None
+
+    async def __aenter__(self) -> "SalesRuntime":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+_runtime: Optional[SalesRuntime] = None
+
+
+def get_runtime() -> SalesRuntime:
+    """获取进程级共享运行时（资源在第一次 start() 时构建）。"""
+    global _runtime
+    if _runtime is None:
+        _runtime = SalesRuntime(enable_qcc=True)
+    return _runtime
+
+
+async def shutdown_runtime() -> None:
+    """关闭进程级共享运行时，进程退出前在同一事件循环中调用。"""
+    global _runtime
+    if _runtime is None:
+        return
+    runtime, _runtime = _runtime, None
+    try:
+        await runtime.close()
+    except Exception as e:
+        print(f"[Runtime] 关闭运行时失败: {e}")
+
+
+def shutdown_runtime_sync(timeout: float = 10.0) -> None:
+    """在同步代码中关闭共享运行时（如 Gradio 主线程退出前）。
+
+    资源绑定在创建它们的事件循环上：该循环仍在其他线程运行时（Gradio 服务线程）
+    把关闭提交到该循环执行并等待最多 timeout 秒；否则在新的事件循环中执行。
+    """
+    if _runtime is None:
+        return
+    loop = _runtime._loop
+    if loop is not None and loop.is_running():
+        future = asyncio.run_coroutine_threadsafe(shutdown_runtime(), loop)
+        try:
+            future.result(timeout=timeout)
+        except Exception as e:
+            print(f"[Runtime] 关闭运行时失败: {e}")
+        return
+    asyncio.run(shutdown_runtime())
@@ -0,0 +1,249 @@
+"""
+InsightFlow 销售线索模块 - Token 计量与预算
+文件路径: src/token_meter.py
+
+为每次模型请求记录输入 / 输出 token，按 Agent 和流水线阶段汇总，
+并按 depth_presets.<depth>.token_budget 控制单次运行的总用量。
+
+预算不是硬中断：各阶段在"开始新工作"前检查累计用量，
+超过该阶段的上限（sales_leads.token_budget.stage_limits，占总预算比例）时
+停止领取新任务，为后续阶段留出额度：
+
+  - scan:    停止领取新的搜索任务（已完成的保留）
+  - qualify: 跳过剩余批次
+  - enrich:  跳过剩余线索的联系人补充
+  - report:  不调用 Report Writer，改用基础 Markdown 模板
+
+命中 LLM 响应缓存的调用不产生费用，只计入 cached_* 统计，不占预算。
+"""
+
+import json
+from collections.abc import AsyncGenerator
+from contextvars import ContextVar
+from typing import Any, Callable, Optional, Type
+
+from agentscope.model import ChatModelBase, ChatResponse
+from pydantic import BaseModel
+
+from src.config import Config
+from src.models.sales_schemas import TokenUsage, TokenUsageItem
+
+
+# 超出阶段上限时的降级说明（日志与报告中展示）
+_DEGRADE_MESSAGES: dict[str, str] = {
+    "scan": "停止领取新的搜索任务",
+    "qualify": "跳过剩余的 BANT 评估批次",
+    "enrich": "跳过剩余线索的联系人补充",
+    "report": "改用基础模板生成报告",
+}
+
+# 默认阶段上限（可被 sales_leads.token_budget.stage_limits 覆盖）
+_DEFAULT_STAGE_LIMITS: dict[str, float] = {
+    "scan": 0.6,
+    "qualify": 0.8,
+    "enrich": 0.95,
+    "report": 1.0,
+}
+
+
+def _add(item: TokenUsageItem, input_tokens: int, output_tokens: int, cached: bool) -> None:
+    item.calls += 1
+    if cached:
+        item.cached_calls += 1
+        item.cached_tokens += input_tokens + output_tokens
+    else:
+        item.input_tokens += input_tokens
+        item.output_tokens += output_tokens
+
+
+class TokenMeter:
+    """单次运行的 token 计量器
+
+    budget <= 0 表示不限量，只计量不降级。
+    """
+
+    def __init__(
+        self,
+        budget: int = 0,
+        stage_limits: Optional[dict[str, float]] = None,
+        stage_getter: Optional[Callable[[], str]] = None,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        self.usage = TokenUsage(budget=max(0, int(budget or 0)))
+        self.stage_limits = dict(stage_limits or {})
+        self._stage_getter = stage_getter or (lambda: "")
+        self._log = log or print
+
+    @property
+    def total_tokens(self) -> int:
+        return self.usage.total_tokens
+
+    def record(
+        self,
+        agent_id: str,
+        input_tokens: int,
+        output_tokens: int,
+        cached: bool = False,
+    ) -> None:
+        """记录一次模型请求的用量。"""
+        stage = self._stage_getter() or "other"
+        for item in (
+            self.usage.by_agent.setdefault(agent_id, TokenUsageItem()),
+            self.usage.by_stage.setdefault(stage, TokenUsageItem()),
+        ):
+            _add(item, input_tokens, output_tokens, cached)
+        self.usage.calls += 1
+        if cached:
+            self.usage.cached_tokens += input_tokens + output_tokens
+        else:
+            self.usage.input_tokens += input_tokens
+            self.usage.output_tokens += output_tokens
+
+    def allows(self, stage: str) -> bool:
+        """stage 是否还能开始新工作；首次超限时记录降级并输出日志。"""
+        if self.usage.budget <= 0:
+            return True
+        limit = self.stage_limits.get(stage)
+        if limit is None:
+            return True
+        if self.total_tokens < self.usage.budget * limit:
+            return True
+        if stage not in self.usage.degraded_stages:
+            self.usage.degraded_stages.append(stage)
+            self._log(
+                f"[Token] 已用 {self.total_tokens}/{self.usage.budget} tokens，"
+                f"超过 {stage} 阶段上限 {limit:.0%}，{_DEGRADE_MESSAGES.get(stage, '跳过')}"
+            )
+        return False
+
+    def describe(self) -> str:
+        """一行用量摘要。"""
+        budget = f"/{self.usage.budget}" if self.usage.budget > 0 else ""
+        text = (
+            f"输入 {self.usage.input_tokens} + 输出 {self.usage.output_tokens} = "
+            f"{self.total_tokens}{budget} tokens（{self.usage.calls} 次调用"
+        )
+        if self.usage.cached_tokens:
+            text += f"，缓存命中节省 {self.usage.cached_tokens}"
+        return text + "）"
+
+
+_current_meter: ContextVar[Optional[TokenMeter]] = ContextVar(
+    "insightflow_token_meter",
+    default=None,
+)
+
+
+def activate_meter(meter: Optional[TokenMeter]):
+    """把 meter 设为当前上下文的计量器，返回用于 deactivate_meter 的 token。"""
+    return _current_meter.set(meter)
+
+
+def deactivate_meter(token) -> None:
+    _current_meter.reset(token)
+
+
+def token_budget_allows(stage: str) -> bool:
+    """当前运行的 token 预算是否允许 stage 开始新工作（没有计量器时总是允许）。"""
+    meter = _current_meter.get()
+    return meter is None or meter.allows(stage)
+
+
+def build_token_meter(
+    token_budget: int,
+    pipeline_mode: str,
+    stage_getter: Optional[Callable[[], str]] = None,
+    log: Optional[Callable[[str], None]] = None,
+) -> TokenMeter:
+    """按深度预设的 token_budget 和流水线模式创建计量器。"""
+    limits = dict(_DEFAULT_STAGE_LIMITS)
+    limits.update(Config().get("sales_leads.token_budget.stage_limits", {}) or {})
+    if pipeline_mode == "broad":
+        # broad 模式扫描之后没有其他 LLM 阶段，扫描可用满预算
+        limits = {"scan": 1.0}
+    return TokenMeter(
+        budget=int(token_budget or 0),
+        stage_limits={k: float(v) for k, v in limits.items()},
+        stage_getter=stage_getter,
+        log=log,
+    )
+
+
+# ================================================================
+#  模型包装
+# ================================================================
+
+
+def estimate_tokens(payload: Any) -> int:
+    """响应未带 usage 时按字符数粗略估算（中英混合约 2 字符 / token）。"""
+    text = json.dumps(payload, ensure_ascii=False, default=str)
+    return max(1, len(text) // 2)
+
+
+class MeteredChatModel(ChatModelBase):
+    """把每次模型请求的 token 用量记到当前运行的 TokenMeter 上"""
+
+    def __init__(self, model: ChatModelBase, agent_id: str):
+        super().__init__(model.model_name, model.stream)
+        self.model = model
+        self.agent_id = agent_id
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__dict__["model"], name)
+
+    async def __call__(
+        self,
+        messages: list[dict],
+        tools: Optional[list[dict]] = None,
+        tool_choice: Optional[str] = None,
+        structured_model: Optional[Type[BaseModel]] = None,
+        **kwargs: Any,
+    ) -> ChatResponse | AsyncGenerator[ChatResponse, None]:
+        response = await self.model(
+            messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            structured_model=structured_model,
+            **kwargs,
+        )
+        meter = _current_meter.get()
+        if meter is None:
+            return response
+        if self.stream:
+            return self._meter_stream(response, meter, messages)
+        self._record(meter, response, messages)
+        return response
+
+    async def _meter_stream(
+        self,
+        stream: AsyncGenerator[ChatResponse, None],
+        meter: TokenMeter,
+        messages: list[dict],
+    ) -> AsyncGenerator[ChatResponse, None]:
+        """流式响应的用量在最后一个块上。"""
+        last: Optional[ChatResponse] = None
+        async for chunk in stream:
+            last = chunk
+            yield chunk
+        self._record(meter, last, messages)
+
+    def _record(
+        self,
+        meter: TokenMeter,
+        response: Optional[ChatResponse],
+        messages: list[dict],
+    ) -> None:
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            cached = isinstance(usage.metadata, dict) and bool(usage.metadata.get("cached"))
+            meter.record(self.agent_id, usage.input_tokens, usage.output_tokens, cached)
+            return
+        content = list(response.content) if response is not None else []
+        meter.record(self.agent_id, estimate_tokens(messages), estimate_tokens(content))
+
+
+def with_token_meter(agent_id: str, model: ChatModelBase) -> ChatModelBase:
+    """为模型加上 token 计量包装（已包装过的原样返回）。"""
+    if isinstance(model, MeteredChatModel):
+        return model
+    return MeteredChatModel(model, agent_id)
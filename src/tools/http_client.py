@@ -0,0 +1,139 @@
+"""
+InsightFlow 销售线索模块 - 共享 HTTP 客户端
+文件路径: src/tools/http_client.py
+
+进程级共享的 httpx.AsyncClient 连接池，供网页提取和博查搜索复用
+TCP/TLS 连接（keep-alive，可选 HTTP/2），并按 host 限制并发数。
+
+生命周期: setup_search_toolkit 中创建，close_http_client 中关闭。
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from src.config import Config
+
+
+_DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 依赖 h2 包（httpx[http2]），未安装时回退 HTTP/1.1。"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HttpClientManager:
+    """共享 AsyncClient + 按 host 的并发信号量"""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        per_host_limit: int = 8,
+        http2: bool = True,
+        timeout: float = 15.0,
+    ):
+        self.per_host_limit = per_host_limit
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            print("[Tools] 提示: 未安装 h2，HTTP 客户端回退为 HTTP/1.1")
+        self._loop = asyncio.get_running_loop()
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self.client = httpx.AsyncClient(
+            http2=self.http2,
+            follow_redirects=True,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            headers={"User-Agent": _DEFAULT_USER_AGENT},
+        )
+
+    @property
+    def is_usable(self) -> bool:
+        """客户端未关闭且绑定在当前事件循环上。"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return not self.client.is_closed and loop is self._loop
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = (urlparse(url).netloc or "").lower()
+        sem = self._host_semaphores.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(max(1, self.per_host_limit))
+            self._host_semaphores[host] = sem
+        return sem
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """发送请求（受 per-host 并发限制），返回完整读取的响应。"""
+        async with self._host_semaphore(url):
+            return await self.client.request(method, url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        **kwargs: Any,
+    ) -> AsyncIterator[httpx.Response]:
+        """流式请求（受 per-host 并发限制），响应体需调用方按需读取。"""
+        async with self._host_semaphore(url):
+            async with self.client.stream(method, url, **kwargs) as resp:
+                yield resp
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_http_client: Optional[HttpClientManager] = None
+
+
+def init_http_client() -> HttpClientManager:
+    """创建（或复用）进程级共享 HTTP 客户端，参数来自 http_client 配置段。"""
+    global _http_client
+    if _http_client is not None and _http_client.is_usable:
+        return _http_client
+    config = Config()
+    _http_client = HttpClientManager(
+        max_connections=int(config.get("http_client.max_connections", 100)),
+        max_keepalive_connections=int(
+            config.get("http_client.max_keepalive_connections", 20)
+        ),
+        per_host_limit=int(config.get("http_client.per_host_limit", 8)),
+        http2=bool(config.get("http_client.http2", True)),
+        timeout=float(config.get("http_client.timeout_seconds", 15.0)),
+    )
+    return _http_client
+
+
+def get_http_client() -> HttpClientManager:
+    """获取共享 HTTP 客户端；未初始化（或事件循环已切换）时自动创建。"""
+    return init_http_client()
+
+
+async def close_http_client() -> None:
+    """关闭共享 HTTP 客户端，释放连接池。"""
+    global _http_client
+    if _http_client is None:
+        return
+    client, _http_client = _http_client, None
+    try:
+        await client.aclose()
+    except Exception as e:
+        print(f"[Tools] 关闭 HTTP 客户端失败: {e}")
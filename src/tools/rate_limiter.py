@@ -0,0 +1,111 @@
+"""
+InsightFlow 销售线索模块 - 搜索请求限流
+文件路径: src/tools/rate_limiter.py
+
+按搜索提供者共享的异步令牌桶（支持突发），替代每次请求前的固定随机延迟。
+被搜索引擎限流时自适应降速并短暂冷却，随后逐步恢复到配置速率。
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from src.config import Config
+
+
+class TokenBucketLimiter:
+    """异步令牌桶限流器（自适应退避）
+
+    令牌以 rate 个/秒补充，桶容量为 burst。acquire() 在当前事件循环内
+    同步完成令牌预留后再 sleep，因此无需锁即可保证并发调用方公平排队。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        min_rate: float = 0.1,
+        backoff_factor: float = 0.5,
+        recovery_factor: float = 1.2,
+        cooldown_seconds: float = 5.0,
+    ):
+        self.base_rate = max(rate, 1e-6)
+        self.rate = self.base_rate
+        self.burst = max(1, burst)
+        self.min_rate = min(min_rate, self.base_rate)
+        self.backoff_factor = backoff_factor
+        self.recovery_factor = recovery_factor
+        self.cooldown_seconds = cooldown_seconds
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self.rate_limited_count = 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """获取一个令牌，必要时等待。"""
+        now = time.monotonic()
+        if now < self._blocked_until:
+            # 冷却期内不补充令牌，从冷却结束时刻开始计算
+            self._updated_at = max(self._updated_at, self._blocked_until)
+        else:
+            self._refill(now)
+        # 先扣减再等待：令牌可以为负，表示已被排队的调用方预留
+        self._tokens -= 1.0
+        wait = max(0.0, self._blocked_until - now)
+        if self._tokens < 0:
+            wait = max(wait, (self._updated_at - now) + (-self._tokens) / self.rate)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_rate_limited(self) -> None:
+        """被限流：降低速率并进入冷却期。"""
+        self.rate_limited_count += 1
+        now = time.monotonic()
+        if now >= self._blocked_until:
+            self._refill(now)
+        self.rate = max(self.min_rate, self.rate * self.backoff_factor)
+        self._blocked_until = max(self._blocked_until, now + self.cooldown_seconds)
+        self._tokens = min(self._tokens, 0.0)
+
+    def on_success(self) -> None:
+        """请求成功：逐步恢复速率，不超过配置值。"""
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate * self.recovery_factor)
+
+
+# 各提供者的默认限流参数（可被 search.rate_limit.<provider> 覆盖）
+_DEFAULT_LIMITS: dict[str, dict] = {
+    "duckduckgo": {"rate_per_second": 1.0, "burst": 3},
+    "bocha": {"rate_per_second": 10.0, "burst": 20},
+}
+
+_limiters: dict[str, TokenBucketLimiter] = {}
+
+
+def get_rate_limiter(provider: str) -> TokenBucketLimiter:
+    """获取指定搜索提供者的进程级共享限流器。"""
+    limiter: Optional[TokenBucketLimiter] = _limiters.get(provider)
+    if limiter is not None:
+        return limiter
+
+    config = Config()
+    defaults = _DEFAULT_LIMITS.get(provider, {"rate_per_second": 2.0, "burst": 4})
+
+    def _opt(name: str, default: float) -> float:
+        return float(config.get(f"search.rate_limit.{provider}.{name}", default))
+
+    limiter = TokenBucketLimiter(
+        rate=_opt("rate_per_second", defaults["rate_per_second"]),
+        burst=int(_opt("burst", defaults["burst"])),
+        min_rate=_opt("min_rate_per_second", 0.1),
+        backoff_factor=_opt("backoff_factor", 0.5),
+        recovery_factor=_opt("recovery_factor", 1.2),
+        cooldown_seconds=_opt("cooldown_seconds", 5.0),
+    )
+    _limiters[provider] = limiter
+    return limiter
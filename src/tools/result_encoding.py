@@ -0,0 +1,158 @@
+"""
+InsightFlow 销售线索模块 - 工具结果紧凑编码
+文件路径: src/tools/result_encoding.py
+
+web_search / web_extract 的 ToolResponse 会原样进入 Agent memory，
+之后每一轮 ReAct 推理都要重新发送。这里在结果进入 memory 前改写为紧凑格式：
+
+  - 搜索结果: {"fields": ["title", "url", "snippet"], "rows": [[...], ...]}，
+    字段名只出现一次；摘要按 snippet_chars 截断；
+    同 URL 的结果去重，标题 + 摘要几乎相同的结果去重，
+    仅摘要几乎相同的结果保留标题 / URL、清空摘要
+  - 网页提取: 合并空白后按 extract_chars 截断
+  - 其他 JSON: 去掉缩进；非 JSON 文本（MCP 工具等）保持不变
+
+按 Agent 配置（sales_leads.tool_results.default + agents.<agent_id> 覆盖），
+通过 Toolkit 的 postprocess_func 挂到每个 Agent 克隆出的工具上。
+"""
+
+import json
+import re
+from typing import Any, Callable, Optional
+
+from agentscope.message import TextBlock, ToolUseBlock
+from agentscope.tool import ToolResponse
+
+from src.config import Config
+
+
+# 默认编码参数（可被 sales_leads.tool_results 覆盖）
+_DEFAULT_SETTINGS: dict[str, Any] = {
+    "compact": True,
+    "snippet_chars": 200,
+    "extract_chars": 4000,
+    # 字符 3-gram Jaccard 相似度达到该值视为几乎相同
+    "dedup_similarity": 0.9,
+}
+
+_SEARCH_FIELDS = ["title", "url", "snippet"]
+
+
+def _collapse(text: Any) -> str:
+    return re.sub(r"\s+", " ", str(text or "")).strip()
+
+
+def _truncate(text: str, limit: int) -> str:
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return text[:limit] + "…"
+
+
+def _shingles(text: str) -> frozenset[str]:
+    """归一化后的字符 3-gram 集合（中英文都适用）。"""
+    norm = re.sub(r"[\W_]+", "", text.lower())
+    if len(norm) < 3:
+        return frozenset([norm]) if norm else frozenset()
+    return frozenset(norm[i : i + 3] for i in range(len(norm) - 2))
+
+
+def _near_duplicate(
+    shingles: frozenset[str],
+    seen: list[frozenset[str]],
+    threshold: float,
+) -> bool:
+    if not shingles:
+        return False
+    for other in seen:
+        union = len(shingles | other)
+        if union and len(shingles & other) / union >= threshold:
+            return True
+    return False
+
+
+def compact_search_results(
+    results: list[dict],
+    snippet_chars: int = 200,
+    dedup_similarity: float = 0.9,
+) -> dict:
+    """把 [{"title", "url", "snippet"}, ...] 编码为列式结构并去重。"""
+    rows: list[list[str]] = []
+    seen_urls: set[str] = set()
+    seen_rows: list[frozenset[str]] = []
+    seen_snippets: list[frozenset[str]] = []
+    for item in results:
+        url = str(item.get("url", "")).strip()
+        if url and url in seen_urls:
+            continue
+        title = _collapse(item.get("title"))
+        snippet = _collapse(item.get("snippet"))
+        row_shingles = _shingles(title + snippet)
+        if _near_duplicate(row_shingles, seen_rows, dedup_similarity):
+            continue
+        snippet_shingles = _shingles(snippet)
+        if _near_duplicate(snippet_shingles, seen_snippets, dedup_similarity):
+            snippet = ""
+        else:
+            seen_snippets.append(snippet_shingles)
+        seen_rows.append(row_shingles)
+        if url:
+            seen_urls.add(url)
+        rows.append([title, url, _truncate(snippet, snippet_chars)])
+    return {"fields": _SEARCH_FIELDS, "rows": rows}
+
+
+def _is_search_results(data: Any) -> bool:
+    return (
+        isinstance(data, list)
+        and bool(data)
+        and all(isinstance(item, dict) and "url" in item and "title" in item for item in data)
+    )
+
+
+def encode_tool_text(text: str, settings: dict[str, Any]) -> str:
+    """按 settings 改写单个工具结果文本；无法识别的格式原样返回。"""
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return text
+    if _is_search_results(data):
+        data = compact_search_results(
+            data,
+            snippet_chars=int(settings["snippet_chars"]),
+            dedup_similarity=float(settings["dedup_similarity"]),
+        )
+    elif isinstance(data, dict) and "url" in data and isinstance(data.get("content"), str):
+        data = {
+            **data,
+            "content": _truncate(_collapse(data["content"]), int(settings["extract_chars"])),
+        }
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def get_result_settings(agent_id: str) -> dict[str, Any]:
+    """agent_id 的编码参数: 默认值 ← tool_results.default ← tool_results.agents.<agent_id>。"""
+    config = Config()
+    settings = dict(_DEFAULT_SETTINGS)
+    settings.update(config.get("sales_leads.tool_results.default", {}) or {})
+    settings.update(config.get(f"sales_leads.tool_results.agents.{agent_id}", {}) or {})
+    return settings
+
+
+def build_result_encoder(
+    agent_id: str,
+) -> Optional[Callable[[ToolUseBlock, ToolResponse], ToolResponse]]:
+    """返回 agent_id 的工具结果后处理函数；compact 关闭时返回 None。"""
+    settings = get_result_settings(agent_id)
+    if not settings.get("compact", True):
+        return None
+
+    def _encode(tool_call: ToolUseBlock, response: ToolResponse) -> ToolResponse:
+        response.content = [
+            TextBlock(type="text", text=encode_tool_text(block["text"], settings))
+            if block.get("type") == "text"
+            else block
+            for block in response.content
+        ]
+        return response
+
+    return _encode
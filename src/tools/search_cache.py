@@ -0,0 +1,200 @@
+"""
+InsightFlow 销售线索模块 - 搜索结果缓存
+文件路径: src/tools/search_cache.py
+
+基于 SQLite 的本地持久化缓存，供 web_search / web_extract 工具和
+broad 模式扩量抓取共用。
+
+  - key: provider + 归一化 query + max_results + region
+    （extract 的 query 为 URL，路径 / 参数区分大小写，只去首尾空白不做归一化）
+  - 过期: 按 ttl_hours 失效
+  - 容量: 超过 max_entries 时按最近访问时间 (LRU) 淘汰
+  - 命中: 只读查询；最近访问时间先记在内存，随下次写入或每 _ACCESS_FLUSH 次命中
+    批量落盘，命中路径不在事件循环上逐次提交事务
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from src.config import Config
+
+
+# 累计多少次命中后批量写回 last_access
+_ACCESS_FLUSH = 200
+
+# query 为 URL 的 provider：原样作为 key
+_URL_PROVIDERS: frozenset[str] = frozenset({"extract"})
+
+
+def _normalize_query(query: str) -> str:
+    """归一化查询：去首尾空白、合并连续空白、转小写。"""
+    return re.sub(r"\s+", " ", (query or "").strip()).lower()
+
+
+def _key_query(provider: str, query: str) -> str:
+    """缓存 key 中使用的 query：搜索词归一化，URL 只去首尾空白。"""
+    if provider in _URL_PROVIDERS:
+        return (query or "").strip()
+    return _normalize_query(query)
+
+
+class SearchCache:
+    """SQLite 搜索结果缓存（线程安全，带 TTL 和 LRU 容量上限）"""
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 尚未写回的最近访问时间 key -> last_access
+        self._pending_access: dict[str, float] = {}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                query TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_search_cache_access "
+            "ON search_cache(last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(provider: str, query: str, max_results: int, region: str) -> str:
+        """生成缓存 key（sha1 摘要，避免超长 query 作为主键）。"""
+        raw = f"{provider}|{_key_query(provider, query)}|{max_results}|{region}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(
+        self,
+        provider: str,
+        query: str,
+        max_results: int = 0,
+        region: str = "",
+    ) -> Optional[Any]:
+        """读取缓存，未命中或已过期返回 None。"""
+        key = self.make_key(provider, query, max_results, region)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM search_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            payload, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                # 过期条目由下次 set 覆盖或按 LRU 淘汰，读路径不写库
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pending_access[key] = now
+            if len(self._pending_access) >= _ACCESS_FLUSH:
+                self._flush_access()
+                self._conn.commit()
+        return json.loads(payload)
+
+    def _flush_access(self) -> None:
+        """把内存中的最近访问时间写回（调用方持有锁并负责提交）。"""
+        if not self._pending_access:
+            return
+        self._conn.executemany(
+            "UPDATE search_cache SET last_access = ? WHERE key = ?",
+            [(at, key) for key, at in self._pending_access.items()],
+        )
+        self._pending_access.clear()
+
+    def set(
+        self,
+        provider: str,
+        query: str,
+        value: Any,
+        max_results: int = 0,
+        region: str = "",
+    ) -> None:
+        """写入缓存，必要时按 LRU 淘汰最久未访问的条目。"""
+        key = self.make_key(provider, query, max_results, region)
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            # 先写回命中记录，LRU 淘汰才按真实访问时间排序
+            self._flush_access()
+            self._pending_access.pop(key, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache "
+                "(key, provider, query, payload, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, _key_query(provider, query), payload, now, now),
+            )
+            if self.max_entries > 0:
+                (count,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM search_cache"
+                ).fetchone()
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM search_cache WHERE key IN ("
+                        "SELECT key FROM search_cache "
+                        "ORDER BY last_access ASC LIMIT ?)",
+                        (overflow,),
+                    )
+            self._conn.commit()
+
+    def flush(self) -> None:
+        """写回尚未落盘的命中记录（每次运行结束时调用）。"""
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+
+    def stats(self) -> dict[str, int]:
+        """返回命中/未命中计数和当前条目数。"""
+        with self._lock:
+            (size,) = self._conn.execute(
+                "SELECT COUNT(*) FROM search_cache"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+            self._conn.close()
+
+
+_search_cache: Optional[SearchCache] = None
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """获取进程级共享的搜索缓存；配置禁用时返回 None。"""
+    global _search_cache
+    config = Config()
+    if not config.get("search.cache.enabled", True):
+        return None
+    if _search_cache is None:
+        _search_cache = SearchCache(
+            path=str(config.get("search.cache.path", "outputs/cache/search_cache.db")),
+            ttl_seconds=float(config.get("search.cache.ttl_hours", 24)) * 3600,
+            max_entries=int(config.get("search.cache.max_entries", 5000)),
+        )
+    return _search_cache
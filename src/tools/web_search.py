@@ -13,7 +13,6 @@ InsightFlow 销售线索模块 - 搜索工具层
 import asyncio
 import json
 import os
-import re
 from typing import Optional
 
 from agentscope.mcp import StdIOStatefulClient, HttpStatelessClient
@@ -21,51 +20,123 @@ from agentscope.message import TextBlock
 from agentscope.tool import Toolkit, ToolResponse
 
 from src.config import Config
+from src.tools.html_extract import extract_visible_text
+from src.tools.http_client import close_http_client, get_http_client, init_http_client
+from src.tools.rate_limiter import get_rate_limiter
+from src.tools.search_cache import get_search_cache
+from src.tracing import record_retry
 
 
 # ── 通用工具：网页正文提取 ─────────────────────────────────────
 
 
 async def _extract_text_from_url(url: str, max_chars: int = 8000) -> str:
-    """用 httpx 抓取网页并提取正文文本（去除 HTML 标签）"""
-    import httpx
+    """抓取网页正文，优先读取本地缓存（仅缓存提取成功的结果）"""
+    cache = get_search_cache()
+    if cache is not None:
+        cached = cache.get("extract", url, max_chars)
+        if cached is not None:
+            return cached
+
+    text = await _fetch_and_extract_text(url, max_chars)
+    if cache is not None and not text.startswith("提取失败"):
+        cache.set("extract", url, text, max_chars)
+    return text
 
-    try:
-        async with httpx.AsyncClient(
-            follow_redirects=True,
-            timeout=15.0,
-            headers={
-                "User-Agent": (
-                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/120.0.0.0 Safari/537.36"
-                )
-            },
-        ) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            html = resp.text
-    except Exception as e:
-        return f"提取失败: {e}"
-
-    # 去除 script / style / 注释
-    html = re.sub(
-        r"<script[^>]*>.*?</script>", "", html, flags=re.DOTALL | re.IGNORECASE
+
+async def _fetch_and_extract_text(url: str, max_chars: int) -> str:
+    """用共享 HTTP 客户端流式抓取网页并提取可见正文"""
+    return await extract_visible_text(
+        get_http_client(),
+        url,
+        max_chars=max_chars,
+        max_bytes=int(Config().get("http_client.max_extract_bytes", 2_000_000)),
     )
-    html = re.sub(r"<style[^>]*>.*?</style>", "", html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r"<!--.*?-->", "", html, flags=re.DOTALL)
-    # 去除所有 HTML 标签
-    text = re.sub(r"<[^>]+>", " ", html)
-    # 合并空白
-    text = re.sub(r"\s+", " ", text).strip()
 
-    if len(text) > max_chars:
-        text = text[:max_chars] + "...(已截断)"
 
-    return text
+# ── DuckDuckGo 后端 ────────────────────────────────────────────
 
 
-# ── DuckDuckGo 后端 ────────────────────────────────────────────
+def _is_rate_limited(error: Exception) -> bool:
+    """判断异常是否为搜索引擎限流。"""
+    try:
+        from ddgs.exceptions import RatelimitException
+
+        if isinstance(error, RatelimitException):
+            return True
+    except ImportError:
+        pass
+    text = str(error).lower()
+    return "ratelimit" in text or "rate limit" in text or "429" in text
+
+
+async def _ddg_text(
+    query: str,
+    max_results: int,
+    region: Optional[str] = None,
+) -> list[dict]:
+    """执行一次 DDGS 文本搜索，经共享令牌桶限流，被限流时退避重试。"""
+    from ddgs import DDGS
+
+    limiter = get_rate_limiter("duckduckgo")
+    max_retries = int(Config().get("search.rate_limit.duckduckgo.max_retries", 3))
+
+    def _sync_ddg_search() -> list[dict]:
+        with DDGS() as ddgs:
+            if region:
+                return list(ddgs.text(query, max_results=max_results, region=region))
+            return list(ddgs.text(query, max_results=max_results))
+
+    attempt = 0
+    while True:
+        await limiter.acquire()
+        try:
+            raw = await asyncio.to_thread(_sync_ddg_search)
+        except Exception as e:
+            if _is_rate_limited(e) and attempt < max_retries:
+                limiter.on_rate_limited()
+                attempt += 1
+                record_retry()
+                continue
+            raise
+        limiter.on_success()
+        return raw
+
+
+async def search_duckduckgo(
+    query: str,
+    max_results: int = 30,
+    region: str = "cn-zh",
+) -> list[dict]:
+    """DuckDuckGo 搜索（带本地缓存），返回统一格式的结果列表。
+
+    供 web_search 工具和 broad 模式扩量抓取共用，二者命中同一份缓存。
+
+    Returns:
+        [{"title", "url", "snippet"}, ...]；搜索异常时直接抛出
+    """
+    cache = get_search_cache()
+    if cache is not None:
+        cached = cache.get("duckduckgo", query, max_results, region)
+        if cached is not None:
+            return cached
+
+    raw = await _ddg_text(query, max_results, region)
+    if not raw:
+        # 指定 region 无结果时，去掉 region 重试
+        record_retry()
+        raw = await _ddg_text(query, max_results)
+    results = [
+        {
+            "title": r.get("title", ""),
+            "url": r.get("href", ""),
+            "snippet": r.get("body", ""),
+        }
+        for r in raw
+    ]
+    if cache is not None and results:
+        cache.set("duckduckgo", query, results, max_results, region)
+    return results
 
 
 def _register_duckduckgo(toolkit: Toolkit) -> None:
@@ -80,41 +151,12 @@ def _register_duckduckgo(toolkit: Toolkit) -> None:
             max_results (int):
                 返回结果数量，最多50条。
         """
-        from ddgs import DDGS
-
         # 防御：LLM 有时传空字符串或非整数
         if not isinstance(max_results, int) or max_results <= 0:
             max_results = 30
         max_results = min(max_results, 50)
         try:
-            import random
-            import time
-
-            def _sync_ddg_search():
-                # 随机延迟 0.5-2 秒，避免 DuckDuckGo 频率限制
-                time.sleep(random.uniform(0.5, 2.0))
-                with DDGS() as ddgs:
-                    raw = list(
-                        ddgs.text(query, max_results=max_results, region="cn-zh")
-                    )
-                    if not raw:
-                        # cn-zh 无结果时，去掉 region 重试
-                        raw = list(ddgs.text(query, max_results=max_results))
-                    if not raw:
-                        # 仍无结果，延迟后再试一次
-                        time.sleep(random.uniform(1.0, 3.0))
-                        raw = list(ddgs.text(query, max_results=max_results))
-                    return raw
-
-            raw = await asyncio.to_thread(_sync_ddg_search)
-            results = [
-                {
-                    "title": r.get("title", ""),
-                    "url": r.get("href", ""),
-                    "snippet": r.get("body", ""),
-                }
-                for r in raw
-            ]
+            results = await search_duckduckgo(query, max_results)
         except Exception as e:
             results = [{"error": f"搜索失败: {e}"}]
 
@@ -165,15 +207,30 @@ def _register_bocha(toolkit: Toolkit, api_key: str) -> None:
             max_results (int):
                 返回结果数量，最多50条。
         """
-        import httpx
-
         # 防御：LLM 有时传空字符串或非整数
         if not isinstance(max_results, int) or max_results <= 0:
             max_results = 30
         max_results = min(max_results, 50)
+        cache = get_search_cache()
+        if cache is not None:
+            cached = cache.get("bocha", query, max_results)
+            if cached is not None:
+                return ToolResponse(
+                    content=[
+                        TextBlock(
+                            type="text",
+                            text=json.dumps(cached, ensure_ascii=False, indent=2),
+                        ),
+                    ],
+                )
+        limiter = get_rate_limiter("bocha")
+        max_retries = int(Config().get("search.rate_limit.bocha.max_retries", 3))
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                resp = await client.post(
+            attempt = 0
+            while True:
+                await limiter.acquire()
+                resp = await get_http_client().request(
+                    "POST",
                     "https://api.bocha.cn/v1/web-search",
                     headers={
                         "Authorization": f"Bearer {api_key}",
@@ -186,8 +243,18 @@ def _register_bocha(toolkit: Toolkit, api_key: str) -> None:
                         "freshness": "noLimit",
                     },
                 )
+                if resp.status_code == 429 and attempt < max_retries:
+                    # 被限流：降速、冷却后重试
+                    limiter.on_rate_limited()
+                    attempt += 1
+                    record_retry()
+                    continue
+                if resp.status_code == 429:
+                    limiter.on_rate_limited()
                 resp.raise_for_status()
                 data = resp.json()
+                limiter.on_success()
+                break
         except Exception as e:
             return ToolResponse(
                 content=[
@@ -214,6 +281,8 @@ def _register_bocha(toolkit: Toolkit, api_key: str) -> None:
                     "date": item.get("datePublished", ""),
                 }
             )
+        if cache is not None and results:
+            cache.set("bocha", query, results, max_results)
 
         return ToolResponse(
             content=[
@@ -300,6 +369,9 @@ async def setup_search_toolkit(
     toolkit = Toolkit()
     mcp_clients = []
 
+    # 进程级共享 HTTP 连接池（网页提取 / 博查搜索复用）
+    init_http_client()
+
     provider = config.search_provider
     print(f"[Tools] 搜索引擎: {provider}")
 
@@ -409,3 +481,10 @@ async def close_mcp_clients(clients: list):
             await client.close()
         except Exception as e:
             print(f"[Tools] 关闭 MCP 客户端失败: {e}")
+
+
+async def close_search_clients(clients: list):
+    """关闭所有 MCP 客户端连接和共享 HTTP 连接池"""
+    if clients:
+        await close_mcp_clients(clients)
+    await close_http_client()
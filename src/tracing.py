@@ -0,0 +1,390 @@
+"""
+InsightFlow 销售线索模块 - 运行追踪
+文件路径: src/tracing.py
+
+为一次 run_sales_lead_search 记录结构化 span：
+
+  - pipeline: 整次运行
+  - stage:    流水线阶段（由 PipelineDeadline.call / wait 打点）
+  - agent:    每次 Agent 调用
+  - llm:      每次模型请求（耗时、token 数、是否命中 LLM 缓存）
+  - tool:     每次工具调用（web_search / web_extract / MCP 工具 / 文件工具）
+
+span 记录在当前运行的 Tracer 上（通过 contextvar 传递，asyncio 任务创建时自动继承），
+运行结束后导出为与报告同名的 .trace.jsonl，并输出最慢 span 汇总表。
+
+未启用时（tracing.enabled=false 且未设置 INSIGHTFLOW_TRACE）不创建 Tracer，
+trace_span 直接返回共享的空上下文，模型也不做包装，开销可以忽略。
+"""
+
+import itertools
+import json
+import os
+import time
+from collections.abc import AsyncGenerator
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Optional, Type
+
+from agentscope.model import ChatModelBase, ChatResponse
+from pydantic import BaseModel
+
+from src.config import Config
+
+
+def tracing_enabled() -> bool:
+    """是否启用追踪（配置项或环境变量 INSIGHTFLOW_TRACE=1）。"""
+    flag = os.getenv("INSIGHTFLOW_TRACE", "").strip().lower()
+    if flag in ("1", "true", "yes"):
+        return True
+    return bool(Config().get("tracing.enabled", False))
+
+
+# ================================================================
+#  Span / Tracer
+# ================================================================
+
+
+class Span:
+    """一个计时区间"""
+
+    __slots__ = (
+        "tracer",
+        "span_id",
+        "parent_id",
+        "kind",
+        "name",
+        "stage",
+        "start",
+        "end",
+        "retries",
+        "error",
+        "attrs",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        span_id: int,
+        parent_id: Optional[int],
+        kind: str,
+        name: str,
+        stage: str,
+        attrs: dict,
+    ):
+        self.tracer = tracer
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.kind = kind
+        self.name = name
+        self.stage = stage
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.retries = 0
+        self.error = ""
+        self.attrs = attrs
+        self._token = None
+
+    @property
+    def duration(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def add_retry(self) -> None:
+        self.retries += 1
+
+    def record_usage(self, response: Optional[ChatResponse]) -> None:
+        """从模型响应中记录 token 用量和缓存命中。"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        self.attrs["input_tokens"] = usage.input_tokens
+        self.attrs["output_tokens"] = usage.output_tokens
+        if isinstance(usage.metadata, dict) and usage.metadata.get("cached"):
+            self.attrs["cached"] = True
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self.end is not None:
+            return
+        self.end = time.perf_counter()
+        if error is not None:
+            self.error = type(error).__name__ + (f": {error}" if str(error) else "")
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # 在其他上下文中结束（如流式响应被另一个任务消费完），只能放弃恢复
+                pass
+            self._token = None
+        self.tracer._on_finish(self)
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.finish(exc)
+
+    def to_dict(self) -> dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "name": self.name,
+            "stage": self.stage,
+            "start_offset": round(self.start - self.tracer.start, 4),
+            "duration": round(self.duration, 4),
+            "retries": self.retries,
+            "error": self.error,
+            **self.attrs,
+        }
+
+
+class _NoopSpan:
+    """未启用追踪时的空 span（所有方法都不做事）"""
+
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def add_retry(self) -> None:
+        pass
+
+    def record_usage(self, response: Any) -> None:
+        pass
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+_current_tracer: ContextVar[Optional["Tracer"]] = ContextVar(
+    "insightflow_tracer",
+    default=None,
+)
+_current_span: ContextVar[Optional[Span]] = ContextVar(
+    "insightflow_span",
+    default=None,
+)
+
+
+class Tracer:
+    """单次运行的 span 收集器"""
+
+    def __init__(self, run_id: str = ""):
+        self.run_id = run_id
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.start = time.perf_counter()
+        self.spans: list[Span] = []
+        self._ids = itertools.count(1)
+        # 阶段按顺序执行（流式模式合并为一个 "stream" 阶段），
+        # 阶段开始前创建的 worker 任务也能据此归到正确的阶段下
+        self._open_stage: Optional[Span] = None
+
+    def start_span(
+        self,
+        kind: str,
+        name: str,
+        activate: bool = True,
+        **attrs: Any,
+    ) -> Span:
+        """开始一个 span；activate=True 时设为当前 span（后续 span 以它为父节点）。"""
+        parent = _current_span.get()
+        if (parent is None or parent.kind == "pipeline") and self._open_stage is not None:
+            parent = self._open_stage
+        span = Span(
+            self,
+            next(self._ids),
+            parent.span_id if parent is not None else None,
+            kind,
+            name,
+            self._open_stage.name if self._open_stage is not None else "",
+            attrs,
+        )
+        if kind == "stage":
+            span.stage = name
+            self._open_stage = span
+        if activate:
+            span._token = _current_span.set(span)
+        return span
+
+    def _on_finish(self, span: Span) -> None:
+        self.spans.append(span)
+        if span is self._open_stage:
+            self._open_stage = None
+
+    def slowest(self, n: int = 10, kinds: Optional[tuple[str, ...]] = None) -> list[Span]:
+        """耗时最长的 n 个 span（默认排除 pipeline / stage 这类容器 span）。"""
+        kinds = kinds or ("agent", "llm", "tool")
+        spans = [s for s in self.spans if s.kind in kinds]
+        return sorted(spans, key=lambda s: s.duration, reverse=True)[:n]
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """按 kind 汇总: 次数、总耗时、token 数、重试次数。"""
+        result: dict[str, dict[str, float]] = {}
+        for span in self.spans:
+            item = result.setdefault(
+                span.kind,
+                {"count": 0, "seconds": 0.0, "input_tokens": 0, "output_tokens": 0, "retries": 0},
+            )
+            item["count"] += 1
+            item["seconds"] += span.duration
+            item["input_tokens"] += span.attrs.get("input_tokens", 0) or 0
+            item["output_tokens"] += span.attrs.get("output_tokens", 0) or 0
+            item["retries"] += span.retries
+        return result
+
+    def export_jsonl(self, path: str) -> str:
+        """按开始时间导出所有已结束的 span，每行一个 JSON 对象。"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            header = {
+                "kind": "trace",
+                "run_id": self.run_id,
+                "started_at": self.started_at,
+                "span_count": len(self.spans),
+            }
+            f.write(json.dumps(header, ensure_ascii=False) + "\n")
+            for span in sorted(self.spans, key=lambda s: s.start):
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp_path, path)
+        return path
+
+
+def current_tracer() -> Optional[Tracer]:
+    return _current_tracer.get()
+
+
+def activate_tracer(tracer: Optional[Tracer]):
+    """把 tracer 设为当前上下文的 Tracer，返回用于 deactivate_tracer 的 token。"""
+    return _current_tracer.set(tracer)
+
+
+def deactivate_tracer(token) -> None:
+    _current_tracer.reset(token)
+
+
+def trace_span(kind: str, name: str, **attrs: Any) -> Span | _NoopSpan:
+    """在当前 Tracer 上开始一个 span，用作 with 上下文；未启用追踪时返回空 span。"""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return _NOOP_SPAN
+    return tracer.start_span(kind, name, **attrs)
+
+
+def record_retry() -> None:
+    """给当前 span 的重试次数加一（如搜索被限流后重试）。"""
+    span = _current_span.get()
+    if span is not None:
+        span.add_retry()
+
+
+def format_slowest_table(tracer: Tracer, n: int = 10) -> str:
+    """最慢 span 的 Markdown 表格。"""
+    lines = [
+        "| # | 类型 | 名称 | 阶段 | 耗时(s) | tokens(入/出) | 重试 | 错误 |",
+        "|---|------|------|------|---------|---------------|------|------|",
+    ]
+    for i, span in enumerate(tracer.slowest(n), 1):
+        tokens = ""
+        if "input_tokens" in span.attrs:
+            tokens = f"{span.attrs['input_tokens']}/{span.attrs.get('output_tokens', 0)}"
+            if span.attrs.get("cached"):
+                tokens += " (缓存)"
+        label = span.name
+        detail = span.attrs.get("label")
+        if detail:
+            label = f"{label} {detail}"
+        lines.append(
+            f"| {i} | {span.kind} | {label[:48]} | {span.stage or '-'} | "
+            f"{span.duration:.2f} | {tokens or '-'} | {span.retries} | {span.error[:40] or '-'} |"
+        )
+    return "\n".join(lines)
+
+
+# ================================================================
+#  模型包装
+# ================================================================
+
+
+class TracedChatModel(ChatModelBase):
+    """为每次模型请求记录 llm span 的包装器（当前上下文没有 Tracer 时直接透传）"""
+
+    def __init__(self, model: ChatModelBase):
+        super().__init__(model.model_name, model.stream)
+        self.model = model
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__dict__["model"], name)
+
+    async def __call__(
+        self,
+        messages: list[dict],
+        tools: Optional[list[dict]] = None,
+        tool_choice: Optional[str] = None,
+        structured_model: Optional[Type[BaseModel]] = None,
+        **kwargs: Any,
+    ) -> ChatResponse | AsyncGenerator[ChatResponse, None]:
+        tracer = _current_tracer.get()
+        if tracer is None:
+            return await self.model(
+                messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                structured_model=structured_model,
+                **kwargs,
+            )
+
+        span = tracer.start_span("llm", self.model_name, activate=False)
+        try:
+            response = await self.model(
+                messages,
+                tools=tools,
+                tool_choice=tool_choice,
+                structured_model=structured_model,
+                **kwargs,
+            )
+        except BaseException as e:
+            span.finish(e)
+            raise
+        if self.stream:
+            return self._trace_stream(response, span)
+        span.record_usage(response)
+        span.finish()
+        return response
+
+    @staticmethod
+    async def _trace_stream(
+        stream: AsyncGenerator[ChatResponse, None],
+        span: Span,
+    ) -> AsyncGenerator[ChatResponse, None]:
+        """流式响应消费完才算请求结束；用量取最后一个块。"""
+        last: Optional[ChatResponse] = None
+        try:
+            async for chunk in stream:
+                last = chunk
+                yield chunk
+        except BaseException as e:
+            span.finish(e)
+            raise
+        span.record_usage(last)
+        span.finish()
+
+
+def with_tracing(model: ChatModelBase) -> ChatModelBase:
+    """启用追踪时为模型加上 TracedChatModel 包装（已包装过的原样返回）。"""
+    if isinstance(model, TracedChatModel) or not tracing_enabled():
+        return model
+    return TracedChatModel(model)